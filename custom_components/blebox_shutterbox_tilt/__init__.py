@@ -6,28 +6,59 @@ https://github.com/andrzejchm/blebox_shutterbox_tilt
 """
 import asyncio
 import logging
+from functools import partial
+from typing import Callable
 from typing import Dict
+from typing import List
 from typing import Optional
 
 import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import callback
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers import device_registry
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.event import async_track_time_interval
 
 from .api import ShutterboxApiClient
+from .cache import async_get_device_cache
+from .cache import DeviceCache
+from .calibration import async_get_profile_store
 from .const import API_CLIENT
+from .const import CACHE_VALIDATION_WINDOW
+from .const import CONF_DEVICES
 from .const import CONF_IP_ADDRESS
 from .const import CONF_PORT
+from .const import CONF_PUSH_IDS
+from .const import COORDINATOR
 from .const import DATA
 from .const import DEFAULT_PORT
 from .const import DEVICE_INFO
 from .const import DOMAIN
+from .const import DOMAIN_DATA
+from .const import ENTRY_ID
 from .const import PLATFORMS
+from .const import SCAN_INTERVAL
+from .const import SIGNAL_DEVICE_ADDED
 from .const import STARTUP_MESSAGE
+from .const import UNSUBS
+from .coordinator import refresh_offset
+from .coordinator import ShutterboxDataUpdateCoordinator
+from .push import async_forget_push_id
+from .push import async_get_push_id
+from .push import async_register_push_target
+from .services import async_setup_services
+from .services import async_unload_services
+from .transport import async_get_session
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
+CONNECTION_OPTIONS = {CONF_IP_ADDRESS, CONF_PORT}
+HUB_LOCKS = "hub_locks"
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up this integration using UI."""
@@ -35,32 +66,237 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         _LOGGER.info(STARTUP_MESSAGE)
 
     hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN].setdefault(entry.entry_id, {})
-    hass.data[DOMAIN][entry.entry_id][DATA] = entry.data
-    ip_address = entry.data.get(CONF_IP_ADDRESS)
-    port = entry.data.get(CONF_PORT)
-
-    session = async_get_clientsession(hass)
-    client = ShutterboxApiClient(ip_address, port, session, hass)
-
-    hass.data[DOMAIN][entry.entry_id][API_CLIENT] = client
-    try:
-        device_info = await client.async_get_device_info()
-    except ConfigEntryNotReady as ex:
-        raise ex
-    except Exception as ex:
-        raise ConfigEntryNotReady(f"{ex}") from ex
-    hass.data[DOMAIN][entry.entry_id][DEVICE_INFO] = device_info
+    config = entry_config(entry)
+    if CONF_DEVICES in config:
+        await _async_setup_hub(hass, entry, config)
+    else:
+        await _async_setup_device(hass, entry, entry.entry_id, config)
 
     for platform in PLATFORMS:
         await hass.async_add_job(
             hass.config_entries.async_forward_entry_setup(entry, platform)
         )
 
-    entry.add_update_listener(async_reload_entry)
+    async_setup_services(hass)
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
     return True
 
 
+def entry_config(entry: ConfigEntry) -> Dict[str, any]:
+    """entry data with the options applied on top"""
+    return {**entry.data, **entry.options}
+
+
+def device_key(entry_id: str, config: Dict[str, any]) -> str:
+    """key of a hub device in hass.data[DOMAIN], single device entries use their entry id"""
+    return f"{entry_id}_{config[CONF_IP_ADDRESS]}:{config[CONF_PORT]}"
+
+
+@callback
+def entry_devices(hass: HomeAssistant, entry_id: str) -> Dict[str, Dict[str, any]]:
+    """data of the devices set up by an entry, by device key"""
+    return {
+        key: device_data
+        for key, device_data in hass.data.get(DOMAIN, {}).items()
+        if device_data[ENTRY_ID] == entry_id
+    }
+
+
+async def _async_setup_hub(
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        config: Dict[str, any],
+) -> None:
+    """Sets up the devices of a hub entry concurrently.
+
+    A device that can't be set up doesn't fail the others, it's retried along with
+    the idle polls. The entry is only not ready if none of its devices is.
+    """
+    hass.data.setdefault(DOMAIN_DATA, {}).setdefault(HUB_LOCKS, {})[entry.entry_id] = asyncio.Lock()
+    await _async_sync_hub(hass, entry, config)
+    devices = config[CONF_DEVICES]
+    if devices and not entry_devices(hass, entry.entry_id):
+        raise ConfigEntryNotReady(f"none of the {len(devices)} devices of {entry.title} is reachable")
+
+    @callback
+    def _async_retry_devices(_now) -> None:
+        hass.async_create_task(_async_sync_hub(hass, entry, entry_config(entry)))
+
+    entry.async_on_unload(
+        async_track_time_interval(hass, _async_retry_devices, SCAN_INTERVAL)
+    )
+
+
+async def _async_sync_hub(
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        config: Dict[str, any],
+) -> None:
+    """Sets up the configured devices of a hub entry that aren't yet and removes the
+    ones no longer configured, the other devices are left alone"""
+    lock = hass.data.get(DOMAIN_DATA, {}).get(HUB_LOCKS, {}).get(entry.entry_id)
+    if lock is None:
+        return
+    async with lock:
+        configured = {
+            device_key(entry.entry_id, device): device for device in config[CONF_DEVICES]
+        }
+        running = entry_devices(hass, entry.entry_id)
+        for key in running.keys() - configured.keys():
+            await _async_remove_device(hass, entry, key)
+        added = [key for key in configured if key not in running]
+        results = await asyncio.gather(
+            *[_async_setup_device(hass, entry, key, configured[key]) for key in added],
+            return_exceptions=True,
+        )
+        for key, result in zip(added, results):
+            if isinstance(result, BaseException):
+                _LOGGER.warning("could not set up %s of %s: %s", key, entry.title, result)
+            elif entry.state == ConfigEntryState.LOADED:
+                async_dispatcher_send(hass, SIGNAL_DEVICE_ADDED.format(entry_id=entry.entry_id), key)
+
+
+async def _async_setup_device(
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        key: str,
+        config: Dict[str, any],
+) -> None:
+    """Sets up the api client and coordinator of a device in hass.data[DOMAIN][key]"""
+    client = ShutterboxApiClient(
+        config[CONF_IP_ADDRESS],
+        config[CONF_PORT],
+        async_get_session(hass),
+        hass,
+    )
+    client.metrics.add_device(client.host)
+    unsubs: List[Callable[[], None]] = []
+    device_data = {
+        ENTRY_ID: entry.entry_id,
+        DATA: config,
+        API_CLIENT: client,
+        UNSUBS: unsubs,
+    }
+    cache = await async_get_device_cache(hass)
+    cached = cache.get(key)
+    if cached is None:
+        try:
+            device_info = await client.async_get_device_info()
+        except ConfigEntryNotReady as ex:
+            raise ex
+        except Exception as ex:
+            raise ConfigEntryNotReady(f"{ex}") from ex
+        if device_info:
+            cache.async_set_device_info(key, device_info)
+            await _async_fetch_settings(client, key, cache)
+    else:
+        device_info = cached.device_info
+        client.set_device_info(device_info)
+        client.set_settings(cached.settings)
+        unsubs.append(
+            async_call_later(
+                hass,
+                refresh_offset(key, CACHE_VALIDATION_WINDOW),
+                partial(_async_validate_device_info, hass, key, cache),
+            )
+        )
+    device_data[DEVICE_INFO] = device_info
+    hass.data[DOMAIN][key] = device_data
+
+    profiles = await async_get_profile_store(hass)
+    coordinator = ShutterboxDataUpdateCoordinator(
+        hass,
+        client,
+        entry,
+        profiles,
+        key=None if key == entry.entry_id else key,
+    )
+    coordinator.async_apply_settings(client.settings)
+    device_data[COORDINATOR] = coordinator
+    if cached is not None and cached.state is not None:
+        coordinator.async_restore(cached.state)
+    else:
+        await coordinator.async_refresh()
+        cache.async_set_state(key, coordinator.data)
+    unsubs.append(
+        coordinator.async_add_listener(
+            lambda: cache.async_set_state(key, coordinator.data)
+        )
+    )
+    unsubs.append(
+        async_register_push_target(hass, async_get_push_id(hass, entry, key), coordinator)
+    )
+
+
+async def _async_validate_device_info(
+        hass: HomeAssistant,
+        key: str,
+        cache: DeviceCache,
+        _now,
+) -> None:
+    """Refreshes cached device info in the background, after the device was set up from it.
+
+    Settings that weren't cached, e.g. after an options change, are fetched too.
+    """
+    device_data = hass.data.get(DOMAIN, {}).get(key)
+    if device_data is None:
+        return
+    try:
+        device_info = await device_data[API_CLIENT].async_get_device_info()
+    except Exception as ex:  # pylint: disable=broad-except
+        _LOGGER.debug("could not validate cached device info of %s: %s", key, ex)
+        return
+    device_data[DEVICE_INFO] = device_info
+    cache.async_set_device_info(key, device_info)
+    cached = cache.get(key)
+    if cached is not None and cached.settings is None:
+        await _async_fetch_settings(device_data[API_CLIENT], key, cache)
+        device_data[COORDINATOR].async_apply_settings(device_data[API_CLIENT].settings)
+
+
+async def _async_fetch_settings(
+        client: ShutterboxApiClient,
+        key: str,
+        cache: DeviceCache,
+) -> None:
+    """Fetches the device settings once, the device works without them."""
+    try:
+        settings = await client.async_get_settings()
+    except Exception as ex:  # pylint: disable=broad-except
+        _LOGGER.debug("could not fetch settings of %s: %s", key, ex)
+        return
+    cache.async_set_settings(key, settings)
+
+
+@callback
+def _async_unload_device(hass: HomeAssistant, key: str) -> None:
+    """stops the background work of a device and drops its data"""
+    device_data = hass.data[DOMAIN].pop(key)
+    for unsub in device_data[UNSUBS]:
+        unsub()
+    client = device_data[API_CLIENT]
+    client.metrics.remove_device(client.host)
+
+
+async def _async_remove_device(hass: HomeAssistant, entry: ConfigEntry, key: str) -> None:
+    """Removes a device from its hub, with its entities and everything stored about it."""
+    _async_unload_device(hass, key)
+    async_forget_push_id(hass, entry, key)
+    registry = device_registry.async_get(hass)
+    device = registry.async_get_device({(DOMAIN, key)})
+    if device is not None:
+        # removes the entities of the device as well
+        registry.async_remove_device(device.id)
+    await _async_forget_device(hass, key)
+
+
+async def _async_forget_device(hass: HomeAssistant, key: str) -> None:
+    profiles = await async_get_profile_store(hass)
+    profiles.async_remove(key)
+    cache = await async_get_device_cache(hass)
+    cache.async_remove(key)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Handle removal of an entry."""
     unloaded = all(
@@ -72,15 +308,66 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         )
     )
     if unloaded:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        hass.data.get(DOMAIN_DATA, {}).get(HUB_LOCKS, {}).pop(entry.entry_id, None)
+        for key in entry_devices(hass, entry.entry_id):
+            _async_unload_device(hass, key)
+        async_unload_services(hass)
 
     return unloaded
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Forget the motion profiles of a removed entry."""
+    config = entry_config(entry)
+    if CONF_DEVICES in config:
+        keys = [device_key(entry.entry_id, device) for device in config[CONF_DEVICES]]
+    else:
+        keys = [entry.entry_id]
+    for key in keys:
+        await _async_forget_device(hass, key)
+
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Reload config entry."""
-    await async_unload_entry(hass, entry)
-    await async_setup_entry(hass, entry)
+    """Reload config entry, along with everything registered to be undone on unload."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Applies changed options to the running entry.
+
+    A new address or port is swapped into the api client, so the entities stay in
+    place with their state, and the device info is fetched again from the new
+    address. Any other change reloads the entry. Either way the cached device
+    settings are fetched again.
+    Devices added to or removed from a hub are set up or removed on their own.
+    """
+    config = entry_config(entry)
+    if CONF_DEVICES in config:
+        await _async_sync_hub(hass, entry, config)
+        return
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if entry_data is None:
+        return
+    previous = entry_data[DATA]
+    changed = {
+        key for key in config.keys() | previous.keys()
+        if config.get(key) != previous.get(key)
+    } - {CONF_PUSH_IDS}
+    if not changed:
+        return
+    cache = await async_get_device_cache(hass)
+    cache.async_invalidate_settings(entry.entry_id)
+    if not changed <= CONNECTION_OPTIONS:
+        await async_reload_entry(hass, entry)
+        return
+
+    entry_data[DATA] = config
+    client = entry_data[API_CLIENT]
+    client.metrics.remove_device(client.host)
+    client.set_address(config[CONF_IP_ADDRESS], config[CONF_PORT])
+    client.metrics.add_device(client.host)
+    await _async_validate_device_info(hass, entry.entry_id, cache, None)
+    await entry_data[COORDINATOR].async_request_refresh()
 
 
 def create_schema(
@@ -1,20 +1,174 @@
 """Sample API Client."""
+import asyncio
+import json as jsonlib
 import logging
+from dataclasses import dataclass
+from dataclasses import replace
+from http import HTTPStatus
+from typing import Callable
+from typing import Dict
 from typing import Optional
 
 import aiohttp
+from homeassistant.const import STATE_CLOSED
+from homeassistant.const import STATE_CLOSING
+from homeassistant.const import STATE_OPEN
+from homeassistant.const import STATE_OPENING
 from homeassistant.core import HomeAssistant
+from yarl import URL
 
+from .const import MOVING_STATES
 from .errors import CannotConnectToShutterBox
+from .errors import ErrorWithMessageId
 from .errors import InvalidDeviceTypeError
+from .errors import InvalidResponseError
 from .errors import NoDeviceInfoError
-
-TIMEOUT = 10
+from .health import DeviceHealth
+from .health import UNREACHABLE_ERRORS
+from .metrics import async_get_metrics
+from .metrics import HEDGES
+from .metrics import RETRIES
+from .retry import async_retry
+from .retry import COMMAND_RETRY_POLICY
+from .transport import ShutterboxTransport
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
 HEADERS = {"Content-type": "application/json; charset=UTF-8"}
 
+# first api level documented with /api/shutter/set
+COMBINED_SET_API_LEVEL = 20190911
+# first api level documented with /api/shutter/extended/state
+EXTENDED_STATE_API_LEVEL = 20190911
+# controlType of shutters with tilt (venetian blinds)
+TILT_CONTROL_TYPE = 3
+
+_BLEBOX_TO_HASS_COVER_STATES = {
+    None: None,
+    0: STATE_CLOSING,  # moving down
+    1: STATE_OPENING,  # moving up
+    2: STATE_OPEN,  # manually stopped
+    3: STATE_CLOSED,  # lower limit
+    4: STATE_OPEN,  # upper limit / open
+}
+
+
+@dataclass(frozen=True)
+class ShutterState:
+    """State of a shutterBox parsed once from a state response.
+
+    Positions use the device convention (0 is open) and are None when the device
+    does not know them, `cover_*` fields are the derived Home Assistant values.
+    """
+
+    __slots__ = (
+        "state",
+        "position",
+        "tilt",
+        "desired_position",
+        "desired_tilt",
+        "moving",
+        "cover_state",
+        "cover_position",
+        "cover_tilt_position",
+        "is_closed",
+        "is_closing",
+        "is_opening",
+    )
+
+    state: Optional[int]
+    position: Optional[int]
+    tilt: Optional[int]
+    desired_position: Optional[int]
+    desired_tilt: Optional[int]
+    moving: bool
+    cover_state: Optional[str]
+    cover_position: Optional[int]
+    cover_tilt_position: Optional[int]
+    is_closed: bool
+    is_closing: bool
+    is_opening: bool
+
+    @classmethod
+    def from_json(cls, json: dict) -> Optional["ShutterState"]:
+        """parses a state response, None if it has no shutter state.
+
+        Raises `InvalidResponseError` when the shutter state is malformed.
+        """
+        shutter = json.get("shutter")
+        if shutter is None:
+            return None
+        try:
+            return cls._from_shutter(shutter)
+        except (AttributeError, TypeError) as ex:
+            raise InvalidResponseError() from ex
+
+    @classmethod
+    def _from_shutter(cls, shutter: dict) -> "ShutterState":
+        current = shutter.get("currentPos") or {}
+        desired = shutter.get("desiredPos") or {}
+        state = shutter.get("state")
+        desired_position = _known(desired.get("position"))
+        desired_tilt = _known(desired.get("tilt"))
+        cover_state = _BLEBOX_TO_HASS_COVER_STATES.get(state)
+        return cls(
+            state=state,
+            position=_known(current.get("position")),
+            tilt=_known(current.get("tilt")),
+            desired_position=desired_position,
+            desired_tilt=desired_tilt,
+            moving=state in MOVING_STATES,
+            cover_state=cover_state,
+            cover_position=None if desired_position is None else 100 - desired_position,
+            cover_tilt_position=desired_tilt,
+            is_closed=cover_state == STATE_CLOSED,
+            is_closing=cover_state == STATE_CLOSING,
+            is_opening=cover_state == STATE_OPENING,
+        )
+
+
+@dataclass(frozen=True)
+class ShutterSettings:
+    """Configuration of a shutterBox, from its settings or its extended state."""
+
+    control_type: Optional[int] = None
+    # seconds a full tilt takes, None until the device is calibrated
+    tilt_time: Optional[float] = None
+    # seconds after which the device stops a move that didn't reach its limit
+    move_timeout: Optional[float] = None
+
+    @classmethod
+    def from_json(cls, json: dict) -> Optional["ShutterSettings"]:
+        """parses a settings response, None if it has no shutter settings"""
+        shutter = (json.get("settings") or {}).get("shutter")
+        if not isinstance(shutter, dict):
+            return None
+        return cls.from_shutter(shutter)
+
+    @classmethod
+    def from_shutter(cls, shutter: dict) -> "ShutterSettings":
+        """parses the settings from the shutter object of settings or an extended state"""
+        calibration = shutter.get("calibrationParameters") or {}
+        tilt_times = [
+            calibration.get(key) for key in ("maxTiltTimeUpMs", "maxTiltTimeDownMs")
+        ]
+        tilt_time = None
+        if calibration.get("isCalibrated") and all(isinstance(ms, int) for ms in tilt_times):
+            tilt_time = max(tilt_times) / 1000
+        move_timeout = shutter.get("moveTimeoutMs")
+        return cls(
+            control_type=shutter.get("controlType"),
+            tilt_time=tilt_time,
+            move_timeout=move_timeout / 1000 if isinstance(move_timeout, int) else None,
+        )
+
+    @property
+    def supports_tilt(self) -> Optional[bool]:
+        """whether the shutter is set up to tilt, None if unknown"""
+        if self.control_type is None:
+            return None
+        return self.control_type == TILT_CONTROL_TYPE
+
 
 class ShutterboxApiClient:
     """Api client for BleBox shutterBox"""
@@ -27,80 +181,273 @@ class ShutterboxApiClient:
             hass: HomeAssistant,
     ) -> None:
         """Sample API Client."""
-        self._ip_address = ip_address
-        self._port = port
         self._session = session
         self._hass = hass
+        self.metrics = async_get_metrics(hass)
+        self.retry_policy = COMMAND_RETRY_POLICY
+        self.set_address(ip_address, port)
+
+    def set_address(self, ip_address: str, port: int) -> None:
+        """Points the client at another address.
+
+        Nothing known about the device at the previous address carries over: its
+        health, api level and settings are dropped until the new one is queried.
+        """
+        self._api_level: Optional[int] = None
+        self._extended_state_missing = False
+        self.settings: Optional[ShutterSettings] = None
+        self._ip_address = ip_address
+        self._port = port
+        self._transport = ShutterboxTransport(self._session, self._hass, self.host)
+        self._base_url = URL.build(scheme="http", host=ip_address, port=port)
+        self._device_state_url = self._base_url.with_path("/api/device/state")
+        self._shutter_state_url = self._base_url.with_path("/api/shutter/state")
+        self._extended_state_url = self._base_url.with_path("/api/shutter/extended/state")
+        self._shutter_set_url = self._base_url.with_path("/api/shutter/set")
+        self._settings_url = self._base_url.with_path("/api/settings/state")
+        self._open_url = self._base_url.with_path("/s/u/")
+        self._close_url = self._base_url.with_path("/s/d/")
+        self._stop_url = self._base_url.with_path("/s/s/")
+        self._position_urls: Dict[int, URL] = {}
+        self._tilt_urls: Dict[int, URL] = {}
+        self.health = DeviceHealth(self.host)
+
+    @property
+    def host(self) -> str:
+        """address and port of the device, the key of its metrics"""
+        return f"{self._ip_address}:{self._port}"
 
     async def async_get_device_info(self) -> Optional[dict]:
         """Gets device info"""
         try:
-            address = f"http://{self._ip_address}/api/device/state"
-            print(address)
-            state_response = await self._session.get(
-                address
-            )
+            json = await self._async_request_json("GET", self._device_state_url)
+        except ErrorWithMessageId:
+            raise
+        except Exception as ex:
+            raise CannotConnectToShutterBox() from ex
+        device = parse_device_info(json)
+        self.set_device_info(device)
+        return device
+
+    def set_device_info(self, device: dict) -> None:
+        """configures the client for the device, e.g. from cached device info"""
+        self._api_level = _parse_api_level(device.get("apiLevel"))
+
+    @property
+    def supports_combined_set(self) -> bool:
+        """whether position and tilt can be set with a single request"""
+        return self._api_level is not None and self._api_level >= COMBINED_SET_API_LEVEL
+
+    @property
+    def supports_extended_state(self) -> bool:
+        """whether state and settings can be polled with a single extended state request"""
+        return (
+            not self._extended_state_missing
+            and self._api_level is not None
+            and self._api_level >= EXTENDED_STATE_API_LEVEL
+        )
+
+    async def async_warm_up(self) -> None:
+        """opens a keep-alive connection to the device, ahead of a command that
+        must not wait for one"""
+        await self._async_request_json("GET", self._device_state_url)
+
+    async def async_get_cover_state(self) -> Optional[ShutterState]:
+        """Get data from the API.
+
+        Polls the extended state when the firmware supports it, keeping the
+        settings it reports in `settings`. Falls back to the plain state for good
+        when the device doesn't know the extended one.
+        """
+        if self.supports_extended_state:
+            try:
+                json = await self._async_request_json("GET", self._extended_state_url)
+            except aiohttp.ClientResponseError as ex:
+                if ex.status != HTTPStatus.NOT_FOUND:
+                    raise
+                _LOGGER.debug("%s has no extended state, polling the plain state", self._base_url)
+                self._extended_state_missing = True
+            else:
+                return self._extended_state(json)
+        return await self._async_get_state(
+            self._shutter_state_url
+        )
+
+    async def async_get_settings(self) -> Optional[ShutterSettings]:
+        """Gets the device settings and keeps them in `settings`"""
+        try:
+            json = await self._async_request_json("GET", self._settings_url)
+        except ErrorWithMessageId:
+            raise
         except Exception as ex:
             raise CannotConnectToShutterBox() from ex
-        json = await state_response.json()
+        self.settings = ShutterSettings.from_json(json)
+        return self.settings
+
+    def set_settings(self, settings: Optional[ShutterSettings]) -> None:
+        """configures the client with known settings, e.g. cached ones"""
+        self.settings = settings
+
+    def _extended_state(self, json: dict) -> Optional[ShutterState]:
+        state = ShutterState.from_json(json)
+        if state is not None:
+            reported = ShutterSettings.from_shutter(json["shutter"])
+            if self.settings is not None:
+                # the extended state doesn't carry every setting
+                reported = replace(
+                    self.settings,
+                    control_type=reported.control_type,
+                    tilt_time=reported.tilt_time,
+                )
+            self.settings = reported
         device = json.get("device")
-        if not device:
-            raise NoDeviceInfoError()
+        if isinstance(device, dict) and device.get("type") == "shutterBox":
+            self.set_device_info(device)
+        return state
 
-        if device.get("type") != "shutterBox":
-            raise InvalidDeviceTypeError()
-        return device
+    async def _async_get_state(self, url: URL) -> Optional[ShutterState]:
+        return ShutterState.from_json(await self._async_request_json("GET", url))
+
+    async def _async_request_json(
+            self,
+            method: str,
+            url: URL,
+            data: Optional[str] = None,
+            headers: Optional[dict] = None,
+            hedge: bool = False,
+            on_sent: Optional[Callable[[], None]] = None,
+    ) -> dict:
+        """sends the request unless the circuit is open, recording whether the device answered"""
+        self.health.before_request()
+        try:
+            json = await self._transport.async_request_json(
+                method, url, data, headers, hedge, on_sent
+            )
+        except UNREACHABLE_ERRORS:
+            self.health.record_failure()
+            raise
+        except asyncio.CancelledError:
+            self.health.record_cancelled()
+            raise
+        except Exception:
+            self.health.record_success()
+            raise
+        self.health.record_success()
+        return json
+
+    async def _async_command(
+            self,
+            url: URL,
+            on_sent: Optional[Callable[[], None]] = None,
+    ) -> Optional[ShutterState]:
+        """Sends an idempotent command, retried and hedged according to `retry_policy`.
+
+        `on_sent` is called whenever an attempt gets its transport slots and goes
+        out, hedges don't call it.
+        """
+
+        def attempt(hedge: bool, sent: Callable[[], None]):
+            def attempt_sent() -> None:
+                sent()
+                if on_sent is not None and not hedge:
+                    on_sent()
+
+            return self._async_request_json("GET", url, hedge=hedge, on_sent=attempt_sent)
 
-    async def async_get_cover_state(self) -> Optional[dict]:
-        """Get data from the API."""
-        state_response = await self._session.get(
-            f"http://{self._ip_address}/api/shutter/state"
+        json = await async_retry(
+            attempt,
+            self.retry_policy,
+            on_retry=lambda: self.metrics.count(self.host, RETRIES),
+            on_hedge=lambda: self.metrics.count(self.host, HEDGES),
         )
-        return await self._get_state_from_response(state_response)
+        return ShutterState.from_json(json)
 
-    @staticmethod
-    async def _get_state_from_response(state_response):
-        json = await state_response.json()
-        if "shutter" in json.keys():
-            return json
-        return None
+    def _position_url(self, position: int) -> URL:
+        url = self._position_urls.get(position)
+        if url is None:
+            url = self._position_urls[position] = self._base_url.with_path(f"/s/p/{position}/")
+        return url
+
+    def _tilt_url(self, tilt: int) -> URL:
+        url = self._tilt_urls.get(tilt)
+        if url is None:
+            url = self._tilt_urls[tilt] = self._base_url.with_path(f"/s/t/{tilt}")
+        return url
 
-    async def async_open_cover(self) -> None:
+    async def async_open_cover(self, on_sent: Optional[Callable[[], None]] = None) -> None:
         """Opens shutterBox fully"""
-        response = await self._session.get(f"http://{self._ip_address}/s/u/")
-        return await self._get_state_from_response(response)
+        return await self._async_command(self._open_url, on_sent)
 
-    async def async_close_cover(self) -> None:
+    async def async_close_cover(self, on_sent: Optional[Callable[[], None]] = None) -> None:
         """Closes shutterBox fully"""
-        response = await self._session.get(f"http://{self._ip_address}/s/d/")
-        return await self._get_state_from_response(response)
+        return await self._async_command(self._close_url, on_sent)
 
-    async def async_set_cover_position(self, position: int) -> None:
+    async def async_set_cover_position(
+            self,
+            position: int,
+            on_sent: Optional[Callable[[], None]] = None,
+    ) -> None:
         """sets exact shutterBox position"""
-        response = await self._session.get(f"http://{self._ip_address}/s/p/{position}/")
-        return await self._get_state_from_response(response)
+        return await self._async_command(self._position_url(position), on_sent)
 
-    async def async_stop_cover(self) -> None:
+    async def async_stop_cover(self, on_sent: Optional[Callable[[], None]] = None) -> None:
         """Stops shutterBox position change immediately"""
-        response = await self._session.get(f"http://{self._ip_address}/s/s/")
-        return await self._get_state_from_response(response)
+        return await self._async_command(self._stop_url, on_sent)
 
     async def async_open_cover_tilt(self) -> None:
         """Opens shutterBox' tilt fully"""
-        response = await self._session.get(f"http://{self._ip_address}/s/t/100")
-        return await self._get_state_from_response(response)
+        return await self._async_command(self._tilt_url(100))
 
     async def async_close_cover_tilt(self) -> None:
         """Closes shutterBox' tilt fully"""
-        response = await self._session.get(f"http://{self._ip_address}/s/t/0")
-        return await self._get_state_from_response(response)
+        return await self._async_command(self._tilt_url(0))
 
-    async def async_set_cover_tilt_position(self, position: int) -> None:
+    async def async_set_cover_tilt_position(
+            self,
+            position: int,
+            on_sent: Optional[Callable[[], None]] = None,
+    ) -> None:
         """Sets shutterBox' tilt position"""
-        response = await self._session.get(f"http://{self._ip_address}/s/t/{position}")
-        return await self._get_state_from_response(response)
+        return await self._async_command(self._tilt_url(position), on_sent)
+
+    async def async_set_cover_position_and_tilt(self, position: int, tilt: int) -> None:
+        """Moves shutterBox to the position and tilt with a single /api/shutter/set request.
+
+        Needs `supports_combined_set`, older firmware gets the position and the
+        tilt as separate commands from the coordinator. The request is not retried.
+        """
+        payload = {"shutter": {"desiredPos": {"position": position, "tilt": tilt}}}
+        json = await self._async_request_json(
+            "POST",
+            self._shutter_set_url,
+            data=jsonlib.dumps(payload),
+            headers=HEADERS,
+        )
+        return ShutterState.from_json(json)
 
     async def async_stop_cover_tilt(self, position: int) -> None:
         """Stops shutterBox tilt position change immediately"""
-        response = await self._session.get(f"http://{self._ip_address}/s/t/{position}")
-        return await self._get_state_from_response(response)
+        return await self._async_command(self._tilt_url(position))
+
+
+def parse_device_info(json: dict) -> dict:
+    """the device info of a /api/device/state response, raising if it's not a shutterBox"""
+    device = json.get("device")
+    if not device or not isinstance(device, dict):
+        raise NoDeviceInfoError()
+    if device.get("type") != "shutterBox":
+        raise InvalidDeviceTypeError()
+    return device
+
+
+def _known(value: Optional[int]) -> Optional[int]:
+    if value is None or value < 0:  # -1 is possible for shutterBox
+        return None
+    return value
+
+
+def _parse_api_level(api_level) -> Optional[int]:
+    try:
+        return int(api_level)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,136 @@
+"""Persistent cache of device info, settings and state for BleBox shutterBox with tilt."""
+import asyncio
+from dataclasses import asdict
+from dataclasses import dataclass
+from typing import Dict
+from typing import Optional
+from typing import Type
+from typing import TypeVar
+
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .api import ShutterSettings
+from .api import ShutterState
+from .const import DOMAIN
+from .const import DOMAIN_DATA
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.device_cache"
+STORAGE_SAVE_DELAY = 60
+DEVICE_CACHE = "device_cache"
+
+T = TypeVar("T")
+
+
+@dataclass
+class CachedDevice:
+    """Last known device info, settings and shutter state of a config entry"""
+
+    device_info: dict
+    state: Optional[ShutterState] = None
+    settings: Optional[ShutterSettings] = None
+
+
+class DeviceCache:
+    """Persists the last known device info, settings and state per config entry,
+    so entries can be set up without waiting for their devices"""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._devices: Dict[str, CachedDevice] = {}
+
+    async def async_load(self) -> None:
+        """loads the cached devices"""
+        data = await self._store.async_load() or {}
+        self._devices = {
+            entry_id: CachedDevice(
+                cached["device_info"],
+                _restore(ShutterState, cached.get("state")),
+                _restore(ShutterSettings, cached.get("settings")),
+            )
+            for entry_id, cached in data.items()
+        }
+
+    def get(self, entry_id: str) -> Optional[CachedDevice]:
+        """cached device of the entry, None when it was never set up"""
+        return self._devices.get(entry_id)
+
+    @callback
+    def async_set_device_info(self, entry_id: str, device_info: dict) -> None:
+        """caches the device info fetched from the device"""
+        cached = self._devices.get(entry_id)
+        if cached is None:
+            self._devices[entry_id] = CachedDevice(device_info)
+        elif cached.device_info == device_info:
+            return
+        else:
+            cached.device_info = device_info
+        self._async_schedule_save()
+
+    @callback
+    def async_set_state(self, entry_id: str, state: Optional[ShutterState]) -> None:
+        """caches the latest state of a device whose info is cached"""
+        cached = self._devices.get(entry_id)
+        if cached is None or state is None or cached.state == state:
+            return
+        cached.state = state
+        self._async_schedule_save()
+
+    @callback
+    def async_set_settings(self, entry_id: str, settings: Optional[ShutterSettings]) -> None:
+        """caches the settings of a device whose info is cached"""
+        cached = self._devices.get(entry_id)
+        if cached is None or cached.settings == settings:
+            return
+        cached.settings = settings
+        self._async_schedule_save()
+
+    @callback
+    def async_invalidate_settings(self, entry_id: str) -> None:
+        """forgets the settings of an entry, so they are fetched again"""
+        self.async_set_settings(entry_id, None)
+
+    @callback
+    def async_remove(self, entry_id: str) -> None:
+        """forgets a removed entry"""
+        if self._devices.pop(entry_id, None) is not None:
+            self._async_schedule_save()
+
+    @callback
+    def _async_schedule_save(self) -> None:
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    def _data_to_save(self) -> dict:
+        return {
+            entry_id: {
+                "device_info": cached.device_info,
+                "state": None if cached.state is None else asdict(cached.state),
+                "settings": None if cached.settings is None else asdict(cached.settings),
+            }
+            for entry_id, cached in self._devices.items()
+        }
+
+
+async def async_get_device_cache(hass: HomeAssistant) -> DeviceCache:
+    """returns the integration-wide device cache, loading it once"""
+    domain_data = hass.data.setdefault(DOMAIN_DATA, {})
+    if DEVICE_CACHE not in domain_data:
+        domain_data[DEVICE_CACHE] = asyncio.ensure_future(_async_load_device_cache(hass))
+    return await domain_data[DEVICE_CACHE]
+
+
+async def _async_load_device_cache(hass: HomeAssistant) -> DeviceCache:
+    cache = DeviceCache(hass)
+    await cache.async_load()
+    return cache
+
+
+def _restore(cls: Type[T], data: Optional[dict]) -> Optional[T]:
+    if data is None:
+        return None
+    try:
+        return cls(**data)
+    except TypeError:  # stored by a version with different fields
+        return None
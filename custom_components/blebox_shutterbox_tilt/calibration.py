@@ -0,0 +1,149 @@
+"""Travel time calibration and motion profile storage for BleBox shutterBox with tilt."""
+import asyncio
+from dataclasses import asdict
+from dataclasses import dataclass
+from typing import Callable
+from typing import Dict
+from typing import Optional
+
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .api import ShutterState
+from .const import DEFAULT_TILT_TIME
+from .const import DEFAULT_TRAVEL_TIME
+from .const import DOMAIN
+from .const import DOMAIN_DATA
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.motion_profiles"
+STORAGE_SAVE_DELAY = 30
+PROFILE_STORE = "profile_store"
+
+MIN_CALIBRATION_DISTANCE = 20
+CALIBRATION_SMOOTHING = 0.5
+
+
+@dataclass
+class MotionProfile:
+    """How long a single blind takes to travel and to tilt its full range"""
+
+    travel_time: float = DEFAULT_TRAVEL_TIME
+    tilt_time: float = DEFAULT_TILT_TIME
+    travel_samples: int = 0
+    tilt_samples: int = 0
+
+
+class MotionCalibrator:
+    """Learns the motion profile from timestamped state samples.
+
+    A motion starts at the first sample reporting movement and ends at the first
+    one reporting a stop. Moves covering at least `MIN_CALIBRATION_DISTANCE`
+    update the full travel time, tilt-only moves update the full tilt time.
+    """
+
+    def __init__(
+            self,
+            profile: MotionProfile,
+            on_update: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.profile = profile
+        self._on_update = on_update
+        self._motion_start: Optional[tuple] = None
+
+    def observe(self, cover_state: Optional[ShutterState], now: float) -> None:
+        """feeds a state response received at monotonic time `now`"""
+        position = cover_state and cover_state.position
+        tilt = cover_state and cover_state.tilt
+        if cover_state is not None and cover_state.moving:
+            if self._motion_start is None:
+                self._motion_start = (now, position, tilt)
+            return
+        if self._motion_start is None:
+            return
+        started_at, start_position, start_tilt = self._motion_start
+        self._motion_start = None
+        duration = now - started_at
+        moved = _distance(start_position, position)
+        tilted = _distance(start_tilt, tilt)
+        if moved is not None and moved >= MIN_CALIBRATION_DISTANCE:
+            self.profile.travel_time = self._smooth(
+                self.profile.travel_time, duration * 100 / moved, self.profile.travel_samples
+            )
+            self.profile.travel_samples += 1
+        elif moved == 0 and tilted is not None and tilted >= MIN_CALIBRATION_DISTANCE:
+            self.profile.tilt_time = self._smooth(
+                self.profile.tilt_time, duration * 100 / tilted, self.profile.tilt_samples
+            )
+            self.profile.tilt_samples += 1
+        else:
+            return
+        if self._on_update is not None:
+            self._on_update()
+
+    @staticmethod
+    def _smooth(current: float, measured: float, samples: int) -> float:
+        if samples == 0:
+            return measured
+        return current + CALIBRATION_SMOOTHING * (measured - current)
+
+
+class MotionProfileStore:
+    """Persists motion profiles per config entry"""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._profiles: Dict[str, MotionProfile] = {}
+
+    async def async_load(self) -> None:
+        """loads the stored profiles"""
+        data = await self._store.async_load() or {}
+        self._profiles = {
+            entry_id: MotionProfile(**profile) for entry_id, profile in data.items()
+        }
+
+    def profile(self, entry_id: str) -> MotionProfile:
+        """profile of the entry, a default one until it gets calibrated"""
+        profile = self._profiles.get(entry_id)
+        if profile is None:
+            profile = self._profiles[entry_id] = MotionProfile()
+        return profile
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """saves the profiles after a delay, batching calibrations of many devices"""
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def async_remove(self, entry_id: str) -> None:
+        """forgets the profile of a removed entry"""
+        if self._profiles.pop(entry_id, None) is not None:
+            self.async_schedule_save()
+
+    def _data_to_save(self) -> dict:
+        return {
+            entry_id: asdict(profile)
+            for entry_id, profile in self._profiles.items()
+            if profile.travel_samples or profile.tilt_samples
+        }
+
+
+async def async_get_profile_store(hass: HomeAssistant) -> MotionProfileStore:
+    """returns the integration-wide profile store, loading it once"""
+    domain_data = hass.data.setdefault(DOMAIN_DATA, {})
+    if PROFILE_STORE not in domain_data:
+        domain_data[PROFILE_STORE] = asyncio.ensure_future(_async_load_profile_store(hass))
+    return await domain_data[PROFILE_STORE]
+
+
+async def _async_load_profile_store(hass: HomeAssistant) -> MotionProfileStore:
+    store = MotionProfileStore(hass)
+    await store.async_load()
+    return store
+
+
+def _distance(start: Optional[int], end: Optional[int]) -> Optional[int]:
+    if start is None or end is None:
+        return None
+    return abs(end - start)
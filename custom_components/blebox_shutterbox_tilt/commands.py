@@ -0,0 +1,109 @@
+"""Command pipeline for BleBox shutterBox with tilt."""
+import asyncio
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from homeassistant.core import HomeAssistant
+
+COMMAND_DEBOUNCE = 0.15
+
+TARGET_POSITION = "position"
+TARGET_TILT = "tilt"
+TARGET_POSITION_AND_TILT = "position_and_tilt"
+
+
+class _PendingCommand:
+    """latest command for a single target and the future its callers wait on"""
+
+    __slots__ = ("command", "debounce", "result")
+
+    def __init__(self, result: asyncio.Future) -> None:
+        self.command: Optional[Callable[[], Awaitable]] = None
+        self.debounce = True
+        self.result = result
+
+
+class CommandPipeline:
+    """Sends commands to a single shutterBox one at a time.
+
+    Commands are grouped by the target they change (`TARGET_POSITION` or
+    `TARGET_TILT`). A newer command replaces the one still waiting for the same
+    target, so a burst of slider moves ends up as a single request for the last
+    value, and every caller receives the response to the command actually sent.
+    """
+
+    def __init__(self, hass: HomeAssistant, debounce: float = COMMAND_DEBOUNCE) -> None:
+        self._hass = hass
+        self._debounce = debounce
+        self._pending: Dict[str, _PendingCommand] = {}
+        self._worker: Optional[asyncio.Task] = None
+
+    async def async_submit(
+            self,
+            target: str,
+            command: Callable[[], Awaitable],
+            debounce: bool = True,
+            replaces: Tuple[str, ...] = (),
+    ):
+        """Queues the command, replacing a pending one for the same target.
+
+        Debounced commands wait for the debounce window before the first request
+        of a burst is sent, others (e.g. stop) go out as soon as the device is free.
+        Pending commands for the `replaces` targets are dropped as well, their
+        callers receive the response to this command.
+        """
+        pending = self._pending.get(target)
+        if pending is None:
+            pending = self._pending[target] = _PendingCommand(
+                self._hass.loop.create_future()
+            )
+        for replaced_target in replaces:
+            replaced = self._pending.pop(replaced_target, None)
+            if replaced is not None:
+                _chain(pending.result, replaced.result)
+        pending.command = command
+        pending.debounce = debounce
+        if self._worker is None:
+            self._worker = self._hass.async_create_task(self._async_send_pending())
+        return await asyncio.shield(pending.result)
+
+    async def _async_send_pending(self) -> None:
+        try:
+            if all(pending.debounce for pending in self._pending.values()):
+                await asyncio.sleep(self._debounce)
+            while self._pending:
+                target = next(iter(self._pending))
+                pending = self._pending.pop(target)
+                try:
+                    response = await pending.command()
+                except asyncio.CancelledError:
+                    pending.result.cancel()
+                    raise
+                except Exception as ex:  # pylint: disable=broad-except
+                    pending.result.set_exception(ex)
+                else:
+                    pending.result.set_result(response)
+        finally:
+            self._worker = None
+            for pending in self._pending.values():
+                pending.result.cancel()
+            self._pending.clear()
+
+
+def _chain(source: asyncio.Future, target: asyncio.Future) -> None:
+    """resolves `target` with the outcome of `source`"""
+
+    def copy(_: asyncio.Future) -> None:
+        if target.done():
+            return
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+
+    source.add_done_callback(copy)
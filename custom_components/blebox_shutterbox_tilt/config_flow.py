@@ -1,19 +1,36 @@
 """Adds config flow for BleBox shutterBox with tilt."""
+import asyncio
 import logging
+from ipaddress import IPv4Network
 from typing import Dict
+from typing import List
 from typing import Optional
+from typing import Set
 
+import voluptuous as vol
 from homeassistant import config_entries
+from homeassistant.const import CONF_NAME
 from homeassistant.core import callback
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.data_entry_flow import AbortFlow
+from homeassistant.data_entry_flow import RESULT_TYPE_CREATE_ENTRY
 
 from . import create_schema
+from . import device_key
+from . import entry_config
 from .api import ShutterboxApiClient
+from .cache import async_get_device_cache
+from .const import CONF_DEVICE_ID
+from .const import CONF_DEVICES
+from .const import CONF_HUB
 from .const import CONF_IP_ADDRESS
 from .const import CONF_PORT
 from .const import DOMAIN
+from .discovery import async_scan_network
+from .discovery import MAX_SCAN_HOSTS
+from .discovery import parse_network
 from .errors import ErrorWithMessageId
 from .options_flow import ShutterboxOptionsFlow
+from .transport import async_get_session
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,10 +46,24 @@ class ShutterboxConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self._errors = {}
 
     async def async_step_user(self, user_input: dict = None):
-        """Handle a flow initialized by the user."""
+        """Handle a flow initialized by the user.
+
+        An address range like 192.168.1.0/24 instead of an ip address scans the
+        network and adds every shutterBox found, as a single hub entry if asked to.
+        """
         self._errors = {}
 
         if user_input is not None:
+            user_input = dict(user_input)
+            hub = user_input.pop(CONF_HUB, False)
+            try:
+                network = parse_network(user_input[CONF_IP_ADDRESS])
+            except ValueError:
+                self._errors["base"] = "invalid_network"
+                return await self._show_config_form(user_input)
+            if network is not None:
+                return await self._async_scan(network, user_input, hub)
+
             device_info = await self._test_config(
                 user_input[CONF_IP_ADDRESS],
                 user_input[CONF_PORT],
@@ -48,6 +79,97 @@ class ShutterboxConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         return await self._show_config_form(user_input)
 
+    async def async_step_import(self, import_data: dict):
+        """Adds a device found by a network scan."""
+        await self.async_set_unique_id(
+            import_data.get(CONF_DEVICE_ID) or import_data[CONF_IP_ADDRESS]
+        )
+        entry_data = {
+            CONF_IP_ADDRESS: import_data[CONF_IP_ADDRESS],
+            CONF_PORT: import_data[CONF_PORT],
+        }
+        for entry in self._async_current_entries(include_ignore=False):
+            if entry.unique_id == self.unique_id and entry.options:
+                # options take precedence over data, keep them on the new address too
+                self.hass.config_entries.async_update_entry(
+                    entry, options={**entry.options, **entry_data}
+                )
+        self._abort_if_unique_id_configured(updates=entry_data)
+        return self.async_create_entry(
+            title=import_data.get(CONF_NAME) or import_data[CONF_IP_ADDRESS],
+            data=entry_data,
+        )
+
+    async def _async_scan(self, network: IPv4Network, user_input: dict, hub: bool):
+        """scans the network and creates entries for the shutterBoxes found, in bulk, or
+        one hub entry holding them"""
+        if network.num_addresses > MAX_SCAN_HOSTS:
+            self._errors["base"] = "network_too_large"
+            return await self._show_config_form(user_input)
+
+        devices = await async_scan_network(
+            async_get_session(self.hass),
+            network,
+            user_input[CONF_PORT],
+        )
+        if not devices:
+            self._errors["base"] = "no_devices_found"
+            return await self._show_config_form(user_input)
+        if hub:
+            return await self._async_create_hub(network, user_input[CONF_PORT], devices)
+
+        results = await asyncio.gather(
+            *[
+                self.hass.config_entries.flow.async_init(
+                    DOMAIN,
+                    context={"source": config_entries.SOURCE_IMPORT},
+                    data={
+                        CONF_IP_ADDRESS: device["ip"],
+                        CONF_PORT: user_input[CONF_PORT],
+                        CONF_DEVICE_ID: device.get("id"),
+                        CONF_NAME: device.get("deviceName"),
+                    },
+                )
+                for device in devices
+            ]
+        )
+        added = sum(1 for result in results if result["type"] == RESULT_TYPE_CREATE_ENTRY)
+        return self.async_abort(
+            reason="scan_finished",
+            description_placeholders={"found": str(len(devices)), "added": str(added)},
+        )
+
+    async def _async_create_hub(self, network: IPv4Network, port: int, devices: List[dict]):
+        """creates a hub entry for the devices found that aren't configured yet"""
+        await self.async_set_unique_id(f"hub_{network}")
+        self._abort_if_unique_id_configured()
+        configured = {entry.unique_id for entry in self._async_current_entries(include_ignore=False)}
+        configured |= await self._async_hub_devices()
+        hub_devices = [
+            {CONF_IP_ADDRESS: device["ip"], CONF_PORT: port}
+            for device in devices
+            if (device.get("id") or device["ip"]) not in configured
+            and f"{device['ip']}:{port}" not in configured
+        ]
+        if not hub_devices:
+            return self.async_abort(reason="already_configured")
+        return self.async_create_entry(
+            title=f"shutterBox hub {network}",
+            data={CONF_DEVICES: hub_devices},
+        )
+
+    async def _async_hub_devices(self) -> Set[str]:
+        """device ids and addresses of the devices existing hubs already hold"""
+        cache = await async_get_device_cache(self.hass)
+        held = set()
+        for entry in self._async_current_entries(include_ignore=False):
+            for device in entry_config(entry).get(CONF_DEVICES, []):
+                held.add(f"{device[CONF_IP_ADDRESS]}:{device[CONF_PORT]}")
+                cached = cache.get(device_key(entry.entry_id, device))
+                if cached is not None and cached.device_info.get("id"):
+                    held.add(cached.device_info["id"])
+        return held
+
     async def _test_config(
             self,
             ip_address: str,
@@ -55,14 +177,17 @@ class ShutterboxConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     ) -> Optional[Dict[str, any]]:
         """Return true if credentials is valid."""
         try:
-            session = async_create_clientsession(self.hass)
-            client = ShutterboxApiClient(ip_address, port, session, self.hass)
+            client = ShutterboxApiClient(
+                ip_address, port, async_get_session(self.hass), self.hass
+            )
             device_info = await client.async_get_device_info()
             if device_info is not None:
                 unique_id = device_info.get("id") or ip_address
                 await self.async_set_unique_id(unique_id)
             self._abort_if_unique_id_configured()
             return device_info
+        except AbortFlow:
+            raise
         except ErrorWithMessageId as ex:
             message = f"{ex}"
             _LOGGER.exception(message)
@@ -86,6 +211,8 @@ class ShutterboxConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Show the configuration form to edit location data."""
         return self.async_show_form(
             step_id="user",
-            data_schema=create_schema(user_input),
+            data_schema=create_schema(user_input).extend(
+                {vol.Optional(CONF_HUB, default=False): bool}
+            ),
             errors=self._errors,
         )
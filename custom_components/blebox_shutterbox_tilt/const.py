@@ -1,4 +1,6 @@
 """Constants for BleBox shutterBox with tilt."""
+from datetime import timedelta
+
 # Base component constants
 NAME = "BleBox shutterBox with tilt"
 DOMAIN = "blebox_shutterbox_tilt"
@@ -10,22 +12,64 @@ ISSUE_URL = "https://github.com/andrzejchm/blebox_shutterbox_tilt/issues"
 
 # Platforms
 COVER = "cover"
-PLATFORMS = [COVER]
+SENSOR = "sensor"
+PLATFORMS = [COVER, SENSOR]
+
+
+# Services
+SERVICE_SET_POSITION_AND_TILT = "set_cover_position_and_tilt"
+SERVICE_BULK_COMMAND = "bulk_command"
+ATTR_MAX_PARALLEL = "max_parallel"
+ATTR_STAGGER = "stagger"
+EVENT_BULK_COMMAND_RESULT = f"{DOMAIN}_bulk_command_result"
+SERVICE_GROUP_MOVE = "group_move"
+ATTR_COMMAND = "command"
+COMMAND_OPEN = "open"
+COMMAND_CLOSE = "close"
+COMMAND_STOP = "stop"
+EVENT_GROUP_MOVE_RESULT = f"{DOMAIN}_group_move_result"
+
+# Push
+PUSH_URL = f"/api/{DOMAIN}/push/{{push_id}}"
+
+# Hubs
+SIGNAL_DEVICE_ADDED = f"{DOMAIN}_device_added_{{entry_id}}"
 
 
 # Configuration and options
 CONF_IP_ADDRESS = "ip_address"
 CONF_PORT = "port"
-STATE = "state"
+CONF_DEVICE_ID = "device_id"
+CONF_DEVICES = "devices"
+CONF_HUB = "hub"
+CONF_REMOVE = "remove"
+CONF_PUSH_IDS = "push_ids"
 DATA = "data"
 API_CLIENT = "api_client"
 DEVICE_INFO = "device_info"
+COORDINATOR = "coordinator"
+ENTRY_ID = "entry_id"
+UNSUBS = "unsubs"
 
 # Defaults
 DEFAULT_NAME = DOMAIN
 DEFAULT_SETUP_TIMEOUT = 10
 DEFAULT_PORT = 80
 
+# Polling
+SCAN_INTERVAL = timedelta(seconds=60)
+MOVING_SCAN_INTERVAL = timedelta(milliseconds=500)
+SETTLE_SCAN_INTERVAL = timedelta(seconds=1)
+IDLE_SCAN_INTERVAL = timedelta(minutes=5)
+PUSH_IDLE_SCAN_INTERVAL = timedelta(minutes=30)
+CACHE_VALIDATION_WINDOW = timedelta(seconds=30)
+
+# Motion
+MOVING_STATES = (0, 1)  # moving down, moving up
+DEFAULT_TRAVEL_TIME = 30.0
+DEFAULT_TILT_TIME = 2.0
+MOTION_FRAME_INTERVAL = timedelta(milliseconds=500)
+
 STARTUP_MESSAGE = f"""
 -------------------------------------------------------------------
 {NAME}
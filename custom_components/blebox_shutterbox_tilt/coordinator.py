@@ -0,0 +1,256 @@
+"""Data update coordinator for BleBox shutterBox with tilt."""
+import asyncio
+import logging
+import zlib
+from datetime import timedelta
+from functools import partial
+from time import monotonic
+from typing import Awaitable
+from typing import Callable
+from typing import Optional
+from typing import Tuple
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from .api import ShutterboxApiClient
+from .api import ShutterSettings
+from .api import ShutterState
+from .calibration import MotionCalibrator
+from .calibration import MotionProfile
+from .calibration import MotionProfileStore
+from .commands import CommandPipeline
+from .commands import TARGET_POSITION
+from .commands import TARGET_POSITION_AND_TILT
+from .commands import TARGET_TILT
+from .const import CACHE_VALIDATION_WINDOW
+from .const import DOMAIN
+from .const import IDLE_SCAN_INTERVAL
+from .const import PUSH_IDLE_SCAN_INTERVAL
+from .const import SCAN_INTERVAL
+from .health import CircuitOpenError
+from .health import OPEN
+from .motion import MotionModel
+from .scheduler import AdaptivePollScheduler
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+def refresh_offset(key: str, interval: timedelta) -> float:
+    """stable offset (in seconds) spreading refresh deadlines of many devices over the interval"""
+    return zlib.crc32(key.encode()) / 2 ** 32 * interval.total_seconds()
+
+
+class ShutterboxDataUpdateCoordinator(DataUpdateCoordinator):
+    """Owns polling of a single shutterBox and pushes its state to the entities.
+
+    `update_interval` is only used to retry after a failed poll, successful polls
+    are paced by the `AdaptivePollScheduler`. While the device's circuit is open,
+    polls wait for its recovery backoff instead.
+    """
+
+    def __init__(
+            self,
+            hass: HomeAssistant,
+            api: ShutterboxApiClient,
+            config_entry: ConfigEntry,
+            profiles: Optional[MotionProfileStore] = None,
+            key: Optional[str] = None,
+    ) -> None:
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {config_entry.title if key is None else api.host}",
+            update_interval=SCAN_INTERVAL,
+        )
+        self.api = api
+        self.entry_id = config_entry.entry_id
+        # devices of a hub share its entry and are told apart by their key
+        self.key = key or config_entry.entry_id
+        self.commands = CommandPipeline(hass)
+        if profiles is None:
+            self.profile = MotionProfile()
+            self.calibrator = MotionCalibrator(self.profile)
+        else:
+            self.profile = profiles.profile(self.key)
+            self.calibrator = MotionCalibrator(self.profile, profiles.async_schedule_save)
+        self.scheduler = AdaptivePollScheduler(profile=self.profile)
+        self.motion = MotionModel(self.profile)
+        self._first_delay: Optional[float] = refresh_offset(
+            self.key, IDLE_SCAN_INTERVAL
+        )
+        self._pending_update: Optional[asyncio.Future] = None
+        self._submitted = 0
+        self._deferred_tilt: Optional[int] = None
+        self.push_enabled = False
+
+    @callback
+    def _schedule_refresh(self) -> None:
+        """Schedules the next poll relative to now instead of on a rounded second,
+        so devices keep the offsets they were spread with"""
+        if self.update_interval is None:
+            return
+        if self.config_entry and self.config_entry.pref_disable_polling:
+            return
+        if self._unsub_refresh:
+            self._unsub_refresh()
+            self._unsub_refresh = None
+        self._unsub_refresh = async_call_later(
+            self.hass, self._next_refresh_delay(), self._job
+        )
+
+    def _next_refresh_delay(self) -> float:
+        if not self.last_update_success:
+            if self.api.health.state == OPEN:
+                # the next poll is the recovery probe
+                return max(self.api.health.retry_at - monotonic(), 0)
+            return self.update_interval.total_seconds()
+        if self._first_delay is not None and not self.scheduler.moving:
+            delay, self._first_delay = self._first_delay, None
+            return delay
+        return self.scheduler.next_delay()
+
+    @callback
+    def async_set_updated_data(self, data: Optional[ShutterState]) -> None:
+        """Publishes a state received outside of polling, e.g. a command response"""
+        self._observe(data)
+        super().async_set_updated_data(data)
+
+    @callback
+    def async_restore(self, data: ShutterState) -> None:
+        """Publishes a cached state, to be validated by a poll within `CACHE_VALIDATION_WINDOW`.
+
+        Polls of many restored devices are spread over the window like the idle polls.
+        The cached state is not observed, so it can't teach the motion timing.
+        """
+        self._first_delay = refresh_offset(self.key, CACHE_VALIDATION_WINDOW)
+        super().async_set_updated_data(data)
+
+    @callback
+    def async_apply_settings(self, settings: Optional[ShutterSettings]) -> None:
+        """Seeds the motion timing the device hasn't been calibrated with from its settings.
+
+        The configured tilt time replaces the default one, the move timeout bounds
+        the travel time. Learned times always win.
+        """
+        if settings is None:
+            return
+        if not self.profile.tilt_samples and settings.tilt_time:
+            self.profile.tilt_time = settings.tilt_time
+        if not self.profile.travel_samples and settings.move_timeout:
+            self.profile.travel_time = min(self.profile.travel_time, settings.move_timeout)
+
+    @callback
+    def async_handle_push(self, data: Optional[ShutterState]) -> None:
+        """Handles a state change pushed by the device, polling it when no state came along.
+
+        Once a device pushes its changes, idle polling is only a safety net and
+        slows down to `PUSH_IDLE_SCAN_INTERVAL`.
+        """
+        if not self.push_enabled:
+            self.push_enabled = True
+            self.scheduler.set_idle_interval(PUSH_IDLE_SCAN_INTERVAL)
+        if data is None:
+            self.hass.async_create_task(self.async_refresh())
+        else:
+            self.async_set_updated_data(data)
+
+    async def async_send_command(
+            self,
+            target: str,
+            command: Callable[[], Awaitable],
+            debounce: bool = True,
+            replaces: Tuple[str, ...] = (),
+    ) -> None:
+        """Sends the command through the device's pipeline and publishes the response.
+
+        Any command drops a tilt still waiting for the end of a move.
+        """
+        self._submitted += 1
+        self._deferred_tilt = None
+        self.async_set_updated_data(
+            await self.commands.async_submit(target, command, debounce, replaces)
+        )
+
+    async def async_move(
+            self,
+            position: Optional[int] = None,
+            tilt: Optional[int] = None,
+            debounce: bool = True,
+    ) -> None:
+        """Moves the shutter to a Home Assistant position (100 is open) and/or tilt.
+
+        Devices without the combined set get the position first, the tilt is sent
+        as its own command once polls see the move has stopped.
+        """
+        if position is not None and tilt is not None and not self.api.supports_combined_set:
+            # async_send_command counts itself before it awaits anything
+            submitted = self._submitted + 1
+            await self.async_send_command(
+                TARGET_POSITION,
+                partial(self.api.async_set_cover_position, 100 - position),
+                debounce,
+                replaces=(TARGET_TILT,),
+            )
+            if self._submitted == submitted:
+                self._deferred_tilt = tilt
+                self._send_deferred_tilt(self.data)
+        elif position is not None and tilt is not None:
+            await self.async_send_command(
+                TARGET_POSITION_AND_TILT,
+                partial(self.api.async_set_cover_position_and_tilt, 100 - position, tilt),
+                debounce,
+                replaces=(TARGET_POSITION, TARGET_TILT),
+            )
+        elif position is not None:
+            await self.async_send_command(
+                TARGET_POSITION,
+                partial(self.api.async_set_cover_position, 100 - position),
+                debounce,
+            )
+        elif tilt is not None:
+            await self.async_send_command(
+                TARGET_TILT,
+                partial(self.api.async_set_cover_tilt_position, tilt),
+                debounce,
+            )
+
+    async def _async_update_data(self) -> Optional[ShutterState]:
+        """Fetches the cover state, joining a request that is already in flight"""
+        if self._pending_update is None:
+            self._pending_update = asyncio.ensure_future(
+                self.api.async_get_cover_state()
+            )
+            self._pending_update.add_done_callback(self._clear_pending_update)
+        try:
+            return await asyncio.shield(self._pending_update)
+        except CircuitOpenError as ex:
+            raise UpdateFailed("device is unreachable") from ex
+
+    def _clear_pending_update(self, update: asyncio.Future) -> None:
+        self._pending_update = None
+        if not update.cancelled() and update.exception() is None:
+            self._observe(update.result())
+
+    def _observe(self, data: Optional[ShutterState]) -> None:
+        now = monotonic()
+        self.calibrator.observe(data, now)
+        self.scheduler.observe(data, now)
+        self.motion.observe(data, now)
+        self._send_deferred_tilt(data)
+
+    def _send_deferred_tilt(self, data: Optional[ShutterState]) -> None:
+        if self._deferred_tilt is None or data is None or data.moving:
+            return
+        tilt, self._deferred_tilt = self._deferred_tilt, None
+        self.hass.async_create_task(
+            self.async_send_command(
+                TARGET_TILT,
+                partial(self.api.async_set_cover_tilt_position, tilt),
+                debounce=False,
+            )
+        )
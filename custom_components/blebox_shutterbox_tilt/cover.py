@@ -1,31 +1,42 @@
 """Cover platform for BleBox shutterBox with tilt."""
 import logging
-from datetime import timedelta
+from time import monotonic
+from typing import Callable
 from typing import Optional
 
+import voluptuous as vol
 from homeassistant.components.cover import ATTR_POSITION
 from homeassistant.components.cover import ATTR_TILT_POSITION
 from homeassistant.components.cover import CoverDeviceClass
 from homeassistant.components.cover import CoverEntity
 from homeassistant.components.cover import CoverEntityFeature
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import STATE_CLOSED
-from homeassistant.const import STATE_CLOSING
-from homeassistant.const import STATE_OPEN
-from homeassistant.const import STATE_OPENING
+from homeassistant.core import callback
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_platform
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-
-from .api import ShutterboxApiClient
-from .const import API_CLIENT
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from . import entry_devices
+from .api import ShutterState
+from .commands import TARGET_POSITION
+from .commands import TARGET_TILT
+from .const import COORDINATOR
 from .const import DEVICE_INFO
 from .const import DOMAIN
-from .const import STATE
+from .const import MOTION_FRAME_INTERVAL
+from .const import SERVICE_SET_POSITION_AND_TILT
+from .const import SIGNAL_DEVICE_ADDED
 from .const import VERSION
+from .coordinator import ShutterboxDataUpdateCoordinator
+from .metrics import STATE_WRITES
+from .metrics import SUPPRESSED_STATE_WRITES
+from .services import POSITION_SCHEMA
 
 _LOGGER = logging.getLogger(__name__)
-SCAN_INTERVAL = timedelta(seconds=60)
 
 
 async def async_setup_entry(
@@ -34,21 +45,56 @@ async def async_setup_entry(
         async_add_devices: AddEntitiesCallback,
 ):
     """Setup sensor platform."""
-    api = hass.data[DOMAIN][entry.entry_id][API_CLIENT]
-    async_add_devices([BleboxShutterboxCover(api, entry)], True)
+    async_add_devices(
+        [
+            BleboxShutterboxCover(device_data[COORDINATOR], entry)
+            for device_data in entry_devices(hass, entry.entry_id).values()
+        ]
+    )
+
+    @callback
+    def _async_add_device(key: str) -> None:
+        async_add_devices([BleboxShutterboxCover(hass.data[DOMAIN][key][COORDINATOR], entry)])
+
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_DEVICE_ADDED.format(entry_id=entry.entry_id),
+            _async_add_device,
+        )
+    )
+
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_SET_POSITION_AND_TILT,
+        {
+            vol.Required(ATTR_POSITION): POSITION_SCHEMA,
+            vol.Required(ATTR_TILT_POSITION): POSITION_SCHEMA,
+        },
+        "async_set_cover_position_and_tilt",
+    )
 
 
-class BleboxShutterboxCover(CoverEntity):
-    """blebox_shutterbox_tilt cover class."""
+class BleboxShutterboxCover(CoordinatorEntity, CoverEntity):
+    """blebox_shutterbox_tilt cover class.
+
+    Coordinator updates and motion frames only write the state when its
+    fingerprint differs from the last published one, `state_writes` and
+    `suppressed_state_writes` count both outcomes.
+    """
 
     def __init__(
             self,
-            api: ShutterboxApiClient,
+            coordinator: ShutterboxDataUpdateCoordinator,
             config_entry: ConfigEntry,
     ):
-        super().__init__()
-        self._api = api
+        super().__init__(coordinator)
+        self._api = coordinator.api
         self._config_entry = config_entry
+        self._unsub_motion_frames: Optional[Callable[[], None]] = None
+        self._published_fingerprint: Optional[tuple] = None
+        self.state_writes = 0
+        self.suppressed_state_writes = 0
         self._attr_supported_features = (
             CoverEntityFeature.SET_POSITION
             | CoverEntityFeature.SET_POSITION
@@ -59,11 +105,17 @@ class BleboxShutterboxCover(CoverEntity):
             | CoverEntityFeature.SET_TILT_POSITION
             | CoverEntityFeature.STOP
         )
+        if self._api.settings is not None and self._api.settings.supports_tilt is False:
+            self._attr_supported_features &= ~(
+                CoverEntityFeature.OPEN_TILT
+                | CoverEntityFeature.CLOSE_TILT
+                | CoverEntityFeature.SET_TILT_POSITION
+            )
 
     @property
     def unique_id(self):
         """Return a unique ID to use for this entity."""
-        return self._config_entry.entry_id
+        return self.coordinator.key
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -80,99 +132,131 @@ class BleboxShutterboxCover(CoverEntity):
 
     @property
     def current_cover_position(self) -> Optional[int]:
-        desired_pos = self._desired_position()
-        if desired_pos is None:
-            return None
-        position = desired_pos.get("position")
-        if position == -1 or position is None:  # possible for shutterBox
-            return None
-
-        return 100 - position
+        estimate = self._motion_estimate(self.coordinator.motion.position)
+        if estimate is not None:
+            return 100 - round(estimate)
+        state = self._state()
+        return state and state.cover_position
 
     @property
     def current_cover_tilt_position(self) -> Optional[int]:
-        desired_pos = self._desired_position()
-        if desired_pos is None:
-            return None
-        tilt = desired_pos.get("tilt")
-        return tilt
+        estimate = self._motion_estimate(self.coordinator.motion.tilt)
+        if estimate is not None:
+            return round(estimate)
+        state = self._state()
+        return state and state.cover_tilt_position
 
     @property
     def is_closed(self) -> Optional[bool]:
-        return self._cover_state() == STATE_CLOSED
+        state = self._state()
+        return state is not None and state.is_closed
 
     @property
     def is_closing(self) -> Optional[bool]:
-        return self._cover_state() == STATE_CLOSING
+        state = self._state()
+        return state is not None and state.is_closing
 
     @property
     def is_opening(self) -> Optional[bool]:
-        return self._cover_state() == STATE_OPENING
+        state = self._state()
+        return state is not None and state.is_opening
 
     @property
     def device_class(self) -> CoverDeviceClass:
         return CoverDeviceClass.SHUTTER
 
     async def async_open_cover(self, **kwargs):
-        await self._update_hass_state(await self._api.async_open_cover())
+        await self._async_send(TARGET_POSITION, self._api.async_open_cover)
 
     async def async_close_cover(self, **kwargs):
-        await self._update_hass_state(await self._api.async_close_cover())
+        await self._async_send(TARGET_POSITION, self._api.async_close_cover)
 
     async def async_set_cover_position(self, **kwargs):
-        position = kwargs[ATTR_POSITION]
-        await self._update_hass_state(
-            await self._api.async_set_cover_position(100 - position)
-        )
+        await self.coordinator.async_move(position=kwargs[ATTR_POSITION])
 
     async def async_stop_cover(self, **kwargs):
-        await self._update_hass_state(await self._api.async_stop_cover())
+        await self._async_send(TARGET_POSITION, self._api.async_stop_cover)
 
     async def async_open_cover_tilt(self, **kwargs):
-        await self._update_hass_state(await self._api.async_open_cover_tilt())
+        await self._async_send(TARGET_TILT, self._api.async_open_cover_tilt)
 
     async def async_close_cover_tilt(self, **kwargs):
-        await self._update_hass_state(await self._api.async_close_cover_tilt())
+        await self._async_send(TARGET_TILT, self._api.async_close_cover_tilt)
 
     async def async_set_cover_tilt_position(self, **kwargs):
-        position = kwargs[ATTR_TILT_POSITION]
-        await self._update_hass_state(
-            await self._api.async_set_cover_tilt_position(position)
-        )
-
-    async def async_update(self) -> None:
-        """updates data"""
-        message = f"performing async update for {self.entity_id}"
-        _LOGGER.info(message)
-        cover_state = await self._api.async_get_cover_state()
-        await self._update_hass_state(cover_state)
+        await self.coordinator.async_move(tilt=kwargs[ATTR_TILT_POSITION])
 
-    async def _update_hass_state(self, cover_state):
-        self.hass.data[DOMAIN][self._config_entry.entry_id][STATE] = cover_state
-        if self.entity_id is not None:
-            self.async_write_ha_state()
-
-    def _state(self) -> dict[str:any]:
-        state = self.hass.data[DOMAIN][self._config_entry.entry_id][STATE]
-        if state is not None:
-            state = state.get("shutter") or state
-        return state or {}
+    async def async_set_cover_position_and_tilt(self, **kwargs):
+        """moves the cover and sets its tilt with a single command"""
+        await self.coordinator.async_move(
+            position=kwargs[ATTR_POSITION], tilt=kwargs[ATTR_TILT_POSITION]
+        )
 
-    def _device_info(self) -> dict[str:any]:
-        return self.hass.data[DOMAIN][self._config_entry.entry_id][DEVICE_INFO] or {}
+    async def async_will_remove_from_hass(self) -> None:
+        await super().async_will_remove_from_hass()
+        self._async_stop_motion_frames()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self._async_track_motion()
+        self._async_write_if_changed()
+
+    @callback
+    def _async_track_motion(self) -> None:
+        """writes interpolated frames while the motion model estimates movement"""
+        if not self.coordinator.motion.moving(monotonic()):
+            self._async_stop_motion_frames()
+        elif self._unsub_motion_frames is None:
+            self._unsub_motion_frames = async_track_time_interval(
+                self.hass, self._async_motion_frame, MOTION_FRAME_INTERVAL
+            )
+
+    @callback
+    def _async_stop_motion_frames(self) -> None:
+        if self._unsub_motion_frames is not None:
+            self._unsub_motion_frames()
+            self._unsub_motion_frames = None
+
+    @callback
+    def _async_motion_frame(self, _now) -> None:
+        self._async_track_motion()
+        self._async_write_if_changed()
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        self._published_fingerprint = self._fingerprint()
+        self.state_writes += 1
+        self._api.metrics.count(self._api.host, STATE_WRITES)
+        super().async_write_ha_state()
+
+    @callback
+    def _async_write_if_changed(self) -> None:
+        if self._fingerprint() == self._published_fingerprint:
+            self.suppressed_state_writes += 1
+            self._api.metrics.count(self._api.host, SUPPRESSED_STATE_WRITES)
+            return
+        self.async_write_ha_state()
+
+    def _fingerprint(self) -> tuple:
+        return (
+            self.available,
+            self.state,
+            self.current_cover_position,
+            self.current_cover_tilt_position,
+        )
 
-    def _cover_state(self):
-        return _BLEBOX_TO_HASS_COVER_STATES[self._state().get("state")]
+    def _motion_estimate(self, estimate: Callable[[float], Optional[float]]) -> Optional[float]:
+        now = monotonic()
+        if not self.coordinator.motion.moving(now):
+            return None
+        return estimate(now)
 
-    def _desired_position(self):
-        return self._state().get("desiredPos")
+    async def _async_send(self, target: str, command):
+        """sends a command that is not debounced, like open or stop"""
+        await self.coordinator.async_send_command(target, command, debounce=False)
 
+    def _state(self) -> Optional[ShutterState]:
+        return self.coordinator.data
 
-_BLEBOX_TO_HASS_COVER_STATES = {
-    None: None,
-    0: STATE_CLOSING,  # moving down
-    1: STATE_OPENING,  # moving up
-    2: STATE_OPEN,  # manually stopped
-    3: STATE_CLOSED,  # lower limit
-    4: STATE_OPEN,  # upper limit / open
-}
+    def _device_info(self) -> dict[str:any]:
+        return self.hass.data[DOMAIN][self.coordinator.key][DEVICE_INFO] or {}
@@ -0,0 +1,56 @@
+"""Diagnostics support for BleBox shutterBox with tilt."""
+from dataclasses import asdict
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from . import entry_devices
+from .const import API_CLIENT
+from .const import CONF_IP_ADDRESS
+from .const import COORDINATOR
+from .const import DEVICE_INFO
+from .metrics import async_get_metrics
+
+TO_REDACT = {CONF_IP_ADDRESS, "ip", "id"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Returns the state, health and request metrics of the entry's device, or of every
+    device of a hub."""
+    entry_diagnostics = {"entry": async_redact_data(entry.as_dict(), TO_REDACT)}
+    devices = entry_devices(hass, entry.entry_id)
+    if entry.entry_id in devices:
+        entry_diagnostics.update(_device_diagnostics(devices[entry.entry_id]))
+    else:
+        entry_diagnostics["devices"] = [_device_diagnostics(device_data) for device_data in devices.values()]
+    if devices:
+        # across all devices of the integration
+        entry_diagnostics["endpoints"] = async_get_metrics(hass).endpoints_as_dict()
+    return entry_diagnostics
+
+
+def _device_diagnostics(device_data: dict) -> dict:
+    client = device_data[API_CLIENT]
+    coordinator = device_data[COORDINATOR]
+    health = client.health
+    return {
+        "device_info": async_redact_data(device_data[DEVICE_INFO] or {}, TO_REDACT),
+        "settings": None if client.settings is None else asdict(client.settings),
+        "supports_extended_state": client.supports_extended_state,
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "push_enabled": coordinator.push_enabled,
+            "state": None if coordinator.data is None else asdict(coordinator.data),
+            "motion_profile": asdict(coordinator.profile),
+        },
+        "health": {
+            "state": health.state,
+            "failures": health.failures,
+            "opened": health.opened,
+            "half_opened": health.half_opened,
+            "closed": health.closed,
+            "rejected": health.rejected,
+        },
+        "requests": client.metrics.device(client.host),
+    }
@@ -0,0 +1,67 @@
+"""Network scan discovering BleBox shutterBoxes."""
+import logging
+from ipaddress import IPv4Network
+from typing import List
+from typing import Optional
+
+import aiohttp
+from yarl import URL
+
+from .api import parse_device_info
+from .errors import InvalidDeviceTypeError
+from .fanout import async_fan_out
+from .fanout import FanOutResult
+from .transport import async_read_body
+from .transport import decode_json
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+MAX_SCAN_HOSTS = 1024
+SCAN_MAX_PARALLEL = 64
+PROBE_TIMEOUT = aiohttp.ClientTimeout(total=2, sock_connect=1, sock_read=1)
+
+
+async def async_scan_network(
+        session: aiohttp.ClientSession,
+        network: IPv4Network,
+        port: int,
+        max_parallel: int = SCAN_MAX_PARALLEL,
+) -> List[dict]:
+    """Probes /api/device/state on every host of the network.
+
+    Hosts are probed concurrently with short timeouts. Returns device infos of the
+    shutterBoxes found, deduplicated by device id, each with the probed address
+    in `ip`. Probes bypass the transport, so they neither take request slots of
+    the configured devices nor leave per-host limits and metrics behind.
+    """
+
+    async def probe(host: str) -> dict:
+        url = URL.build(scheme="http", host=host, port=port, path="/api/device/state")
+        async with session.get(url, timeout=PROBE_TIMEOUT) as response:
+            response.raise_for_status()
+            return parse_device_info(decode_json(await async_read_body(response)))
+
+    hosts = [str(host) for host in network.hosts()] or [str(network.network_address)]
+    results = await async_fan_out(hosts, probe, max_parallel)
+    devices = _unique_shutterboxes(results)
+    _LOGGER.debug("found %s shutterBoxes among %s hosts of %s", len(devices), len(hosts), network)
+    return devices
+
+
+def _unique_shutterboxes(results: List[FanOutResult]) -> List[dict]:
+    devices = {}
+    for result in results:
+        if not result.success:
+            if isinstance(result.error, InvalidDeviceTypeError):
+                _LOGGER.debug("%s is not a shutterBox", result.target)
+            continue
+        device = dict(result.result, ip=result.target)
+        devices.setdefault(device.get("id") or result.target, device)
+    return list(devices.values())
+
+
+def parse_network(value: str) -> Optional[IPv4Network]:
+    """the network of a CIDR range like 192.168.1.0/24, None for a single address"""
+    if "/" not in value:
+        return None
+    return IPv4Network(value.strip(), strict=False)
@@ -32,3 +32,10 @@ class InvalidDeviceTypeError(ErrorWithMessageId):
 
     def message_id(self) -> str:
         return "invalid_device_type"
+
+
+class InvalidResponseError(ErrorWithMessageId):
+    """Raised when the device response is too large or not a json object"""
+
+    def message_id(self) -> str:
+        return "invalid_response"
@@ -0,0 +1,60 @@
+"""Bounded parallel fan-out of operations over many shutterBoxes."""
+import asyncio
+from dataclasses import dataclass
+from time import monotonic
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Iterable
+from typing import List
+from typing import Optional
+
+DEFAULT_MAX_PARALLEL = 16
+
+
+@dataclass
+class FanOutResult:
+    """Outcome of the operation for a single target, `started` is None if it
+    never started"""
+
+    target: Any
+    started: Optional[float]
+    duration: float
+    result: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def success(self) -> bool:
+        """whether the operation completed without raising"""
+        return self.error is None
+
+
+async def async_fan_out(
+        targets: Iterable[Any],
+        operation: Callable[[Any], Awaitable],
+        max_parallel: int = DEFAULT_MAX_PARALLEL,
+        stagger: float = 0,
+) -> List[FanOutResult]:
+    """Runs `operation` for every target, at most `max_parallel` at a time.
+
+    With `stagger` the n-th operation starts no earlier than `n * stagger` seconds
+    after the fan-out began. Results are returned in the order of `targets`,
+    `started` is relative to the beginning of the fan-out.
+    """
+    slots = asyncio.Semaphore(max_parallel)
+    begin = monotonic()
+
+    async def run(index: int, target: Any) -> FanOutResult:
+        if stagger:
+            await asyncio.sleep(max(0.0, begin + index * stagger - monotonic()))
+        async with slots:
+            started = monotonic()
+            try:
+                result = await operation(target)
+            except Exception as ex:  # pylint: disable=broad-except
+                return FanOutResult(target, started - begin, monotonic() - started, error=ex)
+            return FanOutResult(target, started - begin, monotonic() - started, result)
+
+    return list(
+        await asyncio.gather(*[run(index, target) for index, target in enumerate(targets)])
+    )
@@ -0,0 +1,112 @@
+"""Synchronized moves of a group of shutterBoxes."""
+import asyncio
+from dataclasses import dataclass
+from functools import partial
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from .coordinator import ShutterboxDataUpdateCoordinator
+from .fanout import FanOutResult
+
+WARM_UP_TIMEOUT = 5.0
+
+# the command pipeline target and the api call of a device's part of the move, the
+# call takes an `on_sent` callback
+GroupCommand = Callable[
+    [ShutterboxDataUpdateCoordinator], Tuple[str, Callable[..., Awaitable]]
+]
+
+
+@dataclass
+class GroupMoveResult:
+    """Outcome of a group move.
+
+    `started` of every result is the moment its command last went out to the
+    device (the first attempt or its latest retry), relative to the release of
+    the barrier. Devices that couldn't be warmed up are not released
+    and have no `started`.
+    """
+
+    warm_up: float
+    results: List[FanOutResult]
+
+    @property
+    def skew(self) -> Optional[float]:
+        """seconds between the first and the last command sent, None if none was"""
+        started = [result.started for result in self.results if result.started is not None]
+        if not started:
+            return None
+        return max(started) - min(started)
+
+
+async def async_group_move(
+        coordinators: List[ShutterboxDataUpdateCoordinator],
+        command: GroupCommand,
+        warm_up_timeout: float = WARM_UP_TIMEOUT,
+) -> GroupMoveResult:
+    """Moves the devices together, so they start at (almost) the same time.
+
+    A keep-alive connection to every device is opened first, then the commands are
+    queued behind a barrier and released at once, so none of them waits for a
+    connection or for the commands before it. The transport sends at most
+    `MAX_CONCURRENT_REQUESTS` requests at a time, larger groups start in waves.
+    """
+    loop = asyncio.get_running_loop()
+    begin = loop.time()
+    warm_ups = await asyncio.gather(
+        *[
+            asyncio.wait_for(coordinator.api.async_warm_up(), warm_up_timeout)
+            for coordinator in coordinators
+        ],
+        return_exceptions=True,
+    )
+    barrier = asyncio.Event()
+    released = 0.0
+
+    async def send(coordinator: ShutterboxDataUpdateCoordinator) -> FanOutResult:
+        sent: Dict[str, float] = {}
+        target, device_command = command(coordinator)
+
+        def on_sent() -> None:
+            sent["started"] = loop.time()
+
+        await barrier.wait()
+        try:
+            await coordinator.async_send_command(
+                target, partial(device_command, on_sent=on_sent), debounce=False
+            )
+        except Exception as ex:  # pylint: disable=broad-except
+            error = ex
+        else:
+            error = None
+        started = sent.get("started")
+        return FanOutResult(
+            coordinator,
+            None if started is None else started - released,
+            loop.time() - released,
+            error=error,
+        )
+
+    tasks = [
+        asyncio.ensure_future(send(coordinator))
+        for coordinator, warm_up in zip(coordinators, warm_ups)
+        if not isinstance(warm_up, BaseException)
+    ]
+    # let every task reach the barrier before releasing it
+    await asyncio.sleep(0)
+    warm_up = loop.time() - begin
+    released = loop.time()
+    barrier.set()
+    sent = iter(await asyncio.gather(*tasks))
+
+    results = []
+    for coordinator, warm_up_error in zip(coordinators, warm_ups):
+        if isinstance(warm_up_error, BaseException):
+            results.append(FanOutResult(coordinator, None, 0.0, error=warm_up_error))
+        else:
+            results.append(next(sent))
+    return GroupMoveResult(warm_up, results)
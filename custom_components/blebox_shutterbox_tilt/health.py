@@ -0,0 +1,115 @@
+"""Health tracking of shutterBoxes, failing fast while a device is unreachable."""
+import asyncio
+import logging
+import random
+from time import monotonic
+from typing import Callable
+
+import aiohttp
+
+from .errors import CannotConnectToShutterBox
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+FAILURE_THRESHOLD = 3
+RECOVERY_BACKOFF = 5.0
+MAX_RECOVERY_BACKOFF = 300.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# errors meaning the device could not be reached, anything else got an answer from it
+UNREACHABLE_ERRORS = (asyncio.TimeoutError, aiohttp.ClientConnectionError)
+
+
+class CircuitOpenError(CannotConnectToShutterBox):
+    """Raised instead of sending a request to a device that is known to be unreachable"""
+
+
+class DeviceHealth:
+    """Circuit breaker of a single shutterBox.
+
+    After `failure_threshold` consecutive failures the circuit opens and requests
+    fail fast with `CircuitOpenError`. Once the recovery backoff passes, a single
+    probe request is let through (half-open): success closes the circuit, failure
+    opens it again with the backoff doubled, up to `max_backoff`. Backoffs are
+    jittered, so devices that failed together don't retry together. `host` names
+    the device in the logs.
+    """
+
+    def __init__(
+            self,
+            host: str,
+            failure_threshold: int = FAILURE_THRESHOLD,
+            backoff: float = RECOVERY_BACKOFF,
+            max_backoff: float = MAX_RECOVERY_BACKOFF,
+            clock: Callable[[], float] = monotonic,
+            jitter: Callable[[], float] = random.random,
+    ) -> None:
+        self._host = host
+        self._failure_threshold = failure_threshold
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._clock = clock
+        self._jitter = jitter
+        self.state = CLOSED
+        self.failures = 0
+        self.retry_at = 0.0
+        self._probing = False
+        self._recovery_attempts = 0
+        # metrics
+        self.opened = 0
+        self.half_opened = 0
+        self.closed = 0
+        self.rejected = 0
+
+    def before_request(self) -> None:
+        """raises `CircuitOpenError` when the request must not be sent"""
+        if self.state == CLOSED:
+            return
+        if self.state == OPEN and self._clock() >= self.retry_at:
+            self.state = HALF_OPEN
+            self.half_opened += 1
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        self.rejected += 1
+        raise CircuitOpenError()
+
+    def record_success(self) -> None:
+        """the device answered"""
+        self.failures = 0
+        self._probing = False
+        self._recovery_attempts = 0
+        if self.state != CLOSED:
+            self.state = CLOSED
+            self.closed += 1
+            _LOGGER.info("shutterBox %s is reachable again", self._host)
+
+    def record_failure(self) -> None:
+        """the device could not be reached"""
+        self.failures += 1
+        self._probing = False
+        if self.state == OPEN:  # a request sent before the circuit opened
+            return
+        if self.state == HALF_OPEN or self.failures >= self._failure_threshold:
+            self._open()
+
+    def record_cancelled(self) -> None:
+        """the request was cancelled before the device answered"""
+        self._probing = False
+
+    def _open(self) -> None:
+        backoff = min(self._max_backoff, self._backoff * 2 ** self._recovery_attempts)
+        self._recovery_attempts += 1
+        # equal jitter: at least half of the backoff, at most all of it
+        self.retry_at = self._clock() + backoff / 2 * (1 + self._jitter())
+        if self.state == CLOSED:
+            _LOGGER.warning(
+                "shutterBox %s is unreachable, failing fast for %.1f seconds",
+                self._host,
+                self.retry_at - self._clock(),
+            )
+        self.state = OPEN
+        self.opened += 1
@@ -0,0 +1,199 @@
+"""Request metrics of BleBox shutterBox with tilt, collected with an aiohttp TraceConfig."""
+import asyncio
+import re
+from bisect import bisect_left
+from collections import Counter
+from types import SimpleNamespace
+from typing import Dict
+from typing import Optional
+
+import aiohttp
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN_DATA
+
+METRICS = "metrics"
+
+# upper bounds (seconds) of the latency buckets, the last bucket is unbounded
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+DNS = "dns"
+CONNECT = "connect"
+TTFB = "ttfb"
+TOTAL = "total"
+PHASES = (DNS, CONNECT, TTFB, TOTAL)
+
+REQUESTS = "requests"
+ERRORS = "errors"
+RETRIES = "retries"
+HEDGES = "hedges"
+STATE_WRITES = "state_writes"
+SUPPRESSED_STATE_WRITES = "suppressed_state_writes"
+
+_NUMBER = re.compile(r"/\d+(?=/|$)")
+
+
+class Histogram:
+    """Latency histogram with fixed buckets, its size doesn't grow with the samples"""
+
+    __slots__ = ("buckets", "count", "sum", "max")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """adds a sample"""
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, quantile: float) -> Optional[float]:
+        """upper bound (seconds) of the bucket holding the quantile, None without samples"""
+        if not self.count:
+            return None
+        rank = quantile * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        """summary in milliseconds, for diagnostics"""
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * 1000, 1),
+            "p50_ms": round(self.quantile(0.5) * 1000, 1),
+            "p95_ms": round(self.quantile(0.95) * 1000, 1),
+            "max_ms": round(self.max * 1000, 1),
+            "buckets": {
+                **{f"le_{bound * 1000:g}ms": count for bound, count in zip(LATENCY_BUCKETS, self.buckets)},
+                "inf": self.buckets[-1],
+            },
+        }
+
+
+class RequestMetrics:
+    """Latency histograms per endpoint and per device, and counters per device.
+
+    Endpoints are paths with their numbers replaced, like `/s/p/{n}/`, so both
+    stay bounded. Only devices added by their entry's setup get histograms and
+    counters, other hosts (e.g. addresses checked by a config flow) only count
+    towards the endpoints.
+    """
+
+    def __init__(self) -> None:
+        self.endpoints: Dict[str, Dict[str, Histogram]] = {}
+        self.devices: Dict[str, Dict[str, Histogram]] = {}
+        self.counters: Dict[str, Counter] = {}
+
+    def add_device(self, device: str) -> None:
+        """starts recording per device metrics of a configured device"""
+        _histograms(self.devices, device)
+        self.counters.setdefault(device, Counter())
+
+    def remove_device(self, device: str) -> None:
+        """drops the metrics of a device that is no longer set up"""
+        self.devices.pop(device, None)
+        self.counters.pop(device, None)
+
+    def observe(self, device: str, endpoint: str, phase: str, seconds: float) -> None:
+        """records the latency of a request phase"""
+        _histograms(self.endpoints, endpoint)[phase].observe(seconds)
+        histograms = self.devices.get(device)
+        if histograms is not None:
+            histograms[phase].observe(seconds)
+
+    def count(self, device: str, counter: str, amount: int = 1) -> None:
+        """increments a counter of the device"""
+        counters = self.counters.get(device)
+        if counters is not None:
+            counters[counter] += amount
+
+    def device(self, device: str) -> dict:
+        """histograms and counters of a device, for diagnostics"""
+        return {
+            "latency": {
+                phase: histogram.as_dict()
+                for phase, histogram in self.devices.get(device, {}).items()
+            },
+            "counters": dict(self.counters.get(device, {})),
+        }
+
+    def latency(self, device: str, phase: str = TOTAL) -> Optional[Histogram]:
+        """latency histogram of a device, None unless the device was added"""
+        return self.devices.get(device, {}).get(phase)
+
+    def counter(self, device: str, counter: str) -> int:
+        """value of a counter of the device"""
+        return self.counters.get(device, {}).get(counter, 0)
+
+    def endpoints_as_dict(self) -> dict:
+        """histograms per endpoint, for diagnostics"""
+        return {
+            endpoint: {phase: histogram.as_dict() for phase, histogram in histograms.items()}
+            for endpoint, histograms in self.endpoints.items()
+        }
+
+
+def endpoint_of(path: str) -> str:
+    """the endpoint a request path belongs to, e.g. /s/p/{n}/ for /s/p/40/"""
+    return _NUMBER.sub("/{n}", path)
+
+
+def create_trace_config(metrics: RequestMetrics) -> aiohttp.TraceConfig:
+    """TraceConfig recording dns, connect and time to first byte of requests sent with a
+    `trace_request_ctx` carrying their `device` and `endpoint`"""
+    trace_config = aiohttp.TraceConfig()
+
+    def phase_start(name: str):
+        async def on_start(_session, context: SimpleNamespace, _params) -> None:
+            setattr(context, name, asyncio.get_running_loop().time())
+        return on_start
+
+    def phase_end(name: str, phase: str):
+        async def on_end(_session, context: SimpleNamespace, _params) -> None:
+            request = context.trace_request_ctx
+            started = getattr(context, name, None)
+            if request is None or started is None:
+                return
+            metrics.observe(
+                request.device,
+                request.endpoint,
+                phase,
+                asyncio.get_running_loop().time() - started,
+            )
+        return on_end
+
+    trace_config.on_request_start.append(phase_start("request_started"))
+    trace_config.on_request_end.append(phase_end("request_started", TTFB))
+    trace_config.on_dns_resolvehost_start.append(phase_start("dns_started"))
+    trace_config.on_dns_resolvehost_end.append(phase_end("dns_started", DNS))
+    trace_config.on_connection_create_start.append(phase_start("connect_started"))
+    trace_config.on_connection_create_end.append(phase_end("connect_started", CONNECT))
+    return trace_config
+
+
+@callback
+def async_get_metrics(hass: HomeAssistant) -> RequestMetrics:
+    """returns the integration-wide request metrics, creating them on first use"""
+    domain_data = hass.data.setdefault(DOMAIN_DATA, {})
+    metrics = domain_data.get(METRICS)
+    if metrics is None:
+        metrics = domain_data[METRICS] = RequestMetrics()
+    return metrics
+
+
+def _histograms(histograms: Dict[str, Dict[str, Histogram]], key: str) -> Dict[str, Histogram]:
+    phases = histograms.get(key)
+    if phases is None:
+        phases = histograms[key] = {phase: Histogram() for phase in PHASES}
+    return phases
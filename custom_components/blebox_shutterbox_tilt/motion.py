@@ -0,0 +1,73 @@
+"""Motion model estimating the live position of a moving shutterBox."""
+from typing import Optional
+
+from .api import ShutterState
+from .calibration import MotionProfile
+
+
+class _Axis:
+    """Interpolates a single axis (position or tilt) between observations"""
+
+    __slots__ = ("value", "target", "observed_at")
+
+    def __init__(self) -> None:
+        self.value: Optional[float] = None
+        self.target: Optional[float] = None
+        self.observed_at = 0.0
+
+    def observe(self, value: Optional[int], target: Optional[int], now: float) -> None:
+        self.value = value
+        self.target = target
+        self.observed_at = now
+
+    def estimate(self, now: float, full_time: float) -> Optional[float]:
+        if self.value is None or self.target is None:
+            return self.value
+        step = (now - self.observed_at) * 100 / full_time
+        if self.value < self.target:
+            return min(self.target, self.value + step)
+        return max(self.target, self.value - step)
+
+
+class MotionModel:
+    """Estimates position and tilt of a single shutterBox between polls.
+
+    Every state response anchors the model at the reported `currentPos`, while
+    the device reports motion the position moves from there towards `desiredPos`
+    at the speed given by the full travel and tilt times of the motion profile.
+    """
+
+    def __init__(self, profile: Optional[MotionProfile] = None) -> None:
+        self.profile = profile or MotionProfile()
+        self._position = _Axis()
+        self._tilt = _Axis()
+        self._moving = False
+
+    def observe(self, cover_state: Optional[ShutterState], now: float) -> None:
+        """reconciles the model with a state response received at monotonic time `now`"""
+        self._moving = cover_state is not None and cover_state.moving
+        position = cover_state and cover_state.position
+        tilt = cover_state and cover_state.tilt
+        if self._moving:
+            self._position.observe(position, cover_state.desired_position, now)
+            self._tilt.observe(tilt, cover_state.desired_tilt, now)
+        else:
+            self._position.observe(position, position, now)
+            self._tilt.observe(tilt, tilt, now)
+
+    def moving(self, now: float) -> bool:
+        """whether the estimate is still changing"""
+        if not self._moving:
+            return False
+        return (
+            self._position.estimate(now, self.profile.travel_time) != self._position.target
+            or self._tilt.estimate(now, self.profile.tilt_time) != self._tilt.target
+        )
+
+    def position(self, now: float) -> Optional[float]:
+        """estimated position in device units (0 is open)"""
+        return self._position.estimate(now, self.profile.travel_time)
+
+    def tilt(self, now: float) -> Optional[float]:
+        """estimated tilt"""
+        return self._tilt.estimate(now, self.profile.tilt_time)
@@ -1,15 +1,24 @@
 """options flow"""
 import logging
 
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
 
 from . import create_schema
+from . import device_key
+from . import entry_config
 from . import ShutterboxApiClient
+from .const import CONF_DEVICES
 from .const import CONF_IP_ADDRESS
 from .const import CONF_PORT
+from .const import CONF_PUSH_IDS
+from .const import CONF_REMOVE
+from .const import DEFAULT_PORT
 from .errors import ErrorWithMessageId
+from .push import push_path
+from .transport import async_get_session
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,14 +35,73 @@ class ShutterboxOptionsFlow(config_entries.OptionsFlow):
 
     async def async_step_init(self, user_input=None):  # pylint: disable=unused-argument
         """Manage the options."""
+        if CONF_DEVICES in entry_config(self.config_entry):
+            return await self.async_step_hub(user_input)
         return await self.async_step_user(user_input)
 
+    async def async_step_hub(self, user_input: dict = None):
+        """Adds a device to a hub or removes some of its devices."""
+        self._errors = {}
+        devices = entry_config(self.config_entry)[CONF_DEVICES]
+        if user_input is not None:
+            remove = set(user_input.get(CONF_REMOVE, []))
+            devices = [device for device in devices if _address(device) not in remove]
+            if user_input.get(CONF_IP_ADDRESS):
+                added = {
+                    CONF_IP_ADDRESS: user_input[CONF_IP_ADDRESS],
+                    CONF_PORT: user_input[CONF_PORT],
+                }
+                api = ShutterboxApiClient(
+                    added[CONF_IP_ADDRESS],
+                    added[CONF_PORT],
+                    async_get_session(self.hass),
+                    self.hass,
+                )
+                try:
+                    await api.async_get_device_info()
+                except ErrorWithMessageId as ex:
+                    _LOGGER.exception("Unable to update hub devices")
+                    self._errors = {'base': ex.message_id()}
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception("Unable to update hub devices")
+                    self._errors = {'base': 'unknown'}
+                else:
+                    if added not in devices:
+                        devices.append(added)
+            if not self._errors:
+                self.options[CONF_DEVICES] = devices
+                return self.async_create_entry(title="", data=self.options)
+
+        return self.async_show_form(
+            step_id="hub",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(CONF_IP_ADDRESS, default=""): str,
+                    vol.Optional(CONF_PORT, default=DEFAULT_PORT): int,
+                    vol.Optional(CONF_REMOVE, default=[]): cv.multi_select(
+                        {_address(device): _address(device) for device in devices}
+                    ),
+                }
+            ),
+            errors=self._errors,
+            description_placeholders={
+                "push_paths": "\n".join(
+                    f"{_address(device)}: {self._push_path(device_key(self.config_entry.entry_id, device))}"
+                    for device in devices
+                ),
+            },
+        )
+
     async def async_step_user(self, user_input: dict = None):
         """Handle a flow initialized by the user."""
-        session = async_create_clientsession(self.hass)
         self._errors = {}
         if user_input is not None:
-            api = ShutterboxApiClient(user_input[CONF_IP_ADDRESS], user_input[CONF_PORT], session, self.hass)
+            api = ShutterboxApiClient(
+                user_input[CONF_IP_ADDRESS],
+                user_input[CONF_PORT],
+                async_get_session(self.hass),
+                self.hass,
+            )
             try:
                 self.device_info = await api.async_get_device_info()
                 if user_input is not None:
@@ -51,18 +119,35 @@ class ShutterboxOptionsFlow(config_entries.OptionsFlow):
                 return self.async_show_form(
                     step_id="user",
                     data_schema=create_schema(user_input),
-                    errors=self._errors
+                    errors=self._errors,
+                    description_placeholders={
+                        "push_path": self._push_path(self.config_entry.entry_id),
+                    },
                 )
         else:
             return self.async_show_form(
                 step_id="user",
                 data_schema=create_schema(user_input),
-                errors=self._errors
+                errors=self._errors,
+                description_placeholders={
+                    "push_path": self._push_path(self.config_entry.entry_id),
+                },
             )
 
+    def _push_path(self, key: str) -> str:
+        """the path the device pushes its state changes to"""
+        push_id = self.config_entry.data.get(CONF_PUSH_IDS, {}).get(key)
+        if push_id is None:
+            return "-"
+        return push_path(push_id)
+
     async def _update_options(self):
         """Update config entry options."""
         return self.async_create_entry(
             title=self.device_info.get('deviceName'),
             data=self.options,
         )
+
+
+def _address(device: dict) -> str:
+    return f"{device[CONF_IP_ADDRESS]}:{device[CONF_PORT]}"
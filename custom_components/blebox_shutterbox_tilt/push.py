@@ -0,0 +1,155 @@
+"""Push receiver for BleBox shutterBox with tilt state changes."""
+import logging
+import secrets
+from http import HTTPStatus
+from ipaddress import ip_address
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from aiohttp import web
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.core import CALLBACK_TYPE
+from homeassistant.core import HomeAssistant
+from homeassistant.util.network import is_local
+
+from .api import ShutterState
+from .const import CONF_PUSH_IDS
+from .const import DOMAIN
+from .const import DOMAIN_DATA
+from .const import PUSH_URL
+from .coordinator import ShutterboxDataUpdateCoordinator
+from .errors import InvalidResponseError
+from .transport import decode_json
+from .transport import MAX_BODY_SIZE
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+PUSH_TARGETS = "push_targets"
+
+
+class ShutterboxPushView(HomeAssistantView):
+    """Receives state changes from shutterBox actions or a relay.
+
+    The shutterBox firmware has no subscription api, but its actions can call
+    a url when the shutter moves. A GET or an empty POST polls the device right
+    away, a POST with a /api/shutter/state body publishes that state without
+    polling. Updates are routed by the secret push id of the device and only
+    accepted from the local network.
+    """
+
+    url = PUSH_URL
+    name = f"api:{DOMAIN}:push"
+    requires_auth = False
+
+    def __init__(self, targets: Dict[str, ShutterboxDataUpdateCoordinator]) -> None:
+        self._targets = targets
+
+    async def get(self, request: web.Request, push_id: str) -> web.Response:
+        """a device reports that its state changed"""
+        coordinator, error = self._target(request, push_id)
+        if error is not None:
+            return error
+        coordinator.async_handle_push(None)
+        return self.json_message("ok")
+
+    async def post(self, request: web.Request, push_id: str) -> web.Response:
+        """a device or relay pushes its new state, or only that it changed"""
+        coordinator, error = self._target(request, push_id)
+        if error is not None:
+            return error
+        if request.content_length is not None and request.content_length > MAX_BODY_SIZE:
+            return self.json_message("body too large", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await request.read()
+        if not body:
+            coordinator.async_handle_push(None)
+            return self.json_message("ok")
+        try:
+            data = ShutterState.from_json(decode_json(body))
+        except InvalidResponseError:
+            data = None
+        if data is None:
+            return self.json_message("invalid shutter state", HTTPStatus.BAD_REQUEST)
+        coordinator.async_handle_push(data)
+        return self.json_message("ok")
+
+    def _target(
+            self,
+            request: web.Request,
+            push_id: str,
+    ) -> Tuple[Optional[ShutterboxDataUpdateCoordinator], Optional[web.Response]]:
+        if not _is_local(request):
+            return None, self.json_message("forbidden", HTTPStatus.FORBIDDEN)
+        coordinator = self._targets.get(push_id)
+        if coordinator is None:
+            return None, self.json_message("unknown device", HTTPStatus.NOT_FOUND)
+        _LOGGER.debug("push to %s", coordinator.api.host)
+        return coordinator, None
+
+
+def push_path(push_id: str) -> str:
+    """the path a device with the push id pushes its state changes to"""
+    return PUSH_URL.format(push_id=push_id)
+
+
+@callback
+def async_get_push_id(hass: HomeAssistant, entry: ConfigEntry, key: str) -> str:
+    """the secret push id of a device, generated and stored in the entry on first use"""
+    push_ids = entry.data.get(CONF_PUSH_IDS, {})
+    push_id = push_ids.get(key)
+    if push_id is None:
+        push_id = secrets.token_hex()
+        hass.config_entries.async_update_entry(
+            entry, data={**entry.data, CONF_PUSH_IDS: {**push_ids, key: push_id}}
+        )
+    return push_id
+
+
+@callback
+def async_forget_push_id(hass: HomeAssistant, entry: ConfigEntry, key: str) -> None:
+    """drops the push id of a device removed from the entry"""
+    push_ids = entry.data.get(CONF_PUSH_IDS, {})
+    if key in push_ids:
+        hass.config_entries.async_update_entry(
+            entry,
+            data={
+                **entry.data,
+                CONF_PUSH_IDS: {
+                    device: push_id for device, push_id in push_ids.items() if device != key
+                },
+            },
+        )
+
+
+@callback
+def async_register_push_target(
+        hass: HomeAssistant,
+        push_id: str,
+        coordinator: ShutterboxDataUpdateCoordinator,
+) -> CALLBACK_TYPE:
+    """routes pushes to the push id to the coordinator, returns a callback removing the route"""
+    domain_data = hass.data.setdefault(DOMAIN_DATA, {})
+    targets = domain_data.get(PUSH_TARGETS)
+    if targets is None:
+        targets = domain_data[PUSH_TARGETS] = {}
+        if hass.http is not None:
+            hass.http.register_view(ShutterboxPushView(targets))
+        else:
+            _LOGGER.debug("http is not set up, push updates are disabled")
+    targets[push_id] = coordinator
+
+    @callback
+    def async_remove() -> None:
+        if targets.get(push_id) is coordinator:
+            del targets[push_id]
+
+    return async_remove
+
+
+def _is_local(request: web.Request) -> bool:
+    try:
+        return is_local(ip_address(request.remote))
+    except ValueError:
+        return False
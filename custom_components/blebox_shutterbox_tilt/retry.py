@@ -0,0 +1,112 @@
+"""Retries of idempotent shutterBox requests within a deadline."""
+import asyncio
+import random
+from dataclasses import dataclass
+from time import monotonic
+from typing import Awaitable
+from typing import Callable
+from typing import Optional
+from typing import Tuple
+from typing import Type
+from typing import TypeVar
+
+from .health import UNREACHABLE_ERRORS
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How an idempotent request is retried.
+
+    Attempts are retried after a short, doubling and jittered backoff as long as
+    the `deadline` (seconds, for the whole call) allows. An attempt that hasn't
+    answered within `hedge_delay` gets a duplicate sent alongside it, whichever
+    answers first wins.
+    """
+
+    deadline: float = 5.0
+    backoff: float = 0.1
+    max_backoff: float = 1.0
+    hedge_delay: Optional[float] = 0.3
+
+
+# only for requests that can be repeated without changing the outcome, like
+# moving to an absolute position
+COMMAND_RETRY_POLICY = RetryPolicy()
+
+
+async def async_retry(
+        attempt: Callable[[bool, Callable[[], None]], Awaitable[T]],
+        policy: RetryPolicy,
+        retry_on: Tuple[Type[BaseException], ...] = UNREACHABLE_ERRORS,
+        clock: Callable[[], float] = monotonic,
+        sleep: Callable[[float], Awaitable] = asyncio.sleep,
+        on_retry: Optional[Callable[[], None]] = None,
+        on_hedge: Optional[Callable[[], None]] = None,
+) -> T:
+    """awaits `attempt(hedge, on_sent)` until it succeeds, fails with an error not in
+    `retry_on` or the deadline passes, `hedge` is true for the duplicate of a slow
+    attempt
+
+    An attempt calls `on_sent` once its request goes out, e.g. after waiting for a
+    connection slot, the hedge delay only runs from then on. When the deadline
+    passes during an attempt, the error of the previous attempt is raised.
+    `on_retry` and `on_hedge` are called for every retry and hedge sent.
+    """
+    deadline = clock() + policy.deadline
+    backoff = policy.backoff
+    error: Optional[BaseException] = None
+    while True:
+        task = asyncio.ensure_future(_async_hedged(attempt, policy.hedge_delay, on_hedge))
+        try:
+            done, _ = await asyncio.wait([task], timeout=max(deadline - clock(), 0))
+        finally:
+            task.cancel()
+        if not done:
+            raise error or asyncio.TimeoutError()
+        try:
+            return task.result()
+        except retry_on as ex:
+            error = ex
+            delay = backoff * (1 + random.random()) / 2
+            if clock() + delay >= deadline:
+                raise
+        await sleep(delay)
+        if on_retry is not None:
+            on_retry()
+        backoff = min(backoff * 2, policy.max_backoff)
+
+
+async def _async_hedged(
+        attempt: Callable[[bool, Callable[[], None]], Awaitable[T]],
+        hedge_delay: Optional[float],
+        on_hedge: Optional[Callable[[], None]],
+) -> T:
+    sent = asyncio.Event()
+    first = asyncio.ensure_future(attempt(False, sent.set))
+    if hedge_delay is None:
+        return await first
+    tasks = [first]
+    sending = asyncio.ensure_future(sent.wait())
+    try:
+        await asyncio.wait([first, sending], return_when=asyncio.FIRST_COMPLETED)
+        done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+        if not done:
+            if on_hedge is not None:
+                on_hedge()
+            tasks.append(asyncio.ensure_future(attempt(True, lambda: None)))
+        error: Optional[BaseException] = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception() or error
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        raise error
+    finally:
+        sending.cancel()
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,76 @@
+"""Adaptive polling schedule for BleBox shutterBox with tilt."""
+from datetime import timedelta
+from typing import Optional
+
+from .api import ShutterState
+from .calibration import MotionProfile
+from .const import IDLE_SCAN_INTERVAL
+from .const import MOVING_SCAN_INTERVAL
+from .const import SETTLE_SCAN_INTERVAL
+
+MIN_POLL_DELAY = 0.1
+
+
+class AdaptivePollScheduler:
+    """Decides when a single shutterBox should be polled next.
+
+    Polls at sub-second intervals while the shutter moves, aiming the last poll
+    at the moment the shutter is predicted to reach `desiredPos` according to
+    the travel time of its motion profile. Once it stops,
+    the delay doubles on every poll until it reaches the idle interval.
+    """
+
+    def __init__(
+            self,
+            moving_interval: timedelta = MOVING_SCAN_INTERVAL,
+            settle_interval: timedelta = SETTLE_SCAN_INTERVAL,
+            idle_interval: timedelta = IDLE_SCAN_INTERVAL,
+            profile: Optional[MotionProfile] = None,
+    ) -> None:
+        self._moving_interval = moving_interval.total_seconds()
+        self._settle_interval = settle_interval.total_seconds()
+        self._idle_interval = idle_interval.total_seconds()
+        self._idle_delay = self._idle_interval
+        self._moving = False
+        self._eta: Optional[float] = None
+        self.profile = profile or MotionProfile()
+
+    @property
+    def moving(self) -> bool:
+        """whether the last observed state reported motion"""
+        return self._moving
+
+    def observe(self, cover_state: Optional[ShutterState], now: float) -> None:
+        """feeds a state response received at monotonic time `now`"""
+        if cover_state is None or not cover_state.moving:
+            if self._moving:
+                self._idle_delay = self._settle_interval
+            self._moving = False
+            self._eta = None
+            return
+
+        self._eta = self._predict_end(cover_state.position, cover_state.desired_position)
+        self._moving = True
+        self._idle_delay = self._settle_interval
+
+    def set_idle_interval(self, idle_interval: timedelta) -> None:
+        """changes how often an idle shutter is polled, e.g. once it pushes its changes"""
+        self._idle_interval = idle_interval.total_seconds()
+
+    def next_delay(self) -> float:
+        """seconds until the next poll"""
+        if self._moving:
+            if self._eta is not None:
+                return max(MIN_POLL_DELAY, min(self._moving_interval, self._eta))
+            return self._moving_interval
+        delay = self._idle_delay
+        self._idle_delay = min(self._idle_delay * 2, self._idle_interval)
+        return delay
+
+    def _predict_end(self, position: Optional[int], desired: Optional[int]) -> Optional[float]:
+        if position is None or desired is None:
+            return None
+        remaining = abs(desired - position)
+        if remaining == 0:
+            return None
+        return remaining * self.profile.travel_time / 100
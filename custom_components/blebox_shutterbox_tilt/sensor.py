@@ -0,0 +1,148 @@
+"""Diagnostic sensors of BleBox shutterBox with tilt, disabled by default."""
+from dataclasses import dataclass
+from typing import Callable
+from typing import Optional
+
+from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorEntityDescription
+from homeassistant.components.sensor import SensorStateClass
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.entity import EntityCategory
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from . import entry_devices
+from .api import ShutterboxApiClient
+from .const import COORDINATOR
+from .const import DEVICE_INFO
+from .const import DOMAIN
+from .const import SIGNAL_DEVICE_ADDED
+from .coordinator import ShutterboxDataUpdateCoordinator
+from .metrics import ERRORS
+from .metrics import RETRIES
+from .metrics import STATE_WRITES
+
+
+@dataclass
+class _ValueMixin:
+    value_fn: Callable[[ShutterboxApiClient], Optional[float]]
+
+
+@dataclass
+class ShutterboxSensorEntityDescription(SensorEntityDescription, _ValueMixin):
+    """Describes a request metric exposed as a sensor."""
+
+
+def _latency_p95(client: ShutterboxApiClient) -> Optional[float]:
+    latency = client.metrics.latency(client.host)
+    p95 = latency.quantile(0.95) if latency is not None else None
+    return None if p95 is None else round(p95 * 1000, 1)
+
+
+SENSORS = (
+    ShutterboxSensorEntityDescription(
+        key="request_latency",
+        name="Request latency",
+        native_unit_of_measurement="ms",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_latency_p95,
+    ),
+    ShutterboxSensorEntityDescription(
+        key="request_errors",
+        name="Request errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda client: client.metrics.counter(client.host, ERRORS),
+    ),
+    ShutterboxSensorEntityDescription(
+        key="request_retries",
+        name="Request retries",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda client: client.metrics.counter(client.host, RETRIES),
+    ),
+    ShutterboxSensorEntityDescription(
+        key="state_writes",
+        name="State writes",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda client: client.metrics.counter(client.host, STATE_WRITES),
+    ),
+)
+
+
+async def async_setup_entry(
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        async_add_devices: AddEntitiesCallback,
+):
+    """Setup sensor platform."""
+    async_add_devices(
+        [
+            BleboxShutterboxMetricSensor(device_data[COORDINATOR], entry, description)
+            for device_data in entry_devices(hass, entry.entry_id).values()
+            for description in SENSORS
+        ]
+    )
+
+    @callback
+    def _async_add_device(key: str) -> None:
+        coordinator = hass.data[DOMAIN][key][COORDINATOR]
+        async_add_devices(
+            [BleboxShutterboxMetricSensor(coordinator, entry, description) for description in SENSORS]
+        )
+
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_DEVICE_ADDED.format(entry_id=entry.entry_id),
+            _async_add_device,
+        )
+    )
+
+
+class BleboxShutterboxMetricSensor(CoordinatorEntity, SensorEntity):
+    """Request metric of a shutterBox, updated along with its state.
+
+    The value of the 95th percentile latency is the upper bound of its
+    histogram bucket.
+    """
+
+    entity_description: ShutterboxSensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+            self,
+            coordinator: ShutterboxDataUpdateCoordinator,
+            config_entry: ConfigEntry,
+            description: ShutterboxSensorEntityDescription,
+    ):
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._config_entry = config_entry
+        self._attr_unique_id = f"{coordinator.key}_{description.key}"
+
+    @property
+    def available(self) -> bool:
+        # metrics are known while the device is unreachable too
+        return True
+
+    @property
+    def name(self) -> Optional[str]:
+        device_name = self._device_info().get("deviceName")
+        if device_name is None:
+            return self.entity_description.name
+        return f"{device_name} {self.entity_description.name}"
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        return DeviceInfo(identifiers={(DOMAIN, self.coordinator.key)})
+
+    @property
+    def native_value(self) -> Optional[float]:
+        return self.entity_description.value_fn(self.coordinator.api)
+
+    def _device_info(self) -> dict:
+        return self.hass.data[DOMAIN][self.coordinator.key][DEVICE_INFO] or {}
@@ -0,0 +1,213 @@
+"""Integration-level services for BleBox shutterBox with tilt."""
+import logging
+from functools import partial
+from time import monotonic
+from typing import List
+
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
+from homeassistant.components.cover import ATTR_POSITION
+from homeassistant.components.cover import ATTR_TILT_POSITION
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant
+from homeassistant.core import ServiceCall
+from homeassistant.helpers import entity_registry
+
+from .commands import TARGET_POSITION
+from .commands import TARGET_TILT
+from .const import ATTR_COMMAND
+from .const import ATTR_MAX_PARALLEL
+from .const import ATTR_STAGGER
+from .const import COMMAND_CLOSE
+from .const import COMMAND_OPEN
+from .const import COMMAND_STOP
+from .const import COORDINATOR
+from .const import DOMAIN
+from .const import EVENT_BULK_COMMAND_RESULT
+from .const import EVENT_GROUP_MOVE_RESULT
+from .const import SERVICE_BULK_COMMAND
+from .const import SERVICE_GROUP_MOVE
+from .coordinator import ShutterboxDataUpdateCoordinator
+from .fanout import async_fan_out
+from .fanout import DEFAULT_MAX_PARALLEL
+from .group import async_group_move
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+POSITION_SCHEMA = vol.All(vol.Coerce(int), vol.Range(min=0, max=100))
+
+BULK_COMMAND_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+            vol.Optional(ATTR_POSITION): POSITION_SCHEMA,
+            vol.Optional(ATTR_TILT_POSITION): POSITION_SCHEMA,
+            vol.Optional(ATTR_MAX_PARALLEL, default=DEFAULT_MAX_PARALLEL): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=256)
+            ),
+            vol.Optional(ATTR_STAGGER, default=0): vol.All(
+                vol.Coerce(float), vol.Range(min=0, max=10)
+            ),
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_POSITION, ATTR_TILT_POSITION),
+)
+
+
+GROUP_MOVE_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+            vol.Exclusive(ATTR_POSITION, "move"): POSITION_SCHEMA,
+            vol.Exclusive(ATTR_TILT_POSITION, "move"): POSITION_SCHEMA,
+            vol.Exclusive(ATTR_COMMAND, "move"): vol.In(
+                [COMMAND_OPEN, COMMAND_CLOSE, COMMAND_STOP]
+            ),
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_POSITION, ATTR_TILT_POSITION, ATTR_COMMAND),
+)
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """registers integration services, once for all config entries"""
+    if hass.services.has_service(DOMAIN, SERVICE_BULK_COMMAND):
+        return
+
+    async def async_bulk_command(call: ServiceCall) -> None:
+        await async_handle_bulk_command(hass, call)
+
+    async def async_group_move(call: ServiceCall) -> None:
+        await async_handle_group_move(hass, call)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_BULK_COMMAND, async_bulk_command, schema=BULK_COMMAND_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_GROUP_MOVE, async_group_move, schema=GROUP_MOVE_SCHEMA
+    )
+
+
+def async_unload_services(hass: HomeAssistant) -> None:
+    """removes integration services once the last config entry is unloaded"""
+    if hass.data.get(DOMAIN):
+        return
+    hass.services.async_remove(DOMAIN, SERVICE_BULK_COMMAND)
+    hass.services.async_remove(DOMAIN, SERVICE_GROUP_MOVE)
+
+
+async def async_handle_bulk_command(hass: HomeAssistant, call: ServiceCall) -> None:
+    """Sends the position and/or tilt to many shutterBoxes with bounded parallelism.
+
+    Per-device timing and success are fired as an `EVENT_BULK_COMMAND_RESULT` event.
+    """
+    coordinators = _target_coordinators(hass, call.data.get(ATTR_ENTITY_ID))
+    position = call.data.get(ATTR_POSITION)
+    tilt = call.data.get(ATTR_TILT_POSITION)
+
+    async def move(coordinator: ShutterboxDataUpdateCoordinator) -> None:
+        await coordinator.async_move(position, tilt, debounce=False)
+
+    begin = monotonic()
+    results = await async_fan_out(
+        coordinators,
+        move,
+        max_parallel=call.data[ATTR_MAX_PARALLEL],
+        stagger=call.data[ATTR_STAGGER],
+    )
+    duration = monotonic() - begin
+    failed = sum(1 for result in results if not result.success)
+    _LOGGER.debug(
+        "bulk command sent to %d devices in %.3f s, %d failed",
+        len(results),
+        duration,
+        failed,
+    )
+    hass.bus.async_fire(
+        EVENT_BULK_COMMAND_RESULT,
+        {
+            "duration": duration,
+            "failed": failed,
+            "results": [
+                {
+                    "entry_id": result.target.entry_id,
+                    "device": result.target.key,
+                    "success": result.success,
+                    "started": result.started,
+                    "duration": result.duration,
+                    "error": None if result.success else repr(result.error),
+                }
+                for result in results
+            ],
+        },
+        context=call.context,
+    )
+
+
+async def async_handle_group_move(hass: HomeAssistant, call: ServiceCall) -> None:
+    """Opens, closes, stops, positions or tilts the shutterBoxes together.
+
+    The start skew of the group and per-device timing and success are fired as
+    an `EVENT_GROUP_MOVE_RESULT` event.
+    """
+    coordinators = _target_coordinators(hass, call.data[ATTR_ENTITY_ID])
+    position = call.data.get(ATTR_POSITION)
+    tilt = call.data.get(ATTR_TILT_POSITION)
+    command = call.data.get(ATTR_COMMAND)
+
+    def group_command(coordinator: ShutterboxDataUpdateCoordinator):
+        api = coordinator.api
+        if position is not None:
+            return TARGET_POSITION, partial(api.async_set_cover_position, 100 - position)
+        if tilt is not None:
+            return TARGET_TILT, partial(api.async_set_cover_tilt_position, tilt)
+        return TARGET_POSITION, {
+            COMMAND_OPEN: api.async_open_cover,
+            COMMAND_CLOSE: api.async_close_cover,
+            COMMAND_STOP: api.async_stop_cover,
+        }[command]
+
+    result = await async_group_move(coordinators, group_command)
+    failed = sum(1 for device_result in result.results if not device_result.success)
+    _LOGGER.debug(
+        "group move of %d devices started within %s s after a %.3f s warm up, %d failed",
+        len(result.results),
+        None if result.skew is None else f"{result.skew:.3f}",
+        result.warm_up,
+        failed,
+    )
+    hass.bus.async_fire(
+        EVENT_GROUP_MOVE_RESULT,
+        {
+            "skew": result.skew,
+            "warm_up": result.warm_up,
+            "failed": failed,
+            "results": [
+                {
+                    "entry_id": device_result.target.entry_id,
+                    "device": device_result.target.key,
+                    "success": device_result.success,
+                    "started": device_result.started,
+                    "duration": device_result.duration,
+                    "error": None if device_result.success else repr(device_result.error),
+                }
+                for device_result in result.results
+            ],
+        },
+        context=call.context,
+    )
+
+
+def _target_coordinators(hass: HomeAssistant, entity_ids) -> List[ShutterboxDataUpdateCoordinator]:
+    devices = hass.data.get(DOMAIN, {})
+    if entity_ids is None:
+        keys = list(devices)
+    else:
+        registry = entity_registry.async_get(hass)
+        keys = []
+        for entity_id in entity_ids:
+            registry_entry = registry.async_get(entity_id)
+            # the unique id of a cover is the key of its device
+            if registry_entry is not None and registry_entry.unique_id in devices:
+                keys.append(registry_entry.unique_id)
+    return [devices[key][COORDINATOR] for key in dict.fromkeys(keys)]
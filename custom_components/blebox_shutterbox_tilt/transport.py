@@ -0,0 +1,221 @@
+"""HTTP transport shared by all BleBox shutterBox api clients."""
+import asyncio
+from types import SimpleNamespace
+from typing import Callable
+from typing import Dict
+from typing import Optional
+
+import aiohttp
+from aiohttp import hdrs
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from yarl import URL
+
+from .const import DOMAIN_DATA
+from .errors import InvalidResponseError
+from .metrics import async_get_metrics
+from .metrics import create_trace_config
+from .metrics import endpoint_of
+from .metrics import ERRORS
+from .metrics import REQUESTS
+from .metrics import TOTAL
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # orjson is optional, it only speeds up decoding
+    from json import loads as json_loads
+
+TIMEOUT = 10
+CONNECT_TIMEOUT = 3
+READ_TIMEOUT = 5
+MAX_CONCURRENT_REQUESTS = 32
+MAX_CONNECTIONS_PER_HOST = 1
+# hedges may be in flight next to the requests they duplicate
+MAX_HEDGES_PER_HOST = 1
+# device responses are well below 1 KiB
+MAX_BODY_SIZE = 16 * 1024
+READ_CHUNK_SIZE = 4 * 1024
+
+TRANSPORT_LIMITS = "transport_limits"
+SESSION = "session"
+
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(
+    total=TIMEOUT,
+    sock_connect=CONNECT_TIMEOUT,
+    sock_read=READ_TIMEOUT,
+)
+
+
+class TransportLimits:
+    """Concurrency limits shared by every api client of the integration"""
+
+    def __init__(
+            self,
+            max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+            max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST,
+            max_hedges_per_host: int = MAX_HEDGES_PER_HOST,
+    ) -> None:
+        self.requests = asyncio.Semaphore(max_concurrent_requests)
+        self._max_connections_per_host = max_connections_per_host
+        self._max_hedges_per_host = max_hedges_per_host
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self._hedges: Dict[str, asyncio.Semaphore] = {}
+
+    def host(self, host: str) -> asyncio.Semaphore:
+        """slots for requests to a single device"""
+        slots = self._hosts.get(host)
+        if slots is None:
+            slots = self._hosts[host] = asyncio.Semaphore(self._max_connections_per_host)
+        return slots
+
+    def hedge(self, host: str) -> asyncio.Semaphore:
+        """extra slots of a single device, only for hedges"""
+        slots = self._hedges.get(host)
+        if slots is None:
+            slots = self._hedges[host] = asyncio.Semaphore(self._max_hedges_per_host)
+        return slots
+
+
+def async_get_transport_limits(hass: HomeAssistant) -> TransportLimits:
+    """returns integration-wide transport limits, creating them on first use"""
+    domain_data = hass.data.setdefault(DOMAIN_DATA, {})
+    limits = domain_data.get(TRANSPORT_LIMITS)
+    if limits is None:
+        limits = domain_data[TRANSPORT_LIMITS] = TransportLimits()
+    return limits
+
+
+@callback
+def async_get_session(hass: HomeAssistant) -> aiohttp.ClientSession:
+    """Returns the pooled session shared by config flows, options flows and polling.
+
+    It is created on first use and closed on shutdown, not when the entry that
+    happened to create it is unloaded. Timeouts are applied per request by
+    `ShutterboxTransport`. Requests are traced into the integration's `RequestMetrics`.
+    """
+    domain_data = hass.data.setdefault(DOMAIN_DATA, {})
+    session = domain_data.get(SESSION)
+    if session is None:
+        session = domain_data[SESSION] = async_create_clientsession(
+            hass,
+            auto_cleanup=False,
+            trace_configs=[create_trace_config(async_get_metrics(hass))],
+        )
+
+        async def _async_close_session(_event) -> None:
+            await session.close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close_session)
+    return session
+
+
+class ShutterboxTransport:
+    """Issues requests to a single shutterBox.
+
+    Requests go through the integration's pooled session, so connections are kept
+    alive and reused between polls and commands. At most
+    `MAX_CONNECTIONS_PER_HOST` requests, plus `MAX_HEDGES_PER_HOST` hedges, are
+    in flight per device and `MAX_CONCURRENT_REQUESTS` across the integration,
+    every request is bounded by connect, read and total timeouts.
+
+    Bodies are read as raw bytes up to `MAX_BODY_SIZE` and decoded once,
+    with orjson when it is installed.
+    """
+
+    def __init__(
+            self,
+            session: aiohttp.ClientSession,
+            hass: HomeAssistant,
+            host: str,
+    ) -> None:
+        self._session = session
+        self._limits = async_get_transport_limits(hass)
+        self._metrics = async_get_metrics(hass)
+        self._host = host
+
+    async def async_get_json(self, url: URL) -> dict:
+        """GETs the url and decodes the json body"""
+        return await self.async_request_json("GET", url)
+
+    async def async_request_json(
+            self,
+            method: str,
+            url: URL,
+            data: Optional[str] = None,
+            headers: Optional[dict] = None,
+            hedge: bool = False,
+            on_sent: Optional[Callable[[], None]] = None,
+    ) -> dict:
+        """sends the request and decodes the json body, `on_sent` is called once
+        it got its slots and goes out
+
+        A `hedge` duplicates a slow request that still holds the device's
+        connection slot, so it takes one of the device's hedge slots instead.
+        """
+        slots = self._limits.hedge(self._host) if hedge else self._limits.host(self._host)
+        async with slots, self._limits.requests:
+            if on_sent is not None:
+                on_sent()
+            body = await self._async_request(method, url, data, headers)
+        return decode_json(body)
+
+    async def _async_request(
+            self,
+            method: str,
+            url: URL,
+            data: Optional[str],
+            headers: Optional[dict],
+    ) -> bytes:
+        endpoint = endpoint_of(url.path)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self._metrics.count(self._host, REQUESTS)
+        try:
+            async with self._session.request(
+                    method,
+                    url,
+                    data=data,
+                    headers=headers,
+                    timeout=REQUEST_TIMEOUT,
+                    trace_request_ctx=SimpleNamespace(device=self._host, endpoint=endpoint),
+            ) as response:
+                response.raise_for_status()
+                body = await async_read_body(response)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._metrics.count(self._host, ERRORS)
+            raise
+        self._metrics.observe(self._host, endpoint, TOTAL, loop.time() - started)
+        return body
+
+
+def decode_json(body: bytes) -> dict:
+    """decodes a json object, raising `InvalidResponseError` for anything else"""
+    try:
+        json = json_loads(body)
+    except ValueError as ex:
+        raise InvalidResponseError() from ex
+    if not isinstance(json, dict):
+        raise InvalidResponseError()
+    return json
+
+
+async def async_read_body(response: aiohttp.ClientResponse) -> bytes:
+    """reads a response body, raising `InvalidResponseError` past MAX_BODY_SIZE"""
+    content_length = response.headers.get(hdrs.CONTENT_LENGTH)
+    if content_length is not None:
+        try:
+            size = int(content_length)
+        except ValueError as ex:
+            raise InvalidResponseError() from ex
+        if size > MAX_BODY_SIZE:
+            raise InvalidResponseError()
+    body = bytearray()
+    async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+        body += chunk
+        if len(body) > MAX_BODY_SIZE:
+            raise InvalidResponseError()
+    return bytes(body)
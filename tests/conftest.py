@@ -24,12 +24,18 @@ def auto_enable_custom_integrations(enable_custom_integrations):
     yield
 
 
-# This fixture, when used, will result in calls to async_get_device_info to return None. To have the call
+# This fixture, when used, will result in calls to async_get_device_info and async_get_cover_state to return None. To have the call
 # return a value, we would add the `return_value=<VALUE_TO_RETURN>` parameter to the patch call.
 @pytest.fixture(name="bypass_get_data")
 def bypass_get_data_fixture():
     """Skip calls to get data from API."""
-    with patch("custom_components.blebox_shutterbox_tilt.ShutterboxApiClient.async_get_device_info"):
+    with patch(
+            "custom_components.blebox_shutterbox_tilt.ShutterboxApiClient.async_get_device_info",
+            return_value=None,
+    ), patch(
+            "custom_components.blebox_shutterbox_tilt.ShutterboxApiClient.async_get_cover_state",
+            return_value=None,
+    ):
         yield
 
 
@@ -3,3 +3,14 @@ from custom_components.blebox_shutterbox_tilt.const import CONF_IP_ADDRESS
 from custom_components.blebox_shutterbox_tilt.const import CONF_PORT
 
 MOCK_CONFIG = {CONF_IP_ADDRESS: "192.168.1.123", CONF_PORT: 80}
+
+
+def shutter_state(position: int, state: int = 2) -> dict:
+    """a /api/shutter/state body of a shutter at the position (0 is open)"""
+    return {
+        "shutter": {
+            "state": state,
+            "currentPos": {"position": position, "tilt": 50},
+            "desiredPos": {"position": position, "tilt": 50},
+        }
+    }
@@ -0,0 +1,291 @@
+"""Local shutterBox simulator for BleBox shutterBox with tilt tests.
+
+Every virtual device listens on its own 127.0.0.1 port and implements the subset of
+the shutterBox api used by the integration. Motion is modelled over time, each
+device handles a single request at a time (like the ESP firmware does), and
+firmware latency and random failures can be configured.
+
+It can also run outside of the test suite:
+
+    python -m tests.simulator --devices 200 --latency 0.05 --failure-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+from time import monotonic
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from aiohttp import web
+
+STATE_MOVING_DOWN = 0
+STATE_MOVING_UP = 1
+STATE_STOPPED = 2
+STATE_LOWER_LIMIT = 3
+STATE_UPPER_LIMIT = 4
+
+
+class SimulatedShutterbox:
+    """Motion model and request handling of a single virtual shutterBox.
+
+    Positions use the device convention: 0 is fully open, 100 fully closed.
+    """
+
+    def __init__(
+            self,
+            device_id: str,
+            travel_time: float = 10.0,
+            tilt_time: float = 1.0,
+            latency: float = 0.0,
+            failure_rate: float = 0.0,
+            api_level: str = "20190911",
+            extended_state: bool = True,
+            rng: Optional[random.Random] = None,
+    ) -> None:
+        self.device_id = device_id
+        self.travel_time = travel_time
+        self.tilt_time = tilt_time
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.api_level = api_level
+        self.extended_state = extended_state
+        self.port: Optional[int] = None
+        self.requests: List[str] = []
+        self.request_times: List[float] = []
+        self._rng = rng or random.Random(device_id)
+        self._lock = asyncio.Lock()
+        self._position = 0.0
+        self._tilt = 0.0
+        self._desired_position = 0.0
+        self._desired_tilt = 0.0
+        self._updated = monotonic()
+
+    @property
+    def position(self) -> int:
+        """current position after advancing the motion model"""
+        self._advance()
+        return round(self._position)
+
+    @property
+    def tilt(self) -> int:
+        """current tilt after advancing the motion model"""
+        self._advance()
+        return round(self._tilt)
+
+    def move_to(self, position: float) -> None:
+        """starts moving towards the position"""
+        self._advance()
+        self._desired_position = min(100.0, max(0.0, position))
+
+    def tilt_to(self, tilt: float) -> None:
+        """starts tilting towards the tilt"""
+        self._advance()
+        self._desired_tilt = min(100.0, max(0.0, tilt))
+
+    def stop(self) -> None:
+        """stops the motion where it is"""
+        self._advance()
+        self._desired_position = self._position
+        self._desired_tilt = self._tilt
+
+    def state(self) -> int:
+        """shutterBox state code for the current motion"""
+        self._advance()
+        if self._desired_position > self._position:
+            return STATE_MOVING_DOWN
+        if self._desired_position < self._position:
+            return STATE_MOVING_UP
+        if self._position >= 100:
+            return STATE_LOWER_LIMIT
+        if self._position <= 0:
+            return STATE_UPPER_LIMIT
+        return STATE_STOPPED
+
+    def shutter_json(self) -> dict:
+        """body of /api/shutter/state"""
+        state = self.state()
+        return {
+            "shutter": {
+                "state": state,
+                "currentPos": {"position": round(self._position), "tilt": round(self._tilt)},
+                "desiredPos": {
+                    "position": round(self._desired_position),
+                    "tilt": round(self._desired_tilt),
+                },
+            }
+        }
+
+    def extended_json(self) -> dict:
+        """body of /api/shutter/extended/state"""
+        body = self.shutter_json()
+        tilt_time_ms = round(self.tilt_time * 1000)
+        body["shutter"].update(
+            {
+                "controlType": 3,
+                "calibrationParameters": {
+                    "isCalibrated": 1,
+                    "maxTiltTimeUpMs": tilt_time_ms,
+                    "maxTiltTimeDownMs": tilt_time_ms,
+                },
+            }
+        )
+        return body
+
+    def settings_json(self) -> dict:
+        """body of /api/settings/state"""
+        shutter = self.extended_json()["shutter"]
+        return {
+            "settings": {
+                "deviceName": f"Simulated shutterBox {self.device_id}",
+                "shutter": {
+                    "controlType": shutter["controlType"],
+                    "moveTimeoutMs": round(self.travel_time * 1000 * 2),
+                    "calibrationParameters": shutter["calibrationParameters"],
+                },
+            }
+        }
+
+    def device_json(self) -> dict:
+        """body of /api/device/state"""
+        return {
+            "device": {
+                "deviceName": f"Simulated shutterBox {self.device_id}",
+                "type": "shutterBox",
+                "product": "shutterBox",
+                "apiLevel": self.api_level,
+                "id": self.device_id,
+                "ip": "127.0.0.1",
+            }
+        }
+
+    async def async_handle(self, request: web.Request) -> web.Response:
+        """handles one request at a time, like the device firmware"""
+        async with self._lock:
+            self.requests.append(request.path)
+            self.request_times.append(monotonic())
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.failure_rate and self._rng.random() < self.failure_rate:
+                raise web.HTTPInternalServerError()
+            body = await self._async_dispatch(request)
+        return web.json_response(body)
+
+    async def _async_dispatch(self, request: web.Request) -> dict:
+        path = request.path
+        if path == "/api/device/state":
+            return self.device_json()
+        if path == "/api/settings/state":
+            return self.settings_json()
+        if path == "/api/shutter/extended/state":
+            if not self.extended_state:
+                raise web.HTTPNotFound()
+            return self.extended_json()
+        if path == "/api/shutter/set":
+            desired = (await request.json()).get("shutter", {}).get("desiredPos", {})
+            if "position" in desired:
+                self.move_to(desired["position"])
+            if "tilt" in desired:
+                self.tilt_to(desired["tilt"])
+        elif path == "/s/u/":
+            self.move_to(0)
+        elif path == "/s/d/":
+            self.move_to(100)
+        elif path == "/s/s/":
+            self.stop()
+        elif path.startswith("/s/p/"):
+            self.move_to(int(request.match_info["value"]))
+        elif path.startswith("/s/t/"):
+            self.tilt_to(int(request.match_info["value"]))
+        return self.shutter_json()
+
+    def _advance(self) -> None:
+        now = monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._position = _approach(self._position, self._desired_position, elapsed * 100 / self.travel_time)
+        self._tilt = _approach(self._tilt, self._desired_tilt, elapsed * 100 / self.tilt_time)
+
+
+def _approach(current: float, target: float, step: float) -> float:
+    if current < target:
+        return min(target, current + step)
+    return max(target, current - step)
+
+
+class ShutterboxSimulator:
+    """Runs many virtual shutterBoxes, each on its own local port."""
+
+    def __init__(self, host: str = "127.0.0.1") -> None:
+        self.host = host
+        self.devices: List[SimulatedShutterbox] = []
+        self._by_port: Dict[int, SimulatedShutterbox] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    async def async_start(self, count: int, **device_kwargs) -> List[SimulatedShutterbox]:
+        """starts `count` devices configured with `device_kwargs`"""
+        app = web.Application()
+        for path in (
+                "/api/device/state",
+                "/api/shutter/state",
+                "/api/shutter/extended/state",
+                "/api/settings/state",
+                "/s/u/",
+                "/s/d/",
+                "/s/s/",
+        ):
+            app.router.add_get(path, self._async_handle)
+        app.router.add_get("/s/p/{value}/", self._async_handle)
+        app.router.add_get("/s/t/{value}", self._async_handle)
+        app.router.add_post("/api/shutter/set", self._async_handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        for index in range(count):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.bind((self.host, 0))
+            device = SimulatedShutterbox(f"sim{index:04d}", **device_kwargs)
+            device.port = sock.getsockname()[1]
+            await web.SockSite(self._runner, sock).start()
+            self.devices.append(device)
+            self._by_port[device.port] = device
+        return self.devices
+
+    async def async_stop(self) -> None:
+        """stops all devices"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _async_handle(self, request: web.Request) -> web.Response:
+        port = request.transport.get_extra_info("sockname")[1]
+        return await self._by_port[port].async_handle(request)
+
+
+async def _async_main(args: argparse.Namespace) -> None:
+    simulator = ShutterboxSimulator(args.host)
+    devices = await simulator.async_start(
+        args.devices,
+        travel_time=args.travel_time,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+    )
+    print(json.dumps([{"id": device.device_id, "port": device.port} for device in devices]))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.async_stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--travel-time", type=float, default=10.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    try:
+        asyncio.run(_async_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
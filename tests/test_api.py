@@ -1,14 +1,37 @@
 """Tests for BleBox shutterBox with tilt api."""
 import asyncio
+import json
+import tracemalloc
 
 import pytest
 from _pytest.logging import LogCaptureFixture
 from custom_components.blebox_shutterbox_tilt.api import ShutterboxApiClient
+from custom_components.blebox_shutterbox_tilt.api import ShutterSettings
+from custom_components.blebox_shutterbox_tilt.api import ShutterState
 from custom_components.blebox_shutterbox_tilt.errors import CannotConnectToShutterBox
 from custom_components.blebox_shutterbox_tilt.errors import InvalidDeviceTypeError
+from custom_components.blebox_shutterbox_tilt.errors import InvalidResponseError
 from custom_components.blebox_shutterbox_tilt.errors import NoDeviceInfoError
+from custom_components.blebox_shutterbox_tilt.transport import decode_json
+from custom_components.blebox_shutterbox_tilt.transport import MAX_BODY_SIZE
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMockResponse
+
+from .simulator import ShutterboxSimulator
+
+ENTITIES = 1000
+POLLS = 5
+
+CAPTURED_DEVICE_STATE = (
+    b'{"device":{"deviceName":"My ShutterBox","type":"shutterBox","fv":"0.970",'
+    b'"hv":"0.7","apiLevel":"20180604","id":"f12a29130ce","ip":"192.168.2.184",'
+    b'"availableFv":null}}'
+)
+CAPTURED_SHUTTER_STATE = (
+    b'{"shutter":{"state":2,"currentPos":{"position":92,"tilt":100},'
+    b'"desiredPos":{"position":92,"tilt":100},"favPos":{"position":240,"tilt":50}}}'
+)
 
 
 async def test_api(hass, aioclient_mock: AiohttpClientMocker, caplog: LogCaptureFixture):
@@ -43,9 +66,15 @@ async def test_api(hass, aioclient_mock: AiohttpClientMocker, caplog: LogCapture
     )
     assert (await api.async_get_device_info()).get("deviceName") == "My ShutterBox"
 
-    aioclient_mock.get("http://192.168.1.123/api/shutter/state", json={
+    aioclient_mock.get("http://192.168.1.123/api/shutter/extended/state", json={
         "shutter": {
             "state": 2,
+            "controlType": 3,
+            "calibrationParameters": {
+                "isCalibrated": 1,
+                "maxTiltTimeUpMs": 1410,
+                "maxTiltTimeDownMs": 1400
+            },
             "currentPos": {
                 "position": 92,
                 "tilt": 100
@@ -61,7 +90,11 @@ async def test_api(hass, aioclient_mock: AiohttpClientMocker, caplog: LogCapture
         }
     })
 
-    assert (await api.async_get_cover_state()).get("shutter") is not None
+    state = await api.async_get_cover_state()
+    assert (state.position, state.tilt, state.cover_position) == (92, 100, 8)
+    assert state.is_opening is False and state.cover_state == "open"
+    assert api.settings == ShutterSettings(control_type=3, tilt_time=1.41)
+    assert api.settings.supports_tilt
 
     aioclient_mock.clear_requests()
     aioclient_mock.get(
@@ -88,3 +121,151 @@ async def test_api(hass, aioclient_mock: AiohttpClientMocker, caplog: LogCapture
     )
     with pytest.raises(InvalidDeviceTypeError):
         await api.async_get_device_info()
+
+
+async def test_requests_to_one_device_are_serialized(hass, aioclient_mock: AiohttpClientMocker):
+    """Only one request is in flight per device while other devices proceed."""
+    in_flight = {}
+    max_in_flight = {}
+
+    async def slow_state(method, url, data):
+        in_flight[url.host] = in_flight.get(url.host, 0) + 1
+        max_in_flight[url.host] = max(max_in_flight.get(url.host, 0), in_flight[url.host])
+        await asyncio.sleep(0.01)
+        in_flight[url.host] -= 1
+        return AiohttpClientMockResponse(method, url, json={"shutter": {"state": 2}})
+
+    session = async_get_clientsession(hass)
+    apis = [ShutterboxApiClient(f"192.168.1.{index}", 80, session, hass) for index in range(1, 4)]
+    for index in range(1, 4):
+        aioclient_mock.get(f"http://192.168.1.{index}/api/shutter/state", side_effect=slow_state)
+
+    await asyncio.gather(*[api.async_get_cover_state() for api in apis for _ in range(5)])
+
+    assert aioclient_mock.call_count == 15
+    assert max_in_flight == {"192.168.1.1": 1, "192.168.1.2": 1, "192.168.1.3": 1}
+
+
+async def test_set_position_and_tilt(hass, aioclient_mock: AiohttpClientMocker):
+    """Position and tilt are sent in one request when the firmware supports it."""
+    api = ShutterboxApiClient("192.168.1.123", 80, async_get_clientsession(hass), hass)
+    moving = {"shutter": {"state": 0, "desiredPos": {"position": 30, "tilt": 50}}}
+    aioclient_mock.get(
+        "http://192.168.1.123/api/device/state",
+        json={"device": {"type": "shutterBox", "apiLevel": "20190911"}},
+    )
+    aioclient_mock.post("http://192.168.1.123/api/shutter/set", json=moving)
+    await api.async_get_device_info()
+
+    assert await api.async_set_cover_position_and_tilt(30, 50) == ShutterState.from_json(moving)
+    method, url, data, _ = aioclient_mock.mock_calls[-1]
+    assert (method, url.path) == ("POST", "/api/shutter/set")
+    assert json.loads(data) == {"shutter": {"desiredPos": {"position": 30, "tilt": 50}}}
+
+
+async def test_configured_port_is_used(hass, aioclient_mock: AiohttpClientMocker):
+    """Requests go to the configured port."""
+    api = ShutterboxApiClient("192.168.1.123", 8080, async_get_clientsession(hass), hass)
+    aioclient_mock.get("http://192.168.1.123:8080/api/shutter/state", json={"shutter": {"state": 2}})
+    aioclient_mock.get("http://192.168.1.123:8080/s/p/40/", json={"shutter": {"state": 0}})
+
+    await api.async_get_cover_state()
+    await api.async_set_cover_position(40)
+
+    assert [str(call[1]) for call in aioclient_mock.mock_calls] == [
+        "http://192.168.1.123:8080/api/shutter/state",
+        "http://192.168.1.123:8080/s/p/40/",
+    ]
+
+
+def test_shutter_state_is_cheaper_than_raw_json():
+    """Parsed states of 1,000 entities take less than half the memory of the raw json."""
+    payloads = [_state_payload(index % 101, index % 5) for index in range(ENTITIES)]
+
+    tracemalloc.start()
+    raw = [json.loads(payload) for payload in payloads]
+    raw_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    parsed = [ShutterState.from_json(json.loads(payload)) for payload in payloads]
+    parsed_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    assert len(parsed) == len(raw)
+    assert parsed_memory < raw_memory / 2
+    assert not hasattr(parsed[0], "__dict__")
+
+
+def _state_payload(position: int, state: int) -> str:
+    return json.dumps({
+        "shutter": {
+            "state": state,
+            "currentPos": {"position": position, "tilt": 50},
+            "desiredPos": {"position": position, "tilt": 50},
+            "favPos": {"position": 240, "tilt": 50},
+        }
+    })
+
+
+async def test_malformed_responses_raise_typed_errors(hass, aioclient_mock: AiohttpClientMocker):
+    """Malformed, non-object and oversized bodies and malformed lengths raise InvalidResponseError."""
+    api = ShutterboxApiClient("192.168.1.123", 80, async_get_clientsession(hass), hass)
+
+    for body in (b"{\"shutter\": ", b"[1, 2]", b"{\"shutter\": \"up\"}", b" " * (MAX_BODY_SIZE + 1)):
+        aioclient_mock.clear_requests()
+        aioclient_mock.get("http://192.168.1.123/api/shutter/state", content=body)
+        with pytest.raises(InvalidResponseError):
+            await api.async_get_cover_state()
+
+    aioclient_mock.clear_requests()
+    aioclient_mock.get(
+        "http://192.168.1.123/api/shutter/state",
+        content=b"{}",
+        headers={"Content-Length": "many"},
+    )
+    with pytest.raises(InvalidResponseError):
+        await api.async_get_cover_state()
+
+    aioclient_mock.clear_requests()
+    aioclient_mock.get("http://192.168.1.123/api/device/state", content=b"<html></html>")
+    with pytest.raises(InvalidResponseError):
+        await api.async_get_device_info()
+
+
+def test_decode_captured_payloads():
+    """Decoding captured shutterBox payloads from bytes matches the stdlib decoder."""
+    payloads = [CAPTURED_DEVICE_STATE, CAPTURED_SHUTTER_STATE] * (ENTITIES // 2)
+
+    stdlib = [ShutterState.from_json(json.loads(payload.decode())) for payload in payloads[1::2]]
+    decoded = [ShutterState.from_json(decode_json(payload)) for payload in payloads[1::2]]
+    assert decoded == stdlib
+
+
+async def test_richest_state_endpoint_is_polled(hass, socket_enabled):
+    """Each poll is a single request, extended where the firmware has it."""
+    simulator = ShutterboxSimulator()
+    extended, old_firmware, missing = await simulator.async_start(3, tilt_time=1.5)
+    old_firmware.api_level = "20180604"
+    missing.extended_state = False
+    try:
+        clients = []
+        for device in simulator.devices:
+            client = ShutterboxApiClient(
+                "127.0.0.1", device.port, async_get_clientsession(hass), hass
+            )
+            await client.async_get_device_info()
+            clients.append(client)
+
+        for _ in range(POLLS):
+            for client in clients:
+                assert (await client.async_get_cover_state()).position == 0
+
+        polls = ["/api/device/state"] + ["/api/shutter/extended/state"] * POLLS
+        assert extended.requests == polls
+        assert old_firmware.requests == ["/api/device/state"] + ["/api/shutter/state"] * POLLS
+        # the first poll finds out the extended state is missing
+        assert missing.requests == polls[:2] + ["/api/shutter/state"] * POLLS
+        assert clients[0].settings == ShutterSettings(control_type=3, tilt_time=1.5)
+        assert clients[1].settings is None and clients[2].settings is None
+    finally:
+        await simulator.async_stop()
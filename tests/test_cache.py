@@ -0,0 +1,153 @@
+"""Tests for BleBox shutterBox with tilt device cache."""
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch
+
+from custom_components.blebox_shutterbox_tilt.api import ShutterSettings
+from custom_components.blebox_shutterbox_tilt.const import API_CLIENT
+from custom_components.blebox_shutterbox_tilt.const import CACHE_VALIDATION_WINDOW
+from custom_components.blebox_shutterbox_tilt.const import CONF_IP_ADDRESS
+from custom_components.blebox_shutterbox_tilt.const import CONF_PORT
+from custom_components.blebox_shutterbox_tilt.const import COORDINATOR
+from custom_components.blebox_shutterbox_tilt.const import DOMAIN
+from custom_components.blebox_shutterbox_tilt.coordinator import refresh_offset
+from homeassistant.components.cover import CoverEntityFeature
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMockResponse
+
+from .const import MOCK_CONFIG
+
+ENTRIES = 300
+LATENCY = 0.02
+SETTINGS = {
+    "settings": {
+        "deviceName": "Blind",
+        "shutter": {
+            "controlType": 1,
+            "moveTimeoutMs": 20000,
+            "calibrationParameters": {
+                "isCalibrated": 1,
+                "maxTiltTimeUpMs": 1200,
+                "maxTiltTimeDownMs": 1000,
+            },
+        },
+    }
+}
+
+
+async def _async_setup_all(hass, entries) -> None:
+    assert all(
+        await asyncio.gather(
+            *[hass.config_entries.async_setup(entry.entry_id) for entry in entries]
+        )
+    )
+    await hass.async_block_till_done()
+
+
+async def test_startup_from_cache(hass, aioclient_mock: AiohttpClientMocker):
+    """300 entries set up from the cache without waiting for their devices."""
+
+    async def device(method, url, data):
+        await asyncio.sleep(LATENCY)
+        if url.path == "/api/device/state":
+            body = {"device": {"deviceName": f"Blind {url.host}", "type": "shutterBox", "id": url.host}}
+        elif url.path == "/api/settings/state":
+            body = SETTINGS
+        else:
+            body = {"shutter": {"state": 3, "desiredPos": {"position": 100, "tilt": 20}}}
+        return AiohttpClientMockResponse(method, url, json=body)
+
+    entries = []
+    for index in range(ENTRIES):
+        host = f"10.0.{index // 250}.{index % 250 + 1}"
+        aioclient_mock.get(f"http://{host}/api/device/state", side_effect=device)
+        aioclient_mock.get(f"http://{host}/api/shutter/state", side_effect=device)
+        aioclient_mock.get(f"http://{host}/api/settings/state", side_effect=device)
+        entry = MockConfigEntry(
+            domain=DOMAIN, data={CONF_IP_ADDRESS: host, CONF_PORT: 80}, entry_id=host
+        )
+        entry.add_to_hass(hass)
+        entries.append(entry)
+
+    await _async_setup_all(hass, entries)
+    assert aioclient_mock.call_count >= 2 * ENTRIES
+    for entry in entries:
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    aioclient_mock.clear_requests()
+    for entry in entries:
+        for path in ("/api/device/state", "/api/shutter/state"):
+            aioclient_mock.get(f"http://{entry.entry_id}{path}", side_effect=device)
+
+    first_delays = {}
+
+    def call_later(hass, delay, job):
+        first_delays.setdefault(job.target.__self__.key, delay)
+        return async_call_later(hass, delay, job)
+
+    with patch(
+            "custom_components.blebox_shutterbox_tilt.coordinator.async_call_later",
+            side_effect=call_later,
+    ):
+        await _async_setup_all(hass, entries)
+
+    # the first polls validating the cached states are spread over CACHE_VALIDATION_WINDOW
+    window = CACHE_VALIDATION_WINDOW.total_seconds()
+    assert first_delays == {
+        entry.entry_id: refresh_offset(entry.entry_id, CACHE_VALIDATION_WINDOW)
+        for entry in entries
+    }
+    assert min(first_delays.values()) < window / 10
+    assert max(first_delays.values()) > window * 9 / 10
+    state = hass.states.get("cover.blind_10_0_0_1")
+    assert state.state == "closed"
+    assert state.attributes["current_tilt_position"] == 20
+
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + CACHE_VALIDATION_WINDOW + timedelta(seconds=1)
+    )
+    await hass.async_block_till_done()
+    assert aioclient_mock.call_count == 2 * ENTRIES
+
+    for entry in entries:
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_settings_are_cached_until_options_change(hass, aioclient_mock: AiohttpClientMocker):
+    """Settings are fetched once, drive the motion timing and are refetched after an options change."""
+    aioclient_mock.get(
+        "http://192.168.1.123/api/device/state",
+        json={"device": {"deviceName": "My ShutterBox", "type": "shutterBox", "id": "f12a29130ce"}},
+    )
+    aioclient_mock.get(
+        "http://192.168.1.123/api/shutter/state",
+        json={"shutter": {"state": 2, "desiredPos": {"position": 30, "tilt": 50}}},
+    )
+    aioclient_mock.get("http://192.168.1.123/api/settings/state", json=SETTINGS)
+    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    entry.add_to_hass(hass)
+
+    def settings_requests() -> int:
+        return sum(1 for call in aioclient_mock.mock_calls if call[1].path == "/api/settings/state")
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id][COORDINATOR]
+    assert (coordinator.profile.travel_time, coordinator.profile.tilt_time) == (20.0, 1.2)
+    features = hass.states.get("cover.my_shutterbox").attributes["supported_features"]
+    assert not features & CoverEntityFeature.SET_TILT_POSITION
+    assert settings_requests() == 1
+
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert hass.data[DOMAIN][entry.entry_id][API_CLIENT].settings == ShutterSettings(1, 1.2, 20.0)
+    assert settings_requests() == 1
+
+    hass.config_entries.async_update_entry(entry, options={**MOCK_CONFIG, CONF_PORT: 8080})
+    await hass.async_block_till_done()
+    assert settings_requests() == 2
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,71 @@
+"""Tests for BleBox shutterBox with tilt motion calibration."""
+from datetime import timedelta
+
+from custom_components.blebox_shutterbox_tilt.api import ShutterState
+from custom_components.blebox_shutterbox_tilt.calibration import MotionCalibrator
+from custom_components.blebox_shutterbox_tilt.calibration import MotionProfile
+from custom_components.blebox_shutterbox_tilt.calibration import STORAGE_KEY
+from custom_components.blebox_shutterbox_tilt.calibration import STORAGE_SAVE_DELAY
+from custom_components.blebox_shutterbox_tilt.const import CONF_IP_ADDRESS
+from custom_components.blebox_shutterbox_tilt.const import CONF_PORT
+from custom_components.blebox_shutterbox_tilt.const import COORDINATOR
+from custom_components.blebox_shutterbox_tilt.const import DOMAIN
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+
+def _state(state: int, position: int, tilt: int = 0) -> ShutterState:
+    return ShutterState.from_json(
+        {"shutter": {"state": state, "currentPos": {"position": position, "tilt": tilt}}}
+    )
+
+
+def test_travel_and_tilt_times_are_learned_from_samples():
+    """Full travel and tilt times are inferred from when motion started and ended."""
+    updates = []
+    profile = MotionProfile(travel_time=30, tilt_time=2)
+    calibrator = MotionCalibrator(profile, lambda: updates.append(True))
+
+    calibrator.observe(_state(1, 100), now=0)
+    calibrator.observe(_state(1, 60), now=8)
+    calibrator.observe(_state(4, 0), now=20)
+    assert profile.travel_time == 20
+    assert profile.travel_samples == 1
+
+    calibrator.observe(_state(0, 0), now=30)
+    calibrator.observe(_state(2, 10), now=40)
+    assert profile.travel_time == 20
+
+    calibrator.observe(_state(0, 0, tilt=0), now=50)
+    calibrator.observe(_state(2, 0, tilt=50), now=51.5)
+    assert profile.tilt_time == 3
+    assert len(updates) == 2
+
+
+async def test_profiles_are_persisted_and_reloaded(hass, hass_storage, bypass_get_data):
+    """A stored profile is used at setup without measuring the blind again."""
+    hass_storage[STORAGE_KEY] = {
+        "version": 1,
+        "key": STORAGE_KEY,
+        "data": {
+            "blind": {"travel_time": 12.0, "tilt_time": 1.5, "travel_samples": 3, "tilt_samples": 1}
+        },
+    }
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_IP_ADDRESS: "192.168.1.1", CONF_PORT: 80},
+        entry_id="blind",
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+
+    coordinator = hass.data[DOMAIN]["blind"][COORDINATOR]
+    assert coordinator.motion.profile.travel_time == 12.0
+    assert coordinator.scheduler.profile is coordinator.motion.profile
+
+    coordinator.calibrator.observe(_state(1, 100), now=0)
+    coordinator.calibrator.observe(_state(4, 0), now=10)
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=STORAGE_SAVE_DELAY + 1))
+    await hass.async_block_till_done()
+    assert hass_storage[STORAGE_KEY]["data"]["blind"]["travel_time"] == 11.0
@@ -0,0 +1,204 @@
+"""Tests for BleBox shutterBox with tilt command pipeline."""
+import asyncio
+
+from custom_components.blebox_shutterbox_tilt.commands import CommandPipeline
+from custom_components.blebox_shutterbox_tilt.commands import TARGET_POSITION
+from custom_components.blebox_shutterbox_tilt.commands import TARGET_POSITION_AND_TILT
+from custom_components.blebox_shutterbox_tilt.commands import TARGET_TILT
+from custom_components.blebox_shutterbox_tilt.const import COORDINATOR
+from custom_components.blebox_shutterbox_tilt.const import DOMAIN
+from custom_components.blebox_shutterbox_tilt.const import SERVICE_SET_POSITION_AND_TILT
+from homeassistant.components.cover import ATTR_POSITION
+from homeassistant.components.cover import ATTR_TILT_POSITION
+from homeassistant.const import ATTR_ENTITY_ID
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+
+from .const import MOCK_CONFIG
+
+BURST = 100
+
+
+class FakeDevice:
+    """Records commands and how many of them overlapped."""
+
+    def __init__(self):
+        self.sent = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def command(self, name: str, value: int):
+        async def send():
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.sent.append((name, value))
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            return {"shutter": {name: value}}
+
+        return send
+
+
+async def test_burst_is_coalesced_to_last_value(hass):
+    """100 slider moves in a burst result in one request for the last value."""
+    device = FakeDevice()
+    pipeline = CommandPipeline(hass)
+
+    responses = await asyncio.gather(
+        *[pipeline.async_submit(TARGET_POSITION, device.command("p", value)) for value in range(BURST)]
+    )
+
+    assert device.sent == [("p", BURST - 1)]
+    assert all(response == {"shutter": {"p": BURST - 1}} for response in responses)
+
+
+async def test_commands_during_request_are_delivered_after_it(hass):
+    """One request is in flight at a time and the last target is always sent."""
+    device = FakeDevice()
+    pipeline = CommandPipeline(hass, debounce=0)
+
+    first = hass.async_create_task(pipeline.async_submit(TARGET_POSITION, device.command("p", 0)))
+    await asyncio.sleep(0.001)
+    later = [
+        pipeline.async_submit(TARGET_POSITION, device.command("p", value)) for value in range(1, BURST)
+    ] + [pipeline.async_submit(TARGET_TILT, device.command("t", 50))]
+    await asyncio.gather(first, *later)
+
+    assert device.sent == [("p", 0), ("p", BURST - 1), ("t", 50)]
+    assert device.max_in_flight == 1
+
+
+async def test_combined_command_replaces_pending_position_and_tilt(hass):
+    """A combined command supersedes waiting position and tilt commands."""
+    device = FakeDevice()
+    pipeline = CommandPipeline(hass)
+
+    responses = await asyncio.gather(
+        pipeline.async_submit(TARGET_POSITION, device.command("p", 10)),
+        pipeline.async_submit(TARGET_TILT, device.command("t", 20)),
+        pipeline.async_submit(
+            TARGET_POSITION_AND_TILT,
+            device.command("pt", 30),
+            replaces=(TARGET_POSITION, TARGET_TILT),
+        ),
+    )
+
+    assert device.sent == [("pt", 30)]
+    assert responses == [{"shutter": {"pt": 30}}] * 3
+
+
+async def test_cover_slider_burst_sends_few_requests(hass, aioclient_mock: AiohttpClientMocker):
+    """Dragging the position and tilt sliders sends one request per target."""
+    aioclient_mock.get(
+        "http://192.168.1.123/api/device/state",
+        json={"device": {"deviceName": "My ShutterBox", "type": "shutterBox", "id": "f12a29130ce"}},
+    )
+    aioclient_mock.get("http://192.168.1.123/api/shutter/state", json={"shutter": {"state": 2}})
+    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    aioclient_mock.clear_requests()
+    aioclient_mock.get("http://192.168.1.123/s/p/0/", json={"shutter": {"state": 1}})
+    aioclient_mock.get("http://192.168.1.123/s/t/99", json={"shutter": {"state": 2}})
+
+    for value in range(BURST):
+        await hass.services.async_call(
+            "cover",
+            "set_cover_position",
+            {ATTR_ENTITY_ID: "cover.my_shutterbox", ATTR_POSITION: value + 1},
+        )
+        await hass.services.async_call(
+            "cover",
+            "set_cover_tilt_position",
+            {ATTR_ENTITY_ID: "cover.my_shutterbox", ATTR_TILT_POSITION: value},
+        )
+    await hass.async_block_till_done()
+
+    assert [call[1].path for call in aioclient_mock.mock_calls] == ["/s/p/0/", "/s/t/99"]
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_cover_position_and_tilt_service(hass, aioclient_mock: AiohttpClientMocker):
+    """The combined service moves and tilts the cover in one request."""
+    aioclient_mock.get(
+        "http://192.168.1.123/api/device/state",
+        json={"device": {"deviceName": "My ShutterBox", "type": "shutterBox", "apiLevel": "20190911"}},
+    )
+    aioclient_mock.get("http://192.168.1.123/api/shutter/extended/state", json={"shutter": {"state": 2}})
+    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    aioclient_mock.clear_requests()
+    aioclient_mock.post("http://192.168.1.123/api/shutter/set", json={"shutter": {"state": 0}})
+
+    await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SET_POSITION_AND_TILT,
+        {ATTR_ENTITY_ID: "cover.my_shutterbox", ATTR_POSITION: 0, ATTR_TILT_POSITION: 50},
+        blocking=True,
+    )
+
+    assert aioclient_mock.call_count == 1
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def _async_setup_old_firmware(hass, aioclient_mock: AiohttpClientMocker):
+    aioclient_mock.get(
+        "http://192.168.1.123/api/device/state",
+        json={"device": {"deviceName": "My ShutterBox", "type": "shutterBox", "apiLevel": "20180604"}},
+    )
+    aioclient_mock.get("http://192.168.1.123/api/shutter/state", json={"shutter": {"state": 2}})
+    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    aioclient_mock.clear_requests()
+    aioclient_mock.get("http://192.168.1.123/api/shutter/state", json={"shutter": {"state": 2}})
+    aioclient_mock.get("http://192.168.1.123/s/p/100/", json={"shutter": {"state": 0}})
+    aioclient_mock.get("http://192.168.1.123/s/t/50", json={"shutter": {"state": 2}})
+    aioclient_mock.get("http://192.168.1.123/s/s/", json={"shutter": {"state": 2}})
+    await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SET_POSITION_AND_TILT,
+        {ATTR_ENTITY_ID: "cover.my_shutterbox", ATTR_POSITION: 0, ATTR_TILT_POSITION: 50},
+        blocking=True,
+    )
+    return entry
+
+
+async def test_fallback_tilt_waits_for_the_move(hass, aioclient_mock: AiohttpClientMocker):
+    """Without the combined set, the tilt is sent once a poll sees the move has ended."""
+    entry = await _async_setup_old_firmware(hass, aioclient_mock)
+    coordinator = hass.data[DOMAIN][entry.entry_id][COORDINATOR]
+    assert [call[1].path for call in aioclient_mock.mock_calls] == ["/s/p/100/"]
+
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    assert [call[1].path for call in aioclient_mock.mock_calls] == [
+        "/s/p/100/",
+        "/api/shutter/state",
+        "/s/t/50",
+    ]
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_stop_drops_fallback_tilt(hass, aioclient_mock: AiohttpClientMocker):
+    """A stop during the move is sent right away and the tilt is never sent."""
+    entry = await _async_setup_old_firmware(hass, aioclient_mock)
+    coordinator = hass.data[DOMAIN][entry.entry_id][COORDINATOR]
+
+    await hass.services.async_call(
+        "cover", "stop_cover", {ATTR_ENTITY_ID: "cover.my_shutterbox"}, blocking=True
+    )
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    assert [call[1].path for call in aioclient_mock.mock_calls] == [
+        "/s/p/100/",
+        "/s/s/",
+        "/api/shutter/state",
+    ]
+    assert await hass.config_entries.async_unload(entry.entry_id)
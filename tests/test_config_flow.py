@@ -1,17 +1,33 @@
 """Test BleBox shutterBox with tilt config flow."""
+import asyncio
+import gc
+import os
+from ipaddress import IPv4Network
 from unittest.mock import patch
 
+import aiohttp
 import pytest
 from custom_components.blebox_shutterbox_tilt.const import CONF_IP_ADDRESS
 from custom_components.blebox_shutterbox_tilt.const import CONF_PORT
 from custom_components.blebox_shutterbox_tilt.const import DOMAIN
+from custom_components.blebox_shutterbox_tilt.discovery import async_scan_network
+from custom_components.blebox_shutterbox_tilt.discovery import SCAN_MAX_PARALLEL
+from custom_components.blebox_shutterbox_tilt.metrics import async_get_metrics
+from custom_components.blebox_shutterbox_tilt.transport import async_get_session
+from custom_components.blebox_shutterbox_tilt.transport import async_get_transport_limits
+from custom_components.blebox_shutterbox_tilt.transport import MAX_CONCURRENT_REQUESTS
 from homeassistant import config_entries
 from homeassistant import data_entry_flow
 from homeassistant.core import HomeAssistant
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMockResponse
 
 from .const import MOCK_CONFIG
+from .simulator import ShutterboxSimulator
+
+PROBE_LATENCY = 0.1
+SUBMISSIONS = 1000
 
 
 # This fixture bypasses the actual setup of the integration
@@ -131,3 +147,141 @@ async def test_options_flow(hass: HomeAssistant, aioclient_mock: AiohttpClientMo
 
     # Verify that the options were updated
     assert entry.options == {CONF_PORT: 8080, CONF_IP_ADDRESS: "192.168.1.123"}
+
+
+async def test_network_scan_adds_devices_in_bulk(hass, aioclient_mock: AiohttpClientMocker):
+    """A /24 scan probes hosts concurrently, keeps unique shutterBoxes and adds them."""
+    shutterboxes = range(10, 30)
+    in_flight = 0
+    max_in_flight = 0
+
+    async def device_state(method, url, data):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(PROBE_LATENCY)
+        in_flight -= 1
+        index = int(url.host.rsplit(".", 1)[1])
+        if index == 5:
+            return AiohttpClientMockResponse(method, url, json={"device": {"type": "gateBox"}})
+        if index not in shutterboxes:
+            raise asyncio.TimeoutError()
+        device_id = "duplicate" if index in (28, 29) else f"blind{index}"
+        return AiohttpClientMockResponse(
+            method,
+            url,
+            json={"device": {"deviceName": f"Blind {index}", "type": "shutterBox", "id": device_id}},
+        )
+
+    for host in IPv4Network("192.168.1.0/24").hosts():
+        aioclient_mock.get(f"http://{host}/api/device/state", side_effect=device_state)
+    MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, unique_id="blind10").add_to_hass(hass)
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], user_input={CONF_IP_ADDRESS: "192.168.1.0/24", CONF_PORT: 80}
+    )
+
+    assert max_in_flight == SCAN_MAX_PARALLEL
+    assert result["type"] == data_entry_flow.RESULT_TYPE_ABORT
+    assert result["reason"] == "scan_finished"
+    assert result["description_placeholders"] == {"found": "19", "added": "18"}
+    entries = hass.config_entries.async_entries(DOMAIN)
+    unique_ids = {f"blind{index}" for index in range(10, 28)} | {"duplicate"}
+    assert {entry.unique_id for entry in entries} == unique_ids
+    # the already configured device follows its new address
+    assert entries[0].data == {CONF_IP_ADDRESS: "192.168.1.10", CONF_PORT: 80}
+
+
+async def test_network_scan_bypasses_transport(hass, aioclient_mock: AiohttpClientMocker):
+    """Probes take no request slots of the devices and leave no limits or metrics."""
+    limits = async_get_transport_limits(hass)
+    free_slots = []
+
+    async def device_state(method, url, data):
+        free_slots.append(limits.requests._value)
+        return AiohttpClientMockResponse(
+            method, url, json={"device": {"type": "shutterBox", "id": url.host}}
+        )
+
+    for host in IPv4Network("192.168.1.0/28").hosts():
+        aioclient_mock.get(f"http://{host}/api/device/state", side_effect=device_state)
+    devices = await async_scan_network(
+        async_get_session(hass), IPv4Network("192.168.1.0/28"), 80
+    )
+
+    assert len(devices) == 14
+    assert free_slots == [MAX_CONCURRENT_REQUESTS] * 14
+    assert not limits._hosts
+    assert not async_get_metrics(hass).devices
+    assert not async_get_metrics(hass).counters
+
+
+async def test_network_scan_errors(hass):
+    """Malformed and oversized ranges are rejected before scanning."""
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+    for network, error in (
+            ("192.168.1.0/33", "invalid_network"),
+            ("10.0.0.0/16", "network_too_large"),
+    ):
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], user_input={CONF_IP_ADDRESS: network, CONF_PORT: 80}
+        )
+        assert result["errors"] == {"base": error}
+
+
+async def test_flows_share_one_session(hass, socket_enabled):
+    """1,000 flow submissions reuse the integration session and its sockets."""
+    simulator = ShutterboxSimulator()
+    device, = await simulator.async_start(1)
+    user_input = {CONF_IP_ADDRESS: "127.0.0.1", CONF_PORT: device.port}
+    entry = MockConfigEntry(domain=DOMAIN, data=user_input, unique_id=device.device_id)
+    entry.add_to_hass(hass)
+    await hass.config_entries.async_setup(entry.entry_id)
+
+    async def submit(index: int) -> None:
+        if index % 2:
+            result = await hass.config_entries.flow.async_init(
+                DOMAIN, context={"source": config_entries.SOURCE_USER}
+            )
+            result = await hass.config_entries.flow.async_configure(result["flow_id"], user_input)
+            assert result["reason"] == "already_configured"
+        else:
+            result = await hass.config_entries.options.async_init(entry.entry_id)
+            result = await hass.config_entries.options.async_configure(result["flow_id"], user_input)
+            assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
+
+    try:
+        await submit(0)
+        sessions = _open_sessions()
+        sockets = _open_sockets()
+
+        for index in range(1, SUBMISSIONS):
+            await submit(index)
+
+        assert _open_sessions() == sessions
+        assert _open_sockets() <= sockets + 1
+        assert len(device.requests) == SUBMISSIONS
+    finally:
+        await simulator.async_stop()
+
+
+def _open_sessions() -> int:
+    gc.collect()
+    return sum(
+        1 for obj in gc.get_objects() if isinstance(obj, aiohttp.ClientSession) and not obj.closed
+    )
+
+
+def _open_sockets() -> int:
+    sockets = 0
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            sockets += os.readlink(f"/proc/self/fd/{fd}").startswith("socket:")
+        except OSError:  # the descriptor used by listdir itself
+            pass
+    return sockets
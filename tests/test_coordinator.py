@@ -0,0 +1,153 @@
+"""Tests for BleBox shutterBox with tilt data update coordinator."""
+import asyncio
+from collections import Counter
+from datetime import timedelta
+from time import monotonic
+from unittest.mock import MagicMock
+
+from custom_components.blebox_shutterbox_tilt.api import ShutterState
+from custom_components.blebox_shutterbox_tilt.const import COORDINATOR
+from custom_components.blebox_shutterbox_tilt.const import DOMAIN
+from custom_components.blebox_shutterbox_tilt.const import IDLE_SCAN_INTERVAL
+from custom_components.blebox_shutterbox_tilt.coordinator import ShutterboxDataUpdateCoordinator
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+
+from .const import MOCK_CONFIG
+from .const import shutter_state
+
+DEVICES = 500
+
+
+async def test_refreshes_of_many_devices_are_spread_over_interval(hass):
+    """500 idle devices poll once per interval, a few of them per second at most."""
+    polls = []
+
+    async def get_cover_state():
+        polls.append(tick)
+        return ShutterState.from_json(shutter_state(10))
+
+    tick = 0
+    unsubs = []
+    for index in range(DEVICES):
+        api = MagicMock()
+        api.async_get_cover_state = get_cover_state
+        entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id=f"entry_{index}")
+        coordinator = ShutterboxDataUpdateCoordinator(hass, api, entry)
+        # schedules the first poll
+        unsubs.append(coordinator.async_add_listener(lambda: None))
+
+    start = dt_util.utcnow()
+    interval = int(IDLE_SCAN_INTERVAL.total_seconds())
+    for tick in range(1, interval + 1):
+        async_fire_time_changed(hass, start + timedelta(seconds=tick))
+        await hass.async_block_till_done()
+
+    assert len(polls) == DEVICES
+    polls_per_tick = Counter(polls)
+    fair_share = DEVICES / interval
+    # offsets are hashed, a few seconds get several times their share
+    assert max(polls_per_tick.values()) <= 8 * fair_share
+    # no burst of more than a few seconds' share at any point
+    window = 10
+    polls_per_window = Counter(tick // window for tick in polls)
+    assert max(polls_per_window.values()) <= 2 * fair_share * window
+    for unsub in unsubs:
+        unsub()
+
+
+async def test_concurrent_refreshes_share_one_request(hass):
+    """Refreshes requested while one is in flight join it instead of polling again."""
+    release = asyncio.Event()
+    calls = 0
+
+    async def get_cover_state():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return ShutterState.from_json(shutter_state(10))
+
+    api = MagicMock()
+    api.async_get_cover_state = get_cover_state
+    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    coordinator = ShutterboxDataUpdateCoordinator(hass, api, entry)
+
+    refreshes = asyncio.gather(*[coordinator.async_refresh() for _ in range(10)])
+    await asyncio.sleep(0)
+    release.set()
+    await refreshes
+
+    assert calls == 1
+    assert coordinator.data == ShutterState.from_json(shutter_state(10))
+
+
+async def test_restored_state_is_not_observed(hass):
+    """A cached state doesn't start motion tracking or teach the motion timing."""
+    api = MagicMock()
+    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    coordinator = ShutterboxDataUpdateCoordinator(hass, api, entry)
+    travel_time = coordinator.profile.travel_time
+
+    # cached while the shutter was moving down
+    coordinator.async_restore(ShutterState.from_json(shutter_state(10, state=0)))
+
+    assert coordinator.data == ShutterState.from_json(shutter_state(10, state=0))
+    assert not coordinator.scheduler.moving
+    assert not coordinator.motion.moving(monotonic())
+    coordinator.async_set_updated_data(ShutterState.from_json(shutter_state(60)))
+    assert coordinator.profile.travel_samples == 0
+    assert coordinator.profile.travel_time == travel_time
+
+
+async def test_coordinator_pushes_state_to_entity(hass, aioclient_mock: AiohttpClientMocker):
+    """Entities follow coordinator updates without polling on their own."""
+    aioclient_mock.get(
+        "http://192.168.1.123/api/device/state",
+        json={"device": {"deviceName": "My ShutterBox", "type": "shutterBox", "id": "f12a29130ce"}},
+    )
+    aioclient_mock.get("http://192.168.1.123/api/shutter/state", json=shutter_state(30))
+    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    entry.add_to_hass(hass)
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    state = hass.states.get("cover.my_shutterbox")
+    assert state.attributes["current_position"] == 70
+
+    coordinator = hass.data[DOMAIN][entry.entry_id][COORDINATOR]
+    coordinator.async_set_updated_data(ShutterState.from_json(shutter_state(100, state=3)))
+    await hass.async_block_till_done()
+    state = hass.states.get("cover.my_shutterbox")
+    assert state.attributes["current_position"] == 0
+    assert state.state == "closed"
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_unchanged_state_is_not_written(hass, aioclient_mock: AiohttpClientMocker):
+    """Identical coordinator updates are counted as suppressed instead of written."""
+    aioclient_mock.get(
+        "http://192.168.1.123/api/device/state",
+        json={"device": {"deviceName": "My ShutterBox", "type": "shutterBox", "id": "f12a29130ce"}},
+    )
+    aioclient_mock.get("http://192.168.1.123/api/shutter/state", json=shutter_state(30))
+    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id][COORDINATOR]
+    cover = hass.data["cover"].get_entity("cover.my_shutterbox")
+    writes = cover.state_writes
+
+    for _ in range(10):
+        coordinator.async_set_updated_data(ShutterState.from_json(shutter_state(30)))
+    coordinator.async_set_updated_data(ShutterState.from_json(shutter_state(40)))
+    await hass.async_block_till_done()
+
+    assert cover.state_writes == writes + 1
+    assert cover.suppressed_state_writes >= 10
+    assert hass.states.get("cover.my_shutterbox").attributes["current_position"] == 60
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,118 @@
+"""Tests for BleBox shutterBox with tilt diagnostics and request metrics."""
+import pytest
+from custom_components.blebox_shutterbox_tilt.api import ShutterboxApiClient
+from custom_components.blebox_shutterbox_tilt.const import CONF_IP_ADDRESS
+from custom_components.blebox_shutterbox_tilt.const import CONF_PORT
+from custom_components.blebox_shutterbox_tilt.const import COORDINATOR
+from custom_components.blebox_shutterbox_tilt.const import DOMAIN
+from custom_components.blebox_shutterbox_tilt.diagnostics import async_get_config_entry_diagnostics
+from custom_components.blebox_shutterbox_tilt.errors import NoDeviceInfoError
+from custom_components.blebox_shutterbox_tilt.metrics import async_get_metrics
+from custom_components.blebox_shutterbox_tilt.metrics import Histogram
+from custom_components.blebox_shutterbox_tilt.metrics import LATENCY_BUCKETS
+from custom_components.blebox_shutterbox_tilt.transport import async_get_session
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+
+from .const import MOCK_CONFIG
+from .simulator import ShutterboxSimulator
+
+POLLS = 5
+PROBES = 300
+
+
+def test_histogram_has_fixed_size():
+    """Samples only move bucket counts, quantiles are bucket bounds."""
+    histogram = Histogram()
+    for index in range(10_000):
+        histogram.observe(0.001 * (index % 100))
+
+    assert len(histogram.buckets) == len(LATENCY_BUCKETS) + 1
+    assert histogram.count == 10_000
+    assert histogram.quantile(0.5) == 0.05
+    assert histogram.quantile(1) == histogram.max == 0.099
+
+
+async def test_requests_are_traced_into_diagnostics(hass, socket_enabled):
+    """Connect, time to first byte and total latency end up per device and per endpoint."""
+    simulator = ShutterboxSimulator()
+    device, = await simulator.async_start(1, latency=0.01)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_IP_ADDRESS: "127.0.0.1", CONF_PORT: device.port},
+        entry_id="test",
+    )
+    entry.add_to_hass(hass)
+    try:
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = hass.data[DOMAIN][entry.entry_id][COORDINATOR]
+        for _ in range(POLLS):
+            await coordinator.async_refresh()
+        await coordinator.async_move(position=40, debounce=False)
+
+        diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+
+        assert diagnostics["entry"]["data"][CONF_IP_ADDRESS] == "**REDACTED**"
+        assert diagnostics["health"]["state"] == "closed"
+        requests = diagnostics["requests"]
+        assert requests["counters"]["requests"] == len(device.requests)
+        assert requests["counters"]["state_writes"] >= 1
+        assert requests["latency"]["total"]["count"] == len(device.requests)
+        assert requests["latency"]["ttfb"]["count"] == len(device.requests)
+        # connections are kept alive between requests
+        assert 1 <= requests["latency"]["connect"]["count"] < len(device.requests)
+        assert requests["latency"]["total"]["mean_ms"] >= 10
+        endpoints = diagnostics["endpoints"]
+        assert endpoints["/api/shutter/extended/state"]["total"]["count"] == POLLS + 1
+        assert endpoints["/s/p/{n}/"]["total"]["count"] == 1
+
+        registry = er.async_get(hass)
+        sensors = [
+            registry_entry for registry_entry in er.async_entries_for_config_entry(registry, entry.entry_id)
+            if registry_entry.domain == "sensor"
+        ]
+        assert len(sensors) == 4
+        assert all(sensor.disabled_by == er.RegistryEntryDisabler.INTEGRATION for sensor in sensors)
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    finally:
+        await simulator.async_stop()
+
+
+async def test_only_configured_devices_are_tracked(hass, aioclient_mock: AiohttpClientMocker):
+    """Requests to hosts that aren't set up, like addresses checked by config flows,
+    don't take the place of configured devices."""
+    for index in range(PROBES):
+        aioclient_mock.get(f"http://10.0.{index // 250}.{index % 250 + 1}/api/device/state", json={})
+    for index in range(PROBES):
+        client = ShutterboxApiClient(
+            f"10.0.{index // 250}.{index % 250 + 1}", 80, async_get_session(hass), hass
+        )
+        with pytest.raises(NoDeviceInfoError):
+            await client.async_get_device_info()
+    metrics = async_get_metrics(hass)
+    assert not metrics.devices and not metrics.counters
+    assert metrics.endpoints["/api/device/state"]["total"].count == PROBES
+
+    aioclient_mock.get(
+        "http://192.168.1.123/api/device/state",
+        json={"device": {"deviceName": "My ShutterBox", "type": "shutterBox", "id": "f12a29130ce"}},
+    )
+    aioclient_mock.get(
+        "http://192.168.1.123/api/shutter/state",
+        json={"shutter": {"state": 2, "desiredPos": {"position": 30, "tilt": 50}}},
+    )
+    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert diagnostics["requests"]["counters"]["requests"] >= 2
+    assert diagnostics["requests"]["latency"]["total"]["count"] >= 2
+    assert list(metrics.counters) == ["192.168.1.123:80"]
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    assert not metrics.devices and not metrics.counters
@@ -0,0 +1,134 @@
+"""Tests for BleBox shutterBox with tilt device health tracking."""
+import asyncio
+
+import pytest
+from _pytest.logging import LogCaptureFixture
+from custom_components.blebox_shutterbox_tilt.api import ShutterboxApiClient
+from custom_components.blebox_shutterbox_tilt.const import API_CLIENT
+from custom_components.blebox_shutterbox_tilt.const import COORDINATOR
+from custom_components.blebox_shutterbox_tilt.const import DOMAIN
+from custom_components.blebox_shutterbox_tilt.health import CircuitOpenError
+from custom_components.blebox_shutterbox_tilt.health import CLOSED
+from custom_components.blebox_shutterbox_tilt.health import DeviceHealth
+from custom_components.blebox_shutterbox_tilt.health import FAILURE_THRESHOLD
+from custom_components.blebox_shutterbox_tilt.health import HALF_OPEN
+from custom_components.blebox_shutterbox_tilt.health import OPEN
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMockResponse
+
+from .const import MOCK_CONFIG
+
+DEVICES = 5
+SHUTTER_STATE = {
+    "shutter": {
+        "state": 2,
+        "currentPos": {"position": 30, "tilt": 50},
+        "desiredPos": {"position": 30, "tilt": 50},
+    }
+}
+
+
+async def test_circuit_opens_and_recovers_with_backoff(
+        hass, aioclient_mock: AiohttpClientMocker, caplog: LogCaptureFixture
+):
+    """Unresponsive devices fail fast until a recovery probe gets through."""
+    now = [0.0]
+    responding = [True]
+
+    async def shutter_state(method, url, data):
+        if not responding[0]:
+            raise asyncio.TimeoutError()
+        return AiohttpClientMockResponse(method, url, json=SHUTTER_STATE)
+
+    clients = []
+    for index in range(DEVICES):
+        aioclient_mock.get(f"http://10.0.0.{index}/api/shutter/state", side_effect=shutter_state)
+        client = ShutterboxApiClient(f"10.0.0.{index}", 80, async_get_clientsession(hass), hass)
+        client.health = DeviceHealth(client.host, clock=lambda: now[0], jitter=lambda: 1.0)
+        clients.append(client)
+        assert await client.async_get_cover_state() is not None
+
+    responding[0] = False
+    for client in clients:
+        for _ in range(FAILURE_THRESHOLD):
+            with pytest.raises(asyncio.TimeoutError):
+                await client.async_get_cover_state()
+        assert client.health.state == OPEN
+    calls = aioclient_mock.call_count
+
+    for client in clients:
+        with pytest.raises(CircuitOpenError):
+            await client.async_set_cover_position(50)
+    assert aioclient_mock.call_count == calls
+
+    # the probe fails, the backoff doubles
+    now[0] = 5.0
+    health = clients[0].health
+    with pytest.raises(asyncio.TimeoutError):
+        await clients[0].async_get_cover_state()
+    assert (health.state, health.half_opened, health.retry_at) == (OPEN, 1, 15.0)
+    now[0] = 14.0
+    with pytest.raises(CircuitOpenError):
+        await clients[0].async_get_cover_state()
+
+    # the device is back, the next probe closes the circuit
+    responding[0] = True
+    now[0] = 15.0
+    assert await clients[0].async_get_cover_state() is not None
+    assert health.state == CLOSED
+    assert "shutterBox 10.0.0.0:80 is unreachable" in caplog.text
+    assert "shutterBox 10.0.0.0:80 is reachable again" in caplog.text
+    assert (health.opened, health.half_opened, health.closed, health.rejected) == (2, 2, 1, 2)
+    assert [client.health.state for client in clients[1:]] == [OPEN] * (DEVICES - 1)
+
+
+async def test_only_one_probe_while_half_open():
+    """Concurrent requests don't all hit a device that may still be down."""
+    health = DeviceHealth("192.168.1.123:80", failure_threshold=1, clock=lambda: 10.0, jitter=lambda: 0.0)
+    health.record_failure()
+    health.retry_at = 0.0
+
+    health.before_request()
+    assert health.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        health.before_request()
+    health.record_cancelled()
+    health.before_request()
+
+
+async def test_entity_goes_unavailable(hass, aioclient_mock: AiohttpClientMocker):
+    """A device that stops responding makes its cover unavailable and polls stop hitting it."""
+    aioclient_mock.get(
+        "http://192.168.1.123/api/device/state",
+        json={"device": {"deviceName": "My ShutterBox", "type": "shutterBox", "id": "f12a29130ce"}},
+    )
+    responding = [True]
+
+    async def shutter_state(method, url, data):
+        if not responding[0]:
+            raise asyncio.TimeoutError()
+        return AiohttpClientMockResponse(method, url, json=SHUTTER_STATE)
+
+    aioclient_mock.get("http://192.168.1.123/api/shutter/state", side_effect=shutter_state)
+    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id][COORDINATOR]
+    health = hass.data[DOMAIN][entry.entry_id][API_CLIENT].health
+
+    responding[0] = False
+    for _ in range(FAILURE_THRESHOLD):
+        await coordinator.async_refresh()
+    assert health.state == OPEN
+    assert hass.states.get("cover.my_shutterbox").state == STATE_UNAVAILABLE
+    calls = aioclient_mock.call_count
+
+    await coordinator.async_refresh()
+    assert aioclient_mock.call_count == calls
+    assert health.rejected == 1
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
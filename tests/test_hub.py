@@ -0,0 +1,156 @@
+"""Tests for BleBox shutterBox with tilt hub entries."""
+from ipaddress import IPv4Network
+from unittest.mock import patch
+
+from custom_components.blebox_shutterbox_tilt.cache import async_get_device_cache
+from custom_components.blebox_shutterbox_tilt.const import CONF_DEVICES
+from custom_components.blebox_shutterbox_tilt.const import CONF_HUB
+from custom_components.blebox_shutterbox_tilt.const import CONF_IP_ADDRESS
+from custom_components.blebox_shutterbox_tilt.const import CONF_PORT
+from custom_components.blebox_shutterbox_tilt.const import CONF_REMOVE
+from custom_components.blebox_shutterbox_tilt.const import COORDINATOR
+from custom_components.blebox_shutterbox_tilt.const import DOMAIN
+from custom_components.blebox_shutterbox_tilt.diagnostics import async_get_config_entry_diagnostics
+from homeassistant import config_entries
+from homeassistant import data_entry_flow
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+
+from .simulator import ShutterboxSimulator
+
+DEVICES = 100
+
+
+def _address(device) -> dict:
+    return {CONF_IP_ADDRESS: "127.0.0.1", CONF_PORT: device.port}
+
+
+def _cover_ids(hass, entry) -> set:
+    registry = er.async_get(hass)
+    return {
+        registry_entry.entity_id
+        for registry_entry in er.async_entries_for_config_entry(registry, entry.entry_id)
+        if registry_entry.domain == "cover"
+    }
+
+
+async def test_hub_manages_its_devices_without_reloading(hass, socket_enabled):
+    """A hub sets up all its devices at once and adds or removes devices on their own."""
+    simulator = ShutterboxSimulator()
+    devices = await simulator.async_start(DEVICES + 1)
+    hub_devices, spare = devices[:DEVICES], devices[DEVICES]
+    hub = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_DEVICES: [_address(device) for device in hub_devices]},
+        entry_id="hub",
+    )
+    try:
+        hub.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(hub.entry_id)
+        await hass.async_block_till_done()
+
+        assert len(_cover_ids(hass, hub)) == DEVICES
+        coordinators = {
+            key: device_data[COORDINATOR]
+            for key, device_data in hass.data[DOMAIN].items()
+        }
+        assert len(coordinators) == DEVICES
+
+        result = await hass.config_entries.options.async_init(hub.entry_id)
+        assert result["step_id"] == "hub"
+        removed = [f"127.0.0.1:{device.port}" for device in hub_devices[:2]]
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"],
+            user_input={CONF_IP_ADDRESS: "127.0.0.1", CONF_PORT: spare.port, CONF_REMOVE: removed},
+        )
+        assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
+        await hass.async_block_till_done()
+
+        keys = set(hass.data[DOMAIN])
+        assert len(keys) == DEVICES - 1
+        added_key = f"hub_127.0.0.1:{spare.port}"
+        assert added_key in keys
+        for key in keys - {added_key}:
+            # the other devices keep running
+            assert hass.data[DOMAIN][key][COORDINATOR] is coordinators[key]
+        cover_ids = _cover_ids(hass, hub)
+        assert len(cover_ids) == DEVICES - 1
+        assert all(hass.states.get(entity_id) is not None for entity_id in cover_ids)
+        assert len([state for state in hass.states.async_all("cover") if state.state != "unavailable"]) == DEVICES - 1
+
+        diagnostics = await async_get_config_entry_diagnostics(hass, hub)
+        assert len(diagnostics["devices"]) == DEVICES - 1
+
+        assert await hass.config_entries.async_unload(hub.entry_id)
+        assert not hass.data[DOMAIN]
+    finally:
+        await simulator.async_stop()
+
+
+async def test_network_scan_creates_hub(hass, aioclient_mock: AiohttpClientMocker):
+    """Devices found by a scan end up in one hub entry, except already configured ones."""
+    for host in IPv4Network("192.168.1.0/29").hosts():
+        index = int(str(host).rsplit(".", 1)[1])
+        aioclient_mock.get(
+            f"http://{host}/api/device/state",
+            json={"device": {"deviceName": f"Blind {index}", "type": "shutterBox", "id": f"blind{index}"}},
+        )
+    MockConfigEntry(domain=DOMAIN, data={}, unique_id="blind1").add_to_hass(hass)
+
+    with patch(
+            "custom_components.blebox_shutterbox_tilt.async_setup_entry",
+            return_value=True,
+    ):
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": config_entries.SOURCE_USER}
+        )
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"],
+            user_input={CONF_IP_ADDRESS: "192.168.1.0/29", CONF_PORT: 80, CONF_HUB: True},
+        )
+
+    assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
+    assert result["data"] == {
+        CONF_DEVICES: [{CONF_IP_ADDRESS: f"192.168.1.{index}", CONF_PORT: 80} for index in range(2, 7)]
+    }
+
+
+async def test_network_scan_skips_devices_of_hubs(hass, aioclient_mock: AiohttpClientMocker):
+    """A scan doesn't put devices into a new hub that an existing hub holds."""
+    for host in IPv4Network("192.168.1.0/29").hosts():
+        index = int(str(host).rsplit(".", 1)[1])
+        aioclient_mock.get(
+            f"http://{host}/api/device/state",
+            json={"device": {"deviceName": f"Blind {index}", "type": "shutterBox", "id": f"blind{index}"}},
+        )
+    hub = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_DEVICES: [
+            {CONF_IP_ADDRESS: "192.168.1.1", CONF_PORT: 80},
+            # blind2 was set up at another address
+            {CONF_IP_ADDRESS: "10.0.0.2", CONF_PORT: 80},
+        ]},
+        entry_id="hub",
+        unique_id="hub_192.168.1.0/30",
+    )
+    hub.add_to_hass(hass)
+    cache = await async_get_device_cache(hass)
+    cache.async_set_device_info("hub_10.0.0.2:80", {"type": "shutterBox", "id": "blind2"})
+
+    with patch(
+            "custom_components.blebox_shutterbox_tilt.async_setup_entry",
+            return_value=True,
+    ):
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": config_entries.SOURCE_USER}
+        )
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"],
+            user_input={CONF_IP_ADDRESS: "192.168.1.0/29", CONF_PORT: 80, CONF_HUB: True},
+        )
+
+    assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
+    assert result["data"] == {
+        CONF_DEVICES: [{CONF_IP_ADDRESS: f"192.168.1.{index}", CONF_PORT: 80} for index in range(3, 7)]
+    }
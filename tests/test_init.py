@@ -3,9 +3,19 @@ import pytest
 from custom_components.blebox_shutterbox_tilt import async_reload_entry
 from custom_components.blebox_shutterbox_tilt import async_setup_entry
 from custom_components.blebox_shutterbox_tilt import async_unload_entry
+from custom_components.blebox_shutterbox_tilt.const import API_CLIENT
+from custom_components.blebox_shutterbox_tilt.const import CONF_IP_ADDRESS
+from custom_components.blebox_shutterbox_tilt.const import CONF_PORT
+from custom_components.blebox_shutterbox_tilt.const import COORDINATOR
+from custom_components.blebox_shutterbox_tilt.const import DEVICE_INFO
 from custom_components.blebox_shutterbox_tilt.const import DOMAIN
+from custom_components.blebox_shutterbox_tilt.const import IDLE_SCAN_INTERVAL
+from homeassistant.const import CONF_NAME
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
 from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
 
 from .const import MOCK_CONFIG
 
@@ -19,11 +29,12 @@ async def test_setup_unload_and_reload_entry(hass, bypass_get_data):
     """Test entry setup and unload."""
     # Create a mock entry so we don't have to go through config flow
     config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
 
     # Set up the entry and assert that the values set during setup are where we expect
     # them to be. Because we have patched the ShutterboxDataUpdateCoordinator.async_get_data
     # call, no code from custom_components/blebox_shutterbox_tilt/api.py actually runs.
-    assert await async_setup_entry(hass, config_entry)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
     assert DOMAIN in hass.data and config_entry.entry_id in hass.data[DOMAIN]
     assert (isinstance(hass.data[DOMAIN][config_entry.entry_id], dict))
 
@@ -46,3 +57,97 @@ async def test_setup_entry_exception(hass, error_on_get_data):
     # an error.
     with pytest.raises(ConfigEntryNotReady):
         assert await async_setup_entry(hass, config_entry)
+
+
+async def test_address_change_is_applied_in_place(hass, aioclient_mock: AiohttpClientMocker):
+    """A new address from the options is swapped into the running entry, which
+    learns what the device at it supports."""
+    # only the device at the new address has the extended state
+    addresses = (("192.168.1.123", 30, "20180604"), ("192.168.1.124", 60, "20190911"))
+    for host, position, api_level in addresses:
+        aioclient_mock.get(
+            f"http://{host}/api/device/state",
+            json={
+                "device": {
+                    "deviceName": "My ShutterBox",
+                    "type": "shutterBox",
+                    "id": "f12a29130ce",
+                    "apiLevel": api_level,
+                }
+            },
+        )
+        for path in ("/api/shutter/state", "/api/shutter/extended/state"):
+            aioclient_mock.get(
+                f"http://{host}{path}",
+                json={
+                    "shutter": {
+                        "state": 2,
+                        "currentPos": {"position": position, "tilt": 50},
+                        "desiredPos": {"position": position, "tilt": 50},
+                    }
+                },
+            )
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    entry_data = hass.data[DOMAIN][config_entry.entry_id]
+    client = entry_data[API_CLIENT]
+    coordinator = entry_data[COORDINATOR]
+    cover = hass.data["cover"].get_entity("cover.my_shutterbox")
+    calls = aioclient_mock.call_count
+
+    hass.config_entries.async_update_entry(
+        config_entry, options={CONF_IP_ADDRESS: "192.168.1.124", CONF_PORT: 80}
+    )
+    await hass.async_block_till_done()
+
+    assert hass.data[DOMAIN][config_entry.entry_id] is entry_data
+    assert entry_data[API_CLIENT] is client and entry_data[COORDINATOR] is coordinator
+    assert hass.data["cover"].get_entity("cover.my_shutterbox") is cover
+    new_calls = [(url.host, url.path) for _, url, _, _ in aioclient_mock.mock_calls[calls:]]
+    assert new_calls == [
+        ("192.168.1.124", "/api/device/state"),
+        ("192.168.1.124", "/api/shutter/extended/state"),
+    ]
+    assert entry_data[DEVICE_INFO]["apiLevel"] == "20190911"
+    assert hass.states.get("cover.my_shutterbox").attributes["current_position"] == 40
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_reloads_on_options_change_keep_one_listener(hass, aioclient_mock: AiohttpClientMocker):
+    """Reloads for changed options undo everything the previous setup registered."""
+    aioclient_mock.get(
+        "http://192.168.1.123/api/device/state",
+        json={"device": {"deviceName": "My ShutterBox", "type": "shutterBox", "id": "f12a29130ce"}},
+    )
+    aioclient_mock.get(
+        "http://192.168.1.123/api/shutter/state",
+        json={"shutter": {"state": 2, "desiredPos": {"position": 30, "tilt": 50}}},
+    )
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    on_unload = len(config_entry._on_unload)
+
+    # the second change arrives while the first one is still being applied
+    for name in ("Blind", "Blind 2"):
+        hass.config_entries.async_update_entry(
+            config_entry, options={**MOCK_CONFIG, CONF_NAME: name}
+        )
+    await hass.async_block_till_done()
+
+    assert len(config_entry.update_listeners) == 1
+    assert len(config_entry._on_unload) == on_unload
+
+    def polls() -> int:
+        return sum(1 for call in aioclient_mock.mock_calls if call[1].path == "/api/shutter/state")
+
+    before = polls()
+    async_fire_time_changed(hass, dt_util.utcnow() + IDLE_SCAN_INTERVAL)
+    await hass.async_block_till_done()
+    assert polls() == before + 1
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
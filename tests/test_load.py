@@ -0,0 +1,128 @@
+"""Load tests for BleBox shutterBox with tilt against the local device simulator."""
+import logging
+from dataclasses import dataclass
+from typing import List
+
+from custom_components.blebox_shutterbox_tilt.api import ShutterboxApiClient
+from custom_components.blebox_shutterbox_tilt.const import CONF_IP_ADDRESS
+from custom_components.blebox_shutterbox_tilt.const import CONF_PORT
+from custom_components.blebox_shutterbox_tilt.const import DOMAIN
+from custom_components.blebox_shutterbox_tilt.fanout import async_fan_out
+from custom_components.blebox_shutterbox_tilt.fanout import FanOutResult
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .simulator import ShutterboxSimulator
+from .simulator import STATE_MOVING_DOWN
+
+_LOGGER = logging.getLogger(__name__)
+
+DEVICES = 100
+COVERS = 50
+
+
+@dataclass
+class LoadReport:
+    """Latency and throughput of a load run."""
+
+    results: List[FanOutResult]
+    duration: float
+
+    @property
+    def errors(self) -> int:
+        """number of failed operations"""
+        return sum(1 for result in self.results if not result.success)
+
+    @property
+    def p50(self) -> float:
+        """median latency in seconds"""
+        return self._percentile(0.5)
+
+    @property
+    def p99(self) -> float:
+        """99th percentile latency in seconds"""
+        return self._percentile(0.99)
+
+    @property
+    def requests_per_second(self) -> float:
+        """completed operations per second"""
+        return len(self.results) / self.duration
+
+    def _percentile(self, quantile: float) -> float:
+        latencies = sorted(result.duration for result in self.results)
+        return latencies[int(quantile * (len(latencies) - 1))]
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.results)} requests, {self.errors} errors, "
+            f"p50 {self.p50 * 1000:.1f} ms, p99 {self.p99 * 1000:.1f} ms, "
+            f"{self.requests_per_second:.0f} req/s"
+        )
+
+
+async def async_run_load(operations, max_parallel: int) -> LoadReport:
+    """runs the operations with bounded parallelism and reports their latency"""
+    results = await async_fan_out(operations, lambda operation: operation(), max_parallel)
+    duration = max(result.started + result.duration for result in results)
+    return LoadReport(results, duration)
+
+
+async def test_api_client_under_load(hass, socket_enabled):
+    """Polls and commands against 100 simulated devices with latency and failures."""
+    simulator = ShutterboxSimulator()
+    devices = await simulator.async_start(DEVICES, latency=0.005, failure_rate=0.02)
+    session = async_get_clientsession(hass)
+    try:
+        apis = [
+            ShutterboxApiClient("127.0.0.1", device.port, session, hass)
+            for device in devices
+        ]
+        operations = [api.async_get_cover_state for api in apis for _ in range(4)]
+        operations += [api.async_close_cover for api in apis]
+
+        report = await async_run_load(operations, max_parallel=64)
+        _LOGGER.info("%s", report)
+
+        assert len(report.results) == 5 * DEVICES
+        assert 0 < report.errors < len(report.results) // 10
+        assert all(result.result is not None for result in report.results if result.success)
+    finally:
+        await simulator.async_stop()
+
+
+async def test_cover_platform_under_load(hass, socket_enabled):
+    """Closes 50 simulated blinds through the cover platform."""
+    simulator = ShutterboxSimulator()
+    devices = await simulator.async_start(COVERS, latency=0.002)
+    try:
+        for device in devices:
+            entry = MockConfigEntry(
+                domain=DOMAIN,
+                data={CONF_IP_ADDRESS: "127.0.0.1", CONF_PORT: device.port},
+                entry_id=device.device_id,
+            )
+            entry.add_to_hass(hass)
+            assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        entity_ids = hass.states.async_entity_ids("cover")
+        assert len(entity_ids) == COVERS
+
+        report = await async_run_load(
+            [
+                lambda entity_id=entity_id: hass.services.async_call(
+                    "cover", "close_cover", {ATTR_ENTITY_ID: entity_id}, blocking=True
+                )
+                for entity_id in entity_ids
+            ],
+            max_parallel=COVERS,
+        )
+        _LOGGER.info("%s", report)
+
+        assert report.errors == 0
+        assert all(device.state() == STATE_MOVING_DOWN for device in devices)
+        assert all(hass.states.get(entity_id).state == "closing" for entity_id in entity_ids)
+        for entry in hass.config_entries.async_entries(DOMAIN):
+            assert await hass.config_entries.async_unload(entry.entry_id)
+    finally:
+        await simulator.async_stop()
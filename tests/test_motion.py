@@ -0,0 +1,44 @@
+"""Tests for BleBox shutterBox with tilt motion model."""
+from custom_components.blebox_shutterbox_tilt.api import ShutterState
+from custom_components.blebox_shutterbox_tilt.calibration import MotionProfile
+from custom_components.blebox_shutterbox_tilt.motion import MotionModel
+
+
+def _state(
+        state: int, position: int, desired: int, tilt: int = 0, desired_tilt: int = 0
+) -> ShutterState:
+    return ShutterState.from_json(
+        {
+            "shutter": {
+                "state": state,
+                "currentPos": {"position": position, "tilt": tilt},
+                "desiredPos": {"position": desired, "tilt": desired_tilt},
+            }
+        }
+    )
+
+
+def test_position_is_interpolated_towards_desired():
+    """While moving, the estimate advances at the travel speed and stops at the target."""
+    model = MotionModel(MotionProfile(travel_time=10, tilt_time=2))
+    model.observe(_state(0, 20, 80, tilt=0, desired_tilt=100), now=0)
+
+    assert model.moving(now=0)
+    assert model.position(now=3) == 50
+    assert model.tilt(now=1) == 50
+    assert model.position(now=100) == 80
+    assert not model.moving(now=100)
+
+
+def test_poll_reconciles_the_estimate():
+    """A state response re-anchors the estimate at the reported position."""
+    model = MotionModel(MotionProfile(travel_time=10))
+    model.observe(_state(0, 0, 100), now=0)
+    model.observe(_state(0, 20, 100), now=5)
+
+    assert model.position(now=5) == 20
+    assert model.position(now=6) == 30
+
+    model.observe(_state(2, 25, 25), now=6)
+    assert not model.moving(now=6)
+    assert model.position(now=60) == 25
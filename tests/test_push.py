@@ -0,0 +1,129 @@
+"""Tests for BleBox shutterBox with tilt push updates."""
+from unittest.mock import patch
+
+from custom_components.blebox_shutterbox_tilt.const import CONF_DEVICES
+from custom_components.blebox_shutterbox_tilt.const import CONF_IP_ADDRESS
+from custom_components.blebox_shutterbox_tilt.const import CONF_PORT
+from custom_components.blebox_shutterbox_tilt.const import CONF_PUSH_IDS
+from custom_components.blebox_shutterbox_tilt.const import COORDINATOR
+from custom_components.blebox_shutterbox_tilt.const import DOMAIN
+from custom_components.blebox_shutterbox_tilt.const import PUSH_IDLE_SCAN_INTERVAL
+from custom_components.blebox_shutterbox_tilt.push import push_path
+from custom_components.blebox_shutterbox_tilt.transport import MAX_BODY_SIZE
+from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+
+from .const import MOCK_CONFIG
+from .const import shutter_state
+
+
+def _mock_device(aioclient_mock: AiohttpClientMocker, host: str) -> None:
+    aioclient_mock.get(
+        f"http://{host}/api/device/state",
+        json={"device": {"deviceName": "My ShutterBox", "type": "shutterBox", "id": host}},
+    )
+    aioclient_mock.get(f"http://{host}/api/shutter/state", json=shutter_state(30))
+
+
+async def _async_setup(hass, aioclient_mock: AiohttpClientMocker) -> MockConfigEntry:
+    assert await async_setup_component(hass, "http", {})
+    _mock_device(aioclient_mock, "192.168.1.123")
+    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+async def test_device_pushes_state(hass, aioclient_mock: AiohttpClientMocker, hass_client_no_auth):
+    """A GET or an empty POST triggers a poll, a relay posting state updates the entity."""
+    entry = await _async_setup(hass, aioclient_mock)
+    push_id = entry.data[CONF_PUSH_IDS][entry.entry_id]
+    assert len(push_id) == 64
+    push_url = push_path(push_id)
+    coordinator = hass.data[DOMAIN][entry.entry_id][COORDINATOR]
+    polls = aioclient_mock.call_count
+    client = await hass_client_no_auth()
+
+    response = await client.post(push_url, json=shutter_state(100, state=3))
+    assert response.status == 200
+    await hass.async_block_till_done()
+    assert hass.states.get("cover.my_shutterbox").state == "closed"
+    assert aioclient_mock.call_count == polls
+    assert coordinator.push_enabled
+    delays = [coordinator.scheduler.next_delay() for _ in range(10)]
+    assert delays[-1] == PUSH_IDLE_SCAN_INTERVAL.total_seconds()
+
+    # what shutterBox actions send
+    response = await client.get(push_url)
+    assert response.status == 200
+    await hass.async_block_till_done()
+    assert aioclient_mock.call_count == polls + 1
+    assert hass.states.get("cover.my_shutterbox").attributes["current_position"] == 70
+
+    assert (await client.post(push_url)).status == 200
+    await hass.async_block_till_done()
+    assert aioclient_mock.call_count == polls + 2
+
+    assert (await client.post(push_url, data=b"{\"shutter\": 1}")).status == 400
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    assert (await client.get(push_url)).status == 404
+    await hass.async_block_till_done()
+    assert aioclient_mock.call_count == polls + 2
+
+
+async def test_push_id_survives_reload(hass, aioclient_mock: AiohttpClientMocker):
+    """The push id is generated once and kept in the entry."""
+    entry = await _async_setup(hass, aioclient_mock)
+    push_id = entry.data[CONF_PUSH_IDS][entry.entry_id]
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert entry.data[CONF_PUSH_IDS] == {entry.entry_id: push_id}
+
+
+async def test_rejected_pushes(hass, aioclient_mock: AiohttpClientMocker, hass_client_no_auth):
+    """Pushes from outside the local network, to unknown ids and with oversized bodies are rejected."""
+    entry = await _async_setup(hass, aioclient_mock)
+    push_url = push_path(entry.data[CONF_PUSH_IDS][entry.entry_id])
+    polls = aioclient_mock.call_count
+    client = await hass_client_no_auth()
+
+    with patch("custom_components.blebox_shutterbox_tilt.push.is_local", return_value=False):
+        assert (await client.get(push_url)).status == 403
+        response = await client.post(push_url, json=shutter_state(100, state=3))
+    assert response.status == 403
+    assert (await client.get(push_path("0" * 64))).status == 404
+    response = await client.post(push_url, data=b" " * (MAX_BODY_SIZE + 1))
+    assert response.status == 413
+    await hass.async_block_till_done()
+    assert hass.states.get("cover.my_shutterbox").attributes["current_position"] == 70
+    assert aioclient_mock.call_count == polls
+    assert not hass.data[DOMAIN][entry.entry_id][COORDINATOR].push_enabled
+
+
+async def test_removed_hub_device_stops_receiving_pushes(
+        hass, aioclient_mock: AiohttpClientMocker, hass_client_no_auth
+):
+    """A device removed from its hub loses its push id and its route."""
+    assert await async_setup_component(hass, "http", {})
+    devices = [{CONF_IP_ADDRESS: f"192.168.1.{index}", CONF_PORT: 80} for index in (1, 2)]
+    for device in devices:
+        _mock_device(aioclient_mock, device[CONF_IP_ADDRESS])
+    hub = MockConfigEntry(domain=DOMAIN, data={CONF_DEVICES: devices}, entry_id="hub")
+    hub.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(hub.entry_id)
+    await hass.async_block_till_done()
+    kept, removed = "hub_192.168.1.1:80", "hub_192.168.1.2:80"
+    push_ids = dict(hub.data[CONF_PUSH_IDS])
+    assert push_ids.keys() == {kept, removed}
+    client = await hass_client_no_auth()
+
+    hass.config_entries.async_update_entry(hub, options={CONF_DEVICES: devices[:1]})
+    await hass.async_block_till_done()
+
+    assert hub.data[CONF_PUSH_IDS] == {kept: push_ids[kept]}
+    assert (await client.get(push_path(push_ids[removed]))).status == 404
+    assert (await client.get(push_path(push_ids[kept]))).status == 200
+    assert await hass.config_entries.async_unload(hub.entry_id)
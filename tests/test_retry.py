@@ -0,0 +1,168 @@
+"""Tests for BleBox shutterBox with tilt command retries."""
+import asyncio
+from time import monotonic
+
+import aiohttp
+import pytest
+from custom_components.blebox_shutterbox_tilt.api import ShutterboxApiClient
+from custom_components.blebox_shutterbox_tilt.health import DeviceHealth
+from custom_components.blebox_shutterbox_tilt.metrics import HEDGES
+from custom_components.blebox_shutterbox_tilt.retry import async_retry
+from custom_components.blebox_shutterbox_tilt.retry import RetryPolicy
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMockResponse
+
+SLOW_RESPONSE = 5.0
+POLICY = RetryPolicy(deadline=1.0, backoff=0.01, max_backoff=0.05, hedge_delay=0.1)
+
+
+def _client(hass) -> ShutterboxApiClient:
+    client = ShutterboxApiClient("192.168.1.123", 80, async_get_clientsession(hass), hass)
+    client.retry_policy = POLICY
+    client.health = DeviceHealth(client.host, failure_threshold=100)
+    client.set_device_info({"apiLevel": "20190911"})
+    client.metrics.add_device(client.host)
+    return client
+
+
+def _flaky(*failures):
+    """answers requests with the failures first, then with a stopped shutter"""
+    responses = list(failures)
+
+    async def respond(method, url, data):
+        failure = responses.pop(0) if responses else None
+        if failure == "slow":
+            await asyncio.sleep(SLOW_RESPONSE)
+        elif failure is not None:
+            raise failure
+        return AiohttpClientMockResponse(
+            method, url, json={"shutter": {"state": 2, "currentPos": {"position": 50, "tilt": 0}}}
+        )
+
+    return respond
+
+
+async def test_dropped_command_is_retried(hass, aioclient_mock: AiohttpClientMocker):
+    """Connection errors and timeouts are retried within the deadline."""
+    aioclient_mock.get(
+        "http://192.168.1.123/s/p/50/",
+        side_effect=_flaky(aiohttp.ClientConnectionError(), asyncio.TimeoutError()),
+    )
+
+    state = await _client(hass).async_set_cover_position(50)
+
+    assert state.position == 50
+    assert aioclient_mock.call_count == 3
+
+
+async def test_slow_command_is_hedged(hass, aioclient_mock: AiohttpClientMocker):
+    """A duplicate of a slow command answers without waiting for the first one."""
+    aioclient_mock.get("http://192.168.1.123/s/t/20", side_effect=_flaky("slow"))
+
+    started = monotonic()
+    state = await _client(hass).async_set_cover_tilt_position(20)
+
+    assert monotonic() - started < SLOW_RESPONSE / 2
+    assert state.position == 50
+    assert aioclient_mock.call_count == 2
+
+
+async def test_retries_stop_at_deadline(hass, aioclient_mock: AiohttpClientMocker):
+    """An unreachable device fails the command with its error."""
+    aioclient_mock.get("http://192.168.1.123/s/u/", exc=aiohttp.ClientConnectionError)
+
+    with pytest.raises(aiohttp.ClientConnectionError):
+        await _client(hass).async_open_cover()
+
+    assert aioclient_mock.call_count > 3
+
+
+async def test_retries_back_off_until_deadline():
+    """Retries back off until the next one would start past the deadline."""
+    now = 0.0
+    attempts = []
+
+    async def sleep(delay: float) -> None:
+        nonlocal now
+        now += delay
+
+    async def attempt(hedge, on_sent):
+        attempts.append(now)
+        on_sent()
+        raise aiohttp.ClientConnectionError()
+
+    with pytest.raises(aiohttp.ClientConnectionError):
+        await async_retry(attempt, POLICY, clock=lambda: now, sleep=sleep)
+
+    assert POLICY.deadline - POLICY.max_backoff <= now < POLICY.deadline
+    assert len(attempts) > 3
+    gaps = [later - earlier for earlier, later in zip(attempts, attempts[1:])]
+    assert all(gap <= POLICY.max_backoff for gap in gaps)
+    assert gaps[-1] > gaps[0]
+
+
+async def test_deadline_during_attempt_raises_last_error():
+    """A deadline passing while an attempt hangs raises the error of the previous one."""
+    now = 0.0
+    policy = RetryPolicy(deadline=0.2, backoff=0.01, hedge_delay=None)
+
+    async def sleep(delay: float) -> None:
+        nonlocal now
+        now += delay
+
+    async def attempt(hedge, on_sent):
+        on_sent()
+        if now == 0.0:
+            raise aiohttp.ClientConnectionError()
+        await asyncio.Event().wait()
+
+    with pytest.raises(aiohttp.ClientConnectionError):
+        await async_retry(attempt, policy, clock=lambda: now, sleep=sleep)
+
+
+async def test_hedges_wait_for_the_device(hass, aioclient_mock: AiohttpClientMocker):
+    """Commands waiting for the device's connection slot aren't hedged, at most one
+    hedge is in flight next to the request it duplicates."""
+    in_flight = 0
+    peak = 0
+    respond = _flaky("slow")
+
+    async def counted(method, url, data):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            return await respond(method, url, data)
+        finally:
+            in_flight -= 1
+
+    aioclient_mock.get("http://192.168.1.123/s/p/50/", side_effect=counted)
+    aioclient_mock.get("http://192.168.1.123/s/t/20", side_effect=counted)
+    client = _client(hass)
+
+    started = monotonic()
+    await asyncio.gather(
+        client.async_set_cover_position(50),
+        client.async_set_cover_tilt_position(20),
+    )
+
+    assert monotonic() - started < SLOW_RESPONSE / 2
+    assert peak == 2
+    # the slow request and its hedge, then the other command once the slot is free
+    assert aioclient_mock.call_count == 3
+    assert client.metrics.counter(client.host, HEDGES) == 1
+
+
+async def test_only_idempotent_requests_are_retried(hass, aioclient_mock: AiohttpClientMocker):
+    """Polls and the combined set request are sent once."""
+    aioclient_mock.get("http://192.168.1.123/api/shutter/extended/state", exc=asyncio.TimeoutError)
+    aioclient_mock.post("http://192.168.1.123/api/shutter/set", exc=asyncio.TimeoutError)
+    client = _client(hass)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await client.async_get_cover_state()
+    with pytest.raises(asyncio.TimeoutError):
+        await client.async_set_cover_position_and_tilt(50, 20)
+
+    assert aioclient_mock.call_count == 2
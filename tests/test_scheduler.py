@@ -0,0 +1,54 @@
+"""Tests for BleBox shutterBox with tilt adaptive polling."""
+from custom_components.blebox_shutterbox_tilt.api import ShutterState
+from custom_components.blebox_shutterbox_tilt.calibration import MotionProfile
+from custom_components.blebox_shutterbox_tilt.const import IDLE_SCAN_INTERVAL
+from custom_components.blebox_shutterbox_tilt.const import MOVING_SCAN_INTERVAL
+from custom_components.blebox_shutterbox_tilt.const import SETTLE_SCAN_INTERVAL
+from custom_components.blebox_shutterbox_tilt.scheduler import AdaptivePollScheduler
+
+
+def _state(state: int, position: int, desired: int) -> ShutterState:
+    return ShutterState.from_json(
+        {
+            "shutter": {
+                "state": state,
+                "currentPos": {"position": position, "tilt": 0},
+                "desiredPos": {"position": desired, "tilt": 0},
+            }
+        }
+    )
+
+
+def test_idle_shutter_is_polled_at_idle_interval():
+    """A shutter sitting at a limit is polled rarely."""
+    scheduler = AdaptivePollScheduler()
+    scheduler.observe(_state(3, 100, 100), now=0)
+
+    assert scheduler.next_delay() == IDLE_SCAN_INTERVAL.total_seconds()
+
+
+def test_moving_shutter_is_polled_fast_until_predicted_end():
+    """Motion is polled sub-second and the last poll aims at the end predicted by the profile."""
+    scheduler = AdaptivePollScheduler(profile=MotionProfile(travel_time=10))
+    scheduler.observe(_state(0, 0, 100), now=0)
+    assert scheduler.next_delay() == MOVING_SCAN_INTERVAL.total_seconds()
+
+    scheduler.observe(_state(0, 10, 100), now=1)
+    assert scheduler.next_delay() == MOVING_SCAN_INTERVAL.total_seconds()
+
+    scheduler.observe(_state(0, 98, 100), now=9.8)
+    assert scheduler.next_delay() == 0.2
+
+
+def test_stopped_shutter_backs_off_exponentially():
+    """After motion ends the poll delay doubles up to the idle interval."""
+    scheduler = AdaptivePollScheduler()
+    scheduler.observe(_state(1, 50, 0), now=0)
+    scheduler.observe(_state(4, 0, 0), now=5)
+
+    delays = [scheduler.next_delay() for _ in range(12)]
+
+    settle = SETTLE_SCAN_INTERVAL.total_seconds()
+    assert delays[:4] == [settle, 2 * settle, 4 * settle, 8 * settle]
+    assert delays[-1] == IDLE_SCAN_INTERVAL.total_seconds()
+    assert all(earlier <= later for earlier, later in zip(delays, delays[1:]))
@@ -0,0 +1,249 @@
+"""Tests for BleBox shutterBox with tilt integration services."""
+import asyncio
+
+from custom_components.blebox_shutterbox_tilt.commands import TARGET_TILT
+from custom_components.blebox_shutterbox_tilt.const import API_CLIENT
+from custom_components.blebox_shutterbox_tilt.const import ATTR_COMMAND
+from custom_components.blebox_shutterbox_tilt.const import COMMAND_CLOSE
+from custom_components.blebox_shutterbox_tilt.const import CONF_DEVICES
+from custom_components.blebox_shutterbox_tilt.const import CONF_IP_ADDRESS
+from custom_components.blebox_shutterbox_tilt.const import CONF_PORT
+from custom_components.blebox_shutterbox_tilt.const import COORDINATOR
+from custom_components.blebox_shutterbox_tilt.const import DOMAIN
+from custom_components.blebox_shutterbox_tilt.const import EVENT_BULK_COMMAND_RESULT
+from custom_components.blebox_shutterbox_tilt.const import EVENT_GROUP_MOVE_RESULT
+from custom_components.blebox_shutterbox_tilt.const import SERVICE_BULK_COMMAND
+from custom_components.blebox_shutterbox_tilt.const import SERVICE_GROUP_MOVE
+from custom_components.blebox_shutterbox_tilt.fanout import async_fan_out
+from custom_components.blebox_shutterbox_tilt.retry import RetryPolicy
+from custom_components.blebox_shutterbox_tilt.transport import async_get_transport_limits
+from homeassistant.components.cover import ATTR_POSITION
+from homeassistant.components.cover import ATTR_TILT_POSITION
+from homeassistant.const import ATTR_ENTITY_ID
+from pytest_homeassistant_custom_component.common import async_capture_events
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+
+from .simulator import ShutterboxSimulator
+
+DEVICES = 1000
+GROUP_DEVICES = 20
+# seconds the simulated devices take to answer a group move command
+GROUP_LATENCY = 0.05
+# seconds a member of a group move is still busy with an earlier command
+BUSY = 0.2
+
+
+async def test_fan_out_is_bounded():
+    """1,000 simulated devices are commanded with at most max_parallel in flight."""
+    in_flight = 0
+    max_in_flight = 0
+
+    async def command(device: int) -> int:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        if device % 100 == 0:
+            raise ConnectionError(device)
+        return device
+
+    results = await async_fan_out(range(DEVICES), command, max_parallel=50)
+
+    assert max_in_flight == 50
+    assert [result.target for result in results] == list(range(DEVICES))
+    assert sum(1 for result in results if not result.success) == DEVICES // 100
+    assert all(result.result == result.target for result in results if result.success)
+
+
+async def test_fan_out_staggers_starts():
+    """Consecutive devices start at least `stagger` seconds apart."""
+
+    async def command(_: int) -> None:
+        await asyncio.sleep(0)
+
+    results = await async_fan_out(range(5), command, max_parallel=5, stagger=0.02)
+
+    starts = [result.started for result in results]
+    assert all(later - earlier >= 0.015 for earlier, later in zip(starts, starts[1:]))
+
+
+async def test_bulk_command_service(hass, aioclient_mock: AiohttpClientMocker):
+    """The bulk command moves every selected device and reports per-device results."""
+    for index in (1, 2):
+        host = f"http://192.168.1.{index}"
+        aioclient_mock.get(
+            f"{host}/api/device/state",
+            json={"device": {"deviceName": f"Blind {index}", "type": "shutterBox"}},
+        )
+        aioclient_mock.get(f"{host}/api/shutter/state", json={"shutter": {"state": 2}})
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            data={CONF_IP_ADDRESS: f"192.168.1.{index}", CONF_PORT: 80},
+            entry_id=f"blind_{index}",
+        )
+        entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    aioclient_mock.get("http://192.168.1.1/s/p/50/", json={"shutter": {"state": 0}})
+    aioclient_mock.get("http://192.168.1.2/s/p/50/", exc=asyncio.TimeoutError)
+    # fail on the first attempt, before blind_1 is polled again
+    hass.data[DOMAIN]["blind_2"][API_CLIENT].retry_policy = RetryPolicy(
+        deadline=0.05, hedge_delay=None
+    )
+    events = async_capture_events(hass, EVENT_BULK_COMMAND_RESULT)
+
+    await hass.services.async_call(
+        DOMAIN,
+        SERVICE_BULK_COMMAND,
+        {ATTR_POSITION: 50, "max_parallel": 1},
+        blocking=True,
+    )
+
+    assert len(events) == 1
+    results = {result["entry_id"]: result for result in events[0].data["results"]}
+    assert results["blind_1"]["success"]
+    assert not results["blind_2"]["success"]
+    assert events[0].data["failed"] == 1
+    assert hass.states.get("cover.blind_1").state == "closing"
+
+    aioclient_mock.get("http://192.168.1.1/s/t/50", json={"shutter": {"state": 2}})
+    await hass.services.async_call(
+        DOMAIN,
+        SERVICE_BULK_COMMAND,
+        {ATTR_ENTITY_ID: ["cover.blind_1"], ATTR_TILT_POSITION: 50},
+        blocking=True,
+    )
+    assert [result["entry_id"] for result in events[1].data["results"]] == ["blind_1"]
+
+
+async def test_group_move_starts_devices_together(hass, socket_enabled):
+    """Every command of a group goes out before any device has answered."""
+    simulator = ShutterboxSimulator()
+    devices = await simulator.async_start(GROUP_DEVICES, latency=GROUP_LATENCY)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_DEVICES: [
+                {CONF_IP_ADDRESS: "127.0.0.1", CONF_PORT: device.port} for device in devices
+            ]
+        },
+        entry_id="facade",
+    )
+    entry.add_to_hass(hass)
+    try:
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        events = async_capture_events(hass, EVENT_GROUP_MOVE_RESULT)
+
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_GROUP_MOVE,
+            {ATTR_ENTITY_ID: hass.states.async_entity_ids("cover"), ATTR_COMMAND: COMMAND_CLOSE},
+            blocking=True,
+        )
+
+        assert len(events) == 1
+        result = events[0].data
+        assert result["failed"] == 0
+        assert len(result["results"]) == GROUP_DEVICES
+        started = [device_result["started"] for device_result in result["results"]]
+        assert None not in started
+        assert result["skew"] == max(started) - min(started)
+        assert max(started) < min(device_result["duration"] for device_result in result["results"])
+        assert all("/s/d/" in device.requests for device in devices)
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    finally:
+        await simulator.async_stop()
+
+
+async def test_group_move_waits_for_busy_members(hass, socket_enabled):
+    """A member still sending an earlier command reports when its part of the move
+    went out once the device is free."""
+    simulator = ShutterboxSimulator()
+    devices = await simulator.async_start(3, latency=0.01)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_DEVICES: [
+                {CONF_IP_ADDRESS: "127.0.0.1", CONF_PORT: device.port} for device in devices
+            ]
+        },
+        entry_id="facade",
+    )
+    entry.add_to_hass(hass)
+    try:
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        busy = hass.data[DOMAIN][f"facade_127.0.0.1:{devices[0].port}"][COORDINATOR]
+        release = asyncio.Event()
+
+        async def earlier_command():
+            await release.wait()
+            return busy.data
+
+        earlier = hass.async_create_task(
+            busy.async_send_command(TARGET_TILT, earlier_command, debounce=False)
+        )
+        await asyncio.sleep(0)
+        assert busy.commands._worker is not None
+        events = async_capture_events(hass, EVENT_GROUP_MOVE_RESULT)
+        hass.loop.call_later(BUSY, release.set)
+
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_GROUP_MOVE,
+            {ATTR_ENTITY_ID: hass.states.async_entity_ids("cover"), ATTR_COMMAND: COMMAND_CLOSE},
+            blocking=True,
+        )
+        await earlier
+
+        results = {result["device"]: result for result in events[0].data["results"]}
+        assert events[0].data["failed"] == 0
+        assert all(result["started"] is not None for result in results.values())
+        assert results[busy.key]["started"] >= BUSY / 2
+        assert events[0].data["skew"] >= BUSY / 2
+        assert all("/s/d/" in device.requests for device in devices)
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    finally:
+        await simulator.async_stop()
+
+
+async def test_group_move_reports_when_requests_went_out(hass, socket_enabled):
+    """Members waiting for a transport request slot report when their request got it."""
+    simulator = ShutterboxSimulator()
+    devices = await simulator.async_start(3, latency=GROUP_LATENCY)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_DEVICES: [
+                {CONF_IP_ADDRESS: "127.0.0.1", CONF_PORT: device.port} for device in devices
+            ]
+        },
+        entry_id="facade",
+    )
+    entry.add_to_hass(hass)
+    try:
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        # a group larger than the transport's request limit starts in waves
+        async_get_transport_limits(hass).requests = asyncio.Semaphore(1)
+        events = async_capture_events(hass, EVENT_GROUP_MOVE_RESULT)
+
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_GROUP_MOVE,
+            {ATTR_ENTITY_ID: hass.states.async_entity_ids("cover"), ATTR_COMMAND: COMMAND_CLOSE},
+            blocking=True,
+        )
+
+        assert events[0].data["failed"] == 0
+        started = sorted(result["started"] for result in events[0].data["results"])
+        assert all(later - earlier >= GROUP_LATENCY for earlier, later in zip(started, started[1:]))
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    finally:
+        await simulator.async_stop()